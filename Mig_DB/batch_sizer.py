@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tamaño de lote adaptativo (--adaptive-batch).
+
+Cada paso tiene su BatchSizer: después de cargar y confirmar un lote se
+le informa cuántas filas tenía y cuánto tardó; con eso estima las filas
+por segundo que acepta PostgreSQL para esa tabla (media móvil) y elige
+el tamaño que tardaría la latencia objetivo. El cambio por lote se limita
+a duplicar o reducir a la mitad, y siempre dentro de [mínimo, máximo]:
+un lote lento aislado (checkpoint, autovacuum) no desploma el tamaño.
+
+La lectura keyset pide el tamaño actual en cada consulta, así que con el
+pipeline el ajuste se nota recién después de los lotes ya en vuelo.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+_SMOOTHING = 0.3  # peso del último lote en la media de filas/s
+_MAX_STEP = 2.0   # factor máximo de cambio entre un lote y el siguiente
+
+
+class BatchSizer:
+    def __init__(self, initial: int, minimum: int, maximum: int, target_seconds: float):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.target_seconds = target_seconds
+        self.initial = min(max(initial, self.minimum), self.maximum)
+        self._size = self.initial
+        self._rate: Optional[float] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.smallest = self.initial
+        self.largest = self.initial
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def observe(self, rows: int, seconds: float):
+        """Registra un lote cargado y recalcula el tamaño del siguiente."""
+        if rows <= 0 or seconds <= 0:
+            return
+        with self._lock:
+            self.batches += 1
+            self.rows += rows
+            self.seconds += seconds
+            rate = rows / seconds
+            self._rate = rate if self._rate is None else (
+                _SMOOTHING * rate + (1 - _SMOOTHING) * self._rate
+            )
+            ideal = self._rate * self.target_seconds
+            ideal = min(max(ideal, self._size / _MAX_STEP), self._size * _MAX_STEP)
+            self._size = int(min(max(ideal, self.minimum), self.maximum))
+            self.smallest = min(self.smallest, self._size)
+            self.largest = max(self.largest, self._size)
+
+    def cap(self, maximum: int):
+        """Baja el máximo (p. ej. por falta de memoria); nunca por debajo del mínimo."""
+        with self._lock:
+            self.maximum = max(self.minimum, min(self.maximum, maximum))
+            self._size = min(self._size, self.maximum)
+            self.smallest = min(self.smallest, self._size)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "initial": self.initial,
+            "final": self._size,
+            "smallest": self.smallest,
+            "largest": self.largest,
+            "batches": self.batches,
+            "mean_rows": round(self.rows / self.batches) if self.batches else None,
+            "mean_seconds": round(self.seconds / self.batches, 3) if self.batches else None,
+            "target_seconds": self.target_seconds,
+        }
+
+    def summary(self) -> str:
+        return (
+            f"lote {self.initial} → {self._size} (rango {self.smallest}-{self.largest},"
+            f" objetivo {self.target_seconds:.1f}s)"
+        )
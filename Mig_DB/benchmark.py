@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de punta a punta de la migración ERP → ALMA_BE_V2.
+
+  1. Genera datos sintéticos del ERP (synthetic_erp.py) a la escala pedida
+     (10k / 100k / 1m personas) en una base propia de MariaDB.
+  2. Por cada modo de ejecución recrea una base vacía de PostgreSQL con
+     Referencias_SQL/ALMA_BE_V2.sql y corre MariaDBMigrator en un proceso
+     aparte (la memoria pico no se mezcla entre modos).
+  3. Guarda throughput, duración y filas/s por paso y memoria pico de cada
+     modo en benchmark_<escala>_<fecha>.json y los muestra en una tabla.
+     Con --baseline compara contra un benchmark anterior y marca las
+     regresiones.
+
+Usa los contenedores de docker-compose.yml: credenciales del .env de la
+raíz del repositorio (DB_HOST, DB_USER, DB_PASSWORD, PG_USER, PG_PASSWORD).
+Las bases del benchmark (erp_bench / alma_bench) se crean y borran aquí;
+no se tocan las bases de trabajo.
+
+Uso:
+  python benchmark.py --scale 100k
+  python benchmark.py --scale 10k --modes base,copy --baseline benchmark_10k_....json
+"""
+
+import io
+import os
+import re
+import sys
+import json
+import logging
+import argparse
+import tempfile
+import multiprocessing
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import mysql.connector
+import psycopg2
+from dotenv import load_dotenv
+from tabulate import tabulate
+
+import synthetic_erp
+
+# Forzar UTF-8 en consola Windows
+sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)-8s] %(message)s")
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+SCHEMA_FILE = BASE_DIR / "Referencias_SQL" / "ALMA_BE_V2.sql"
+
+# Modo → argumentos de MariaDBMigrator
+MODES: Dict[str, Dict] = {
+    "base":        {},
+    "secuencial":  {"queue_size": 0},
+    "copy":        {"load_engine": "copy"},
+    "fanout":      {"fanout": True},
+    "hilos4":      {"workers": 4},
+    "procesos4":   {"partitions": 4},
+    "diferido":    {"load_engine": "copy", "defer_indexes": True},
+    "adaptativo":  {"adaptive_batch": True},
+    "staging":     {"load_engine": "staging"},
+}
+
+# Variación que se marca como regresión frente a --baseline
+REGRESSION_THRESHOLD = 0.10
+
+
+def connection_configs(args) -> Dict[str, Dict]:
+    load_dotenv(BASE_DIR.parent / ".env")
+    return {
+        "mariadb": {
+            "host": os.getenv("DB_HOST", "localhost"),
+            "port": int(os.getenv("DB_PORT", "3306")),
+            "user": os.getenv("DB_USER", "root"),
+            "password": os.getenv("DB_PASSWORD", ""),
+            "database": args.mariadb_db,
+        },
+        "postgres": {
+            "host": os.getenv("PG_HOST", "localhost"),
+            "port": int(os.getenv("PG_PORT", "5432")),
+            "user": os.getenv("PG_USER", "postgres"),
+            "password": os.getenv("PG_PASSWORD", ""),
+            "database": args.pg_db,
+        },
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Preparación de bases
+# ─────────────────────────────────────────────────────────────────────────────
+
+def prepare_mariadb(config: Dict, count: int, seed: int):
+    server = {k: v for k, v in config.items() if k != "database"}
+    conn = mysql.connector.connect(**server, use_pure=True)
+    cur = conn.cursor()
+    cur.execute(
+        f"CREATE DATABASE IF NOT EXISTS {config['database']}"
+        " CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci"
+    )
+    cur.execute(f"USE {config['database']}")
+    cur.close()
+    logger.info(f"Generando {count} personas en MariaDB ({config['database']})...")
+    synthetic_erp.populate(conn, count, seed)
+    conn.close()
+
+
+def reset_postgres(config: Dict):
+    """Recrea la base destino vacía con el esquema ALMA_BE_V2."""
+    admin = dict(config, database="postgres")
+    conn = psycopg2.connect(**admin)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f"DROP DATABASE IF EXISTS {config['database']} WITH (FORCE)")
+    cur.execute(f"CREATE DATABASE {config['database']}")
+    cur.close()
+    conn.close()
+
+    # El volcado asigna dueño postgres; se omite para otros usuarios
+    schema = re.sub(
+        r"alter table \w+\s+owner to \w+;", "",
+        SCHEMA_FILE.read_text(encoding="utf-8"), flags=re.IGNORECASE,
+    )
+    conn = psycopg2.connect(**config)
+    with conn, conn.cursor() as cur:
+        cur.execute(schema)
+    conn.close()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Ejecución por modo
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _run_mode(configs: Dict, options: Dict, workdir: str, results):
+    """
+    Proceso hijo: una migración completa dentro de `workdir` (log, reporte
+    y checkpoint propios). Devuelve por la cola el resultado y la ruta del
+    reporte JSON del migrador.
+    """
+    os.chdir(workdir)
+    from migration_mariadb import MariaDBMigrator
+
+    migrator = MariaDBMigrator(
+        configs["mariadb"], configs["postgres"],
+        checkpoint_path=os.path.join(workdir, "checkpoint.json"),
+        **options,
+    )
+    ok = migrator.execute_migration()
+    report_file = os.path.join(workdir, migrator.report_file) if migrator.report_file else None
+    results.put({"ok": ok, "report_file": report_file})
+
+
+def run_mode(name: str, configs: Dict, options: Dict) -> Dict:
+    logger.info(f"\n▶ Modo {name}: {options or 'valores por defecto'}")
+    reset_postgres(configs["postgres"])
+    context = multiprocessing.get_context("spawn")
+    results = context.SimpleQueue()
+    with tempfile.TemporaryDirectory(prefix=f"bench_{name}_") as workdir:
+        proc = context.Process(target=_run_mode, args=(configs, options, workdir, results))
+        proc.start()
+        proc.join()
+        outcome = results.get() if not results.empty() else {"ok": False, "report_file": None}
+        report = None
+        if outcome["report_file"]:
+            with open(outcome["report_file"], encoding="utf-8") as fh:
+                report = json.load(fh)
+    return summarize(name, options, outcome["ok"], report)
+
+
+def summarize(name: str, options: Dict, ok: bool, report: Optional[Dict]) -> Dict:
+    report = report or {}
+    seconds = report.get("seconds") or 0
+    totals = report.get("totals", {})
+    rows = totals.get("records_read", 0)
+    return {
+        "mode": name,
+        "options": options,
+        "ok": ok and not totals.get("errors") and all(
+            data.get("ok", True) for data in report.get("steps", {}).values()
+        ),
+        "seconds": seconds,
+        "rows": rows,
+        "rows_per_second": round(rows / seconds, 1) if seconds else None,
+        "peak_memory_mb": report.get("peak_memory_mb"),
+        "peak_memory_children_mb": report.get("peak_memory_children_mb"),
+        "critical_path": report.get("critical_path"),
+        "steps": {
+            step: {
+                "seconds": data.get("seconds"),
+                "rows": data.get("rows"),
+                "rows_per_second": data.get("rows_per_second"),
+            }
+            for step, data in report.get("steps", {}).items()
+            if "seconds" in data
+        },
+        "report": report,
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Resultados
+# ─────────────────────────────────────────────────────────────────────────────
+
+def compare(current: List[Dict], baseline: Optional[Dict]) -> Dict[str, Optional[float]]:
+    """{modo → variación relativa de filas/s frente a la línea base}."""
+    if not baseline:
+        return {}
+    previous = {m["mode"]: m for m in baseline.get("modes", [])}
+    changes = {}
+    for m in current:
+        old = previous.get(m["mode"], {}).get("rows_per_second")
+        new = m["rows_per_second"]
+        changes[m["mode"]] = (new - old) / old if old and new else None
+    return changes
+
+
+def print_results(modes: List[Dict], changes: Dict[str, Optional[float]]):
+    table = []
+    for m in modes:
+        change = changes.get(m["mode"])
+        mark = ""
+        if change is not None:
+            mark = f"{change:+.1%}"
+            if change < -REGRESSION_THRESHOLD:
+                mark += " ✗ REGRESIÓN"
+        table.append([
+            m["mode"], "✓" if m["ok"] else "✗", f"{m['seconds']:.1f}",
+            m["rows"], m["rows_per_second"], m["peak_memory_mb"], mark,
+        ])
+    print()
+    print(tabulate(
+        table,
+        headers=["Modo", "OK", "Segundos", "Filas", "Filas/s", "Memoria MB", "vs base"],
+    ))
+    for m in modes:
+        print(f"\n  {m['mode']} — por paso:")
+        print(tabulate(
+            [[step, d["seconds"], d["rows"], d["rows_per_second"]]
+             for step, d in m["steps"].items()],
+            headers=["Paso", "Segundos", "Filas", "Filas/s"],
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la migración ERP → ALMA_BE_V2")
+    parser.add_argument("--scale", default="10k",
+                        help="personas a generar: 10k, 100k, 1m o un número")
+    parser.add_argument("--modes", default=",".join(MODES),
+                        help=f"modos separados por coma ({', '.join(MODES)})")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mariadb-db", default="erp_bench")
+    parser.add_argument("--pg-db", default="alma_bench")
+    parser.add_argument("--skip-generate", action="store_true",
+                        help="reutilizar los datos ya generados en MariaDB")
+    parser.add_argument("--baseline", metavar="ARCHIVO",
+                        help="benchmark anterior contra el que comparar")
+    args = parser.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = [m for m in modes if m not in MODES]
+    if unknown:
+        parser.error(f"modos desconocidos: {unknown}")
+
+    count = synthetic_erp.resolve_scale(args.scale)
+    configs = connection_configs(args)
+    started = datetime.now()
+
+    if not args.skip_generate:
+        prepare_mariadb(configs["mariadb"], count, args.seed)
+
+    results = [run_mode(name, configs, MODES[name]) for name in modes]
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+    changes = compare(results, baseline)
+
+    output = BASE_DIR / f"benchmark_{args.scale.lower()}_{started:%Y%m%d_%H%M%S}.json"
+    with open(output, "w", encoding="utf-8") as fh:
+        json.dump({
+            "started_at": started.isoformat(timespec="seconds"),
+            "scale": count,
+            "seed": args.seed,
+            "modes": results,
+            "vs_baseline": changes,
+        }, fh, indent=2, ensure_ascii=False, default=str)
+
+    print_results(results, changes)
+    print(f"\n  Resultados: {output}")
+    regressions = [m for m, c in changes.items() if c is not None and c < -REGRESSION_THRESHOLD]
+    sys.exit(1 if regressions or not all(m["ok"] for m in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Checkpoint de la migración en un archivo JSON local.
+
+Por cada paso guarda su estado (running / done), la última clave keyset
+confirmada en PostgreSQL y cuántas filas se leyeron hasta ahí. Una
+ejecución con --resume salta los pasos terminados y retoma los demás
+desde su marca de agua en lugar de releer y reenviar todo.
+
+Además conserva la fecha de la última sincronización completa, que usa
+el modo delta (--delta) como marca de agua de updated_at/created_at.
+"""
+
+import os
+import json
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+DEFAULT_CHECKPOINT_FILE = "migration_checkpoint.json"
+SYNC_KEY = "_last_sync"
+
+
+class CheckpointStore:
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                self._data = json.load(fh)
+
+    # ── Lectura ──────────────────────────────────────────────────────────────
+
+    def status(self, step: str) -> Optional[str]:
+        return self._data.get(step, {}).get("status")
+
+    def is_done(self, step: str) -> bool:
+        return self.status(step) == "done"
+
+    def watermark(self, step: str) -> Optional[Tuple]:
+        """Última clave confirmada del paso, o None si no hay avance."""
+        key = self._data.get(step, {}).get("watermark")
+        return tuple(key) if key is not None else None
+
+    def rows_done(self, step: str) -> int:
+        return self._data.get(step, {}).get("rows", 0)
+
+    def last_sync(self) -> Optional[datetime]:
+        """Inicio (reloj de MariaDB) de la última ejecución terminada sin errores."""
+        value = self._data.get(SYNC_KEY, {}).get("at")
+        return datetime.fromisoformat(value) if value else None
+
+    def value(self, key: str):
+        """Dato auxiliar de la ejecución (p. ej. los rangos de las particiones)."""
+        return self._data.get(key, {}).get("value")
+
+    # ── Escritura ────────────────────────────────────────────────────────────
+
+    def advance(self, step: str, key: Tuple, rows: int):
+        """Registra un lote confirmado: nueva marca de agua y filas acumuladas."""
+        with self._lock:
+            entry = self._data.setdefault(step, {})
+            entry["status"] = "running"
+            entry["watermark"] = list(key)
+            entry["rows"] = entry.get("rows", 0) + rows
+            entry["updated_at"] = datetime.now().isoformat(timespec="seconds")
+            self._save()
+
+    def mark_done(self, step: str):
+        with self._lock:
+            entry = self._data.setdefault(step, {})
+            entry["status"] = "done"
+            entry["updated_at"] = datetime.now().isoformat(timespec="seconds")
+            self._save()
+
+    def set_last_sync(self, at: datetime):
+        with self._lock:
+            self._data[SYNC_KEY] = {"at": at.isoformat()}
+            self._save()
+
+    def set_value(self, key: str, value):
+        with self._lock:
+            self._data[key] = {"value": value}
+            self._save()
+
+    def reset(self, keep: Tuple[str, ...] = ()):
+        """
+        Descarta el avance por paso (ejecución desde cero); conserva la
+        última sincronización y los datos auxiliares indicados en `keep`.
+        """
+        with self._lock:
+            self._data = {
+                k: v for k, v in self._data.items() if k == SYNC_KEY or k in keep
+            }
+            self._save()
+
+    def _save(self):
+        # Escritura atómica: un corte a mitad no deja el JSON truncado
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self._data, fh, indent=2, default=str)
+        os.replace(tmp, self.path)
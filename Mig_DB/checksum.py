@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sumas de verificación independientes del orden (--verify).
+
+Cada fila se resume en el md5 del texto de sus columnas, normalizado
+según el tipo de la columna destino (booleanos t/f, fechas y timestamps
+con formato fijo, NULL = \\N) y unido con '|'. El resumen de un rango es
+(cantidad de filas, suma de los primeros 60 bits de cada md5): no depende
+del orden de lectura y la suma cabe en un numeric de PostgreSQL.
+
+Del lado del ERP el texto sale de las tuplas que arman los
+transformadores del migrador (el mismo mapeo de la carga); del lado de
+PostgreSQL se calcula en SQL y solo viaja el resumen. Las filas de un
+rango que no coincide se comparan una a una (md5 por uuid).
+
+content_hash() es la huella de contenido de --skip-unchanged: solo se
+compara contra sí misma, así que usa el texto COPY de los valores tal
+como salen del transformador, sin normalizar por tipo.
+"""
+
+import hashlib
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from copy_loader import copy_text_value
+
+NULL_TEXT = "\\N"
+SEPARATOR = "|"
+HASH_HEX_DIGITS = 15  # 60 bits
+
+_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def content_hash(values: Sequence) -> str:
+    """md5 del texto COPY de `values` (huella de una fila migrada)."""
+    text = "\t".join(copy_text_value(v) for v in values)
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+def column_types(pg_cur, table: str) -> Dict[str, str]:
+    """{columna → data_type} de `table` en el esquema actual."""
+    pg_cur.execute(
+        "SELECT column_name, data_type FROM information_schema.columns"
+        " WHERE table_schema = current_schema() AND table_name = %s",
+        (table,),
+    )
+    return dict(pg_cur.fetchall())
+
+
+def _kind(data_type: str) -> str:
+    if data_type == "boolean":
+        return "bool"
+    if data_type.startswith("timestamp"):
+        return "timestamp"
+    if data_type == "date":
+        return "date"
+    return "text"
+
+
+def _normalize_bool(value) -> str:
+    return "t" if value else "f"
+
+
+def _normalize_timestamp(value) -> str:
+    if isinstance(value, datetime):
+        return value.strftime(_DATETIME_FORMAT)
+    if isinstance(value, date):
+        return value.strftime("%Y-%m-%d 00:00:00")
+    return str(value)
+
+
+def _normalize_date(value) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+
+_NORMALIZERS: Dict[str, Callable] = {
+    "bool": _normalize_bool,
+    "timestamp": _normalize_timestamp,
+    "date": _normalize_date,
+    "text": str,
+}
+
+_SQL_TEXT = {
+    "bool": "CASE WHEN {c} THEN 't' WHEN NOT {c} THEN 'f' END",
+    "timestamp": "to_char({c}, 'YYYY-MM-DD HH24:MI:SS')",
+    "date": "to_char({c}, 'YYYY-MM-DD')",
+    "text": "{c}::text",
+}
+
+
+class RowHasher:
+    """
+    Hash de las columnas `columns` de `table` en ambos lados. `refs` =
+    {columna FK → tabla referenciada}: la columna se compara por el uuid
+    de la fila referenciada (las tuplas del ERP ya lo traen así).
+    """
+
+    def __init__(
+        self,
+        table: str,
+        columns: Sequence[str],
+        types: Dict[str, str],
+        refs: Optional[Dict[str, str]] = None,
+    ):
+        refs = refs or {}
+        self.table = table
+        self._normalizers: List[Callable] = []
+        parts, joins = [], []
+        for i, column in enumerate(columns):
+            if column in refs:
+                alias = f"r{i}"
+                joins.append(f"LEFT JOIN {refs[column]} {alias} ON {alias}.id = t.{column}")
+                kind, expr = "text", f"{alias}.uuid"
+            else:
+                kind = _kind(types.get(column.strip('"'), "text"))
+                expr = f"t.{column}"
+            self._normalizers.append(_NORMALIZERS[kind])
+            parts.append(f"COALESCE({_SQL_TEXT[kind].format(c=expr)}, '{NULL_TEXT}')")
+        self._hash_sql = f"md5(concat_ws('{SEPARATOR}', {', '.join(parts)}))"
+        self._from_sql = f"FROM {table} t {' '.join(joins)} WHERE t.uuid = ANY(%s)"
+
+    def row_hash(self, values: Sequence) -> str:
+        text = SEPARATOR.join(
+            NULL_TEXT if v is None else normalize(v)
+            for normalize, v in zip(self._normalizers, values)
+        )
+        return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def summarize(hashes: Dict[str, str]) -> Tuple[int, int]:
+        """{uuid → md5} → (filas, suma); el mismo resumen que target_summary()."""
+        return len(hashes), sum(int(h[:HASH_HEX_DIGITS], 16) for h in hashes.values())
+
+    def target_summary(self, pg_cur, uuids: List[str]) -> Tuple[int, int]:
+        """(filas, suma) de las filas destino con esos uuid, calculado en PostgreSQL."""
+        pg_cur.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(('x' || left(h, {HASH_HEX_DIGITS}))"
+            f"::bit({HASH_HEX_DIGITS * 4})::bigint), 0)"
+            f" FROM (SELECT {self._hash_sql} AS h {self._from_sql}) s",
+            (uuids,),
+        )
+        count, total = pg_cur.fetchone()
+        return count, int(total)
+
+    def target_hashes(self, pg_cur, uuids: List[str]) -> Dict[str, str]:
+        """{uuid → md5} de las filas destino (solo para los rangos que no coinciden)."""
+        pg_cur.execute(f"SELECT t.uuid, {self._hash_sql} {self._from_sql}", (uuids,))
+        return dict(pg_cur.fetchall())
@@ -21,16 +21,49 @@ POSTGRES_CONFIG = {
 # Configuración de migración
 MIGRATION_SETTINGS = {
     'batch_size': 1000,  # Número de registros a procesar por lote
+    'queue_size': 2,  # Lotes en vuelo entre lectura, transformación y carga (0 = secuencial)
+    'batch_size_min': 200,  # Límites del lote adaptativo (--adaptive-batch)
+    'batch_size_max': 20000,
+    'batch_target_seconds': 1.0,  # Latencia objetivo de carga + commit por lote
+    'offline_part_rows': 250000,  # Filas por archivo en --extract (unidad de carga y de --resume en --load)
+    'ddl_workers': 4,  # Índices/FK reconstruidos en paralelo tras --defer-indexes
+    'group_ranges': 4,  # Rangos de grupo migrados en paralelo (clases, matrículas, asistencias)
+    'verify_range_rows': 20000,  # Personas de `usuario` por rango comparado en --verify
+    'verify_workers': 4,  # Rangos comparados en paralelo contra PostgreSQL en --verify
+    'pool_size': 8,  # Conexiones ociosas conservadas por base para reutilizar entre hilos
+    'health_check_seconds': 30,  # Ociosidad a partir de la cual se prueba una conexión antes de entregarla
+    'retry_attempts': 3,  # Reintentos de un lote tras una caída de conexión o un interbloqueo
+    'retry_backoff_seconds': 2.0,  # Espera antes del primer reintento (se duplica en cada uno)
+    'profile_top': 15,  # Funciones más costosas por paso en el resumen de --profile
+    'profile_interval': 0.005,  # Segundos entre muestras de pila con --profile-stacks
+    'memory_budget_mb': None,  # Memoria residente máxima por proceso (--memory-budget); None = sin límite
+    'memory_check_batches': 10,  # Lotes entre una medida de memoria que actuó y la siguiente
+    'spill_dir': None,  # Directorio del SQLite temporal de los mapas volcados (None = el temporal del sistema)
+    'lookup_chunk': 10000,  # Valores por consulta ANY(%s) contra PostgreSQL
+    'academic_schema': 'alma',  # Esquema con las tablas de DB_ALMA_V2.sql que carga --academic
     'skip_validation': False,  # Validar integridad referencial
     'log_level': 'INFO',
     'continue_on_error': True,  # Continuar si hay errores
 }
 
-# Mapeos personalizados de tablas (si aplica transformaciones especiales)
+# Mapeos declarativos ERP → ALMA (ver mapping_engine.py para todas las
+# expresiones). Cada entrada es un paso más de la migración con lectura
+# keyset, pipeline, COPY/execute_values, commit por lote y --resume.
 CUSTOM_MAPPINGS = {
     # Ejemplo:
-    # 'source_table': {
-    #     'target_table': 'target_table',
+    # 'profile_notes': {
+    #     'source': 'usuario_nota',
+    #     'keys': ('id',),
+    #     'target': 'profile_notes',
+    #     'uuid': ('profile_note', ('id',)),
+    #     'columns': {
+    #         'profile_id': ('fk', 'profile', ('id_usuario', 'dni_usuario')),
+    #         'country': ('lookup', 'pais_map', 'pais'),
+    #         'text': 'nota',
+    #         'created_at': ('or_now', 'created_at'),
+    #         'updated_at': ('or_now', 'updated_at'),
+    #     },
+    #     'deps': ('profiles',),
     #     'skip': False,
     # }
 }
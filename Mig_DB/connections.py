@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Conexiones resilientes para migraciones de varias horas.
+
+ConnectionPool guarda las conexiones que devuelven los hilos (workers del
+planificador, rangos de grupos, verificación, partes de --load) y se las
+entrega al siguiente en vez de abrir otra. Una conexión que estuvo ociosa
+más de `health_check_seconds` se prueba antes de entregarla (ping de
+MariaDB / SELECT 1 de PostgreSQL); si está caída se descarta y se abre
+una nueva.
+
+is_transient() separa los errores que justifican repetir el lote en curso
+de los que no (datos inválidos, SQL mal formado, statement_timeout), y
+needs_reconnect() indica si además hay que cambiar de conexión:
+
+  reconectar  MariaDB 2006 / 2013 conexión perdida, 2055 pérdida durante
+              lectura; PostgreSQL SQLSTATE 08xxx (excepción de conexión),
+              57P01-57P03 (apagado o reinicio del servidor), OperationalError
+              sin SQLSTATE (el socket se cerró antes de recibir respuesta) e
+              InterfaceError (conexión cerrada del lado del cliente)
+  repetir     MariaDB 1205 espera de bloqueo agotada, 1213 interbloqueo;
+              PostgreSQL 40001 conflicto de serialización, 40P01
+              interbloqueo: se deshace la transacción y se repite sobre la
+              misma conexión
+
+Cualquier otro error, incluido 57014 (consulta cancelada, statement_timeout),
+falla de inmediato: repetirlo volvería a tardar lo mismo.
+
+ReconnectingCursor es el cursor de PostgreSQL de los pasos: sigue a la
+conexión actual del hilo, así que después de una reconexión los closures
+de carga que lo capturaron siguen funcionando sin rearmarse.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import psycopg2
+from mysql.connector import Error as MySQLError
+
+CONNECTION_MYSQL_ERRNOS = frozenset({2006, 2013, 2055})
+CONFLICT_MYSQL_ERRNOS = frozenset({1205, 1213})
+CONNECTION_PG_SQLSTATES = frozenset({"57P01", "57P02", "57P03"})  # más la clase 08
+CONFLICT_PG_SQLSTATES = frozenset({"40001", "40P01"})
+
+
+def needs_reconnect(err: BaseException) -> bool:
+    """True si `err` dejó inservible la conexión (hay que abrir otra)."""
+    if isinstance(err, MySQLError):
+        return getattr(err, "errno", None) in CONNECTION_MYSQL_ERRNOS
+    if isinstance(err, psycopg2.InterfaceError):
+        return True
+    if isinstance(err, psycopg2.OperationalError):
+        code = getattr(err, "pgcode", None)
+        return code is None or code.startswith("08") or code in CONNECTION_PG_SQLSTATES
+    return False
+
+
+def is_transient(err: BaseException) -> bool:
+    """True si `err` es una caída de conexión o un conflicto que se resuelve repitiendo."""
+    if needs_reconnect(err):
+        return True
+    if isinstance(err, MySQLError):
+        return getattr(err, "errno", None) in CONFLICT_MYSQL_ERRNOS
+    if isinstance(err, psycopg2.Error):
+        return getattr(err, "pgcode", None) in CONFLICT_PG_SQLSTATES
+    return False
+
+
+def backoff_delay(attempt: int, base_seconds: float, maximum: float = 60.0) -> float:
+    """Espera antes del reintento `attempt` (0, 1, 2...): base · 2^attempt, acotada."""
+    return min(base_seconds * (2 ** attempt), maximum)
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """
+    Conexiones de una base reutilizables entre hilos. No limita cuántas hay
+    abiertas a la vez (cada worker necesita la suya); `size` es cuántas
+    ociosas se conservan al devolverlas.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        connect: Callable[[], Any],
+        ping: Callable[[Any], None],
+        size: int,
+        health_check_seconds: float,
+        reset: Optional[Callable[[Any], None]] = None,
+    ):
+        self.name = name
+        self._connect = connect
+        self._ping = ping
+        self._reset = reset
+        self.size = size
+        self.health_check_seconds = health_check_seconds
+        self._lock = threading.Lock()
+        self._idle: List[Tuple[Any, float]] = []  # (conexión, devuelta en)
+        self._all: Set = set()
+        self.opened = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def acquire(self):
+        """Conexión sana: una ociosa (probada si hace falta) o una nueva."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, since = self._idle.pop()
+            if time.monotonic() - since < self.health_check_seconds or self._healthy(conn):
+                with self._lock:
+                    self.reused += 1
+                return conn
+            self.discard(conn)
+        conn = self._connect()
+        with self._lock:
+            self._all.add(conn)
+            self.opened += 1
+        return conn
+
+    def _healthy(self, conn) -> bool:
+        try:
+            self._ping(conn)
+            return True
+        except Exception:
+            return False
+
+    def release(self, conn):
+        """Devuelve `conn` al pool (o la cierra si sobra o quedó inservible)."""
+        with self._lock:
+            known = conn in self._all
+        if known and self._reset is not None:
+            try:
+                self._reset(conn)
+            except Exception:
+                known = False
+        if known:
+            with self._lock:
+                if len(self._idle) < self.size:
+                    self._idle.append((conn, time.monotonic()))
+                    return
+        self.discard(conn)
+
+    def discard(self, conn):
+        """Cierra `conn` sin devolverla (caída o descartada tras un error)."""
+        with self._lock:
+            if conn in self._all:
+                self._all.discard(conn)
+                self.discarded += 1
+        _close_quietly(conn)
+
+    def close_all(self):
+        with self._lock:
+            conns, self._all, self._idle = list(self._all), set(), []
+        for conn in conns:
+            _close_quietly(conn)
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"opened": self.opened, "reused": self.reused, "discarded": self.discarded}
+
+
+class ReconnectingCursor:
+    """
+    Cursor sobre la conexión de PostgreSQL que devuelve `get_conn()` en cada
+    uso: si la conexión del hilo cambió (reconexión), abre un cursor nuevo
+    sobre la nueva. Delega todo lo demás (execute, fetchall, copy_expert,
+    rowcount, query...) al cursor real.
+    """
+
+    def __init__(self, get_conn: Callable[[], Any]):
+        self._get_conn = get_conn
+        self._conn = None
+        self._cur = None
+
+    def _cursor(self):
+        conn = self._get_conn()
+        if conn is not self._conn or self._cur.closed:
+            self._conn, self._cur = conn, conn.cursor()
+        return self._cur
+
+    def __getattr__(self, name: str):
+        return getattr(self._cursor(), name)
+
+    def close(self):
+        if self._cur is not None and not self._conn.closed:
+            self._cur.close()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Carga masiva en PostgreSQL con COPY FROM STDIN.
+
+Las filas de un lote se copian a una tabla temporal de staging (una por
+tabla destino, reutilizada durante toda la sesión) y luego se fusionan con
+la tabla real en un único INSERT ... SELECT ... ON CONFLICT. Así se
+conserva la idempotencia por UUID determinista del migrador.
+
+Las tablas TEMP no se escriben en el WAL (igual que las UNLOGGED) y son
+privadas de la sesión, así que los hilos y procesos que cargan la misma
+tabla no comparten staging. Con merge_file y merge_refs las FK viajan
+como uuid y se traducen a IDs con un JOIN contra la tabla referenciada
+dentro del mismo INSERT ... SELECT.
+"""
+
+import io
+from datetime import date, datetime
+from typing import IO, Dict, List, Optional, Sequence, Tuple
+
+
+def copy_text_value(value) -> str:
+    """Convierte un valor Python al formato texto de COPY."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    text = str(value)
+    return (
+        text.replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r")
+    )
+
+
+def rows_to_copy_buffer(rows: Sequence[tuple]) -> io.StringIO:
+    """Serializa las filas a un buffer listo para copy_expert (formato texto)."""
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(copy_text_value(v) for v in row))
+        buf.write("\n")
+    buf.seek(0)
+    return buf
+
+
+class CopyLoader:
+    """
+    Motor de carga COPY → staging → INSERT ... SELECT ... ON CONFLICT.
+
+    Las tablas de staging son TEMP (sin WAL, privadas a la sesión) y se
+    crean con CREATE TABLE AS ... WITH NO DATA para que no hereden los
+    NOT NULL ni los defaults de la tabla destino. Se crean (si no existen)
+    y vacían en el mismo viaje de red que precede a cada COPY, de modo que
+    un ROLLBACK del paso no deja al cargador apuntando a una tabla perdida.
+    """
+
+    def __init__(self, pg_cur):
+        self.pg_cur = pg_cur
+        self.bytes_sent = 0  # tamaño acumulado de los buffers COPY enviados
+
+    @staticmethod
+    def _staging_name(table: str, suffix: str = "") -> str:
+        """Nombre de la tabla TEMP de `table` (sin el esquema: las TEMP viven en pg_temp)."""
+        return f"stg_{table.replace('.', '_')}{suffix}"
+
+    def _prepare_staging(self, table: str, columns: Sequence[str]) -> str:
+        staging = self._staging_name(table)
+        self.pg_cur.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {staging} AS"
+            f" SELECT {', '.join(columns)} FROM {table} WITH NO DATA;"
+            f" TRUNCATE {staging}"
+        )
+        return staging
+
+    def merge(
+        self,
+        table: str,
+        columns: Sequence[str],
+        rows: Sequence[tuple],
+        conflict: str,
+        returning: Optional[str] = None,
+    ) -> List[tuple]:
+        """
+        Copia `rows` a staging y los fusiona con `table`.
+
+        `conflict` es la cláusula ON CONFLICT completa (p. ej.
+        "ON CONFLICT (uuid) DO NOTHING"). Si se indica `returning`, devuelve
+        las filas de RETURNING del INSERT final.
+        """
+        if not rows:
+            return []
+
+        cols = ", ".join(columns)
+        staging = self._prepare_staging(table, columns)
+        buf = rows_to_copy_buffer(rows)
+        self.bytes_sent += len(buf.getvalue())
+        self.pg_cur.copy_expert(
+            f"COPY {staging} ({cols}) FROM STDIN WITH (FORMAT text)", buf,
+        )
+        self.pg_cur.execute(
+            f"""
+            INSERT INTO {table} ({cols})
+            SELECT {cols} FROM {staging}
+            {conflict}
+            {f"RETURNING {returning}" if returning else ""}
+            """
+        )
+        return self.pg_cur.fetchall() if returning else []
+
+    def merge_file(
+        self,
+        table: str,
+        columns: Sequence[str],
+        source: IO[str],
+        conflict: str,
+        refs: Optional[Dict[str, str]] = None,
+    ) -> int:
+        """
+        Copia `source` (ya en formato texto de COPY, p. ej. una parte de
+        --extract) a staging y lo fusiona con `table`. Devuelve las filas
+        insertadas.
+
+        `refs` = {columna → tabla}: la columna trae el uuid de la fila
+        referenciada y se reemplaza por su id con un JOIN; las filas cuyo
+        uuid no existe en la tabla referenciada se descartan.
+        """
+        refs = refs or {}
+        staging = self._prepare_ref_staging(
+            self._staging_name(table, "_file"), table, columns, refs,
+        )
+        self.pg_cur.copy_expert(
+            f"COPY {staging} ({', '.join(columns)}) FROM STDIN WITH (FORMAT text)", source,
+        )
+        self.pg_cur.execute(
+            f"""
+            INSERT INTO {table} ({', '.join(columns)})
+            {self._ref_select(staging, columns, refs)}
+            {conflict}
+            """
+        )
+        return self.pg_cur.rowcount
+
+    def merge_refs(
+        self,
+        table: str,
+        columns: Sequence[str],
+        rows: Sequence[tuple],
+        conflict: str,
+        refs: Dict[str, str],
+    ) -> Tuple[int, int]:
+        """
+        merge_file desde tuplas en memoria (load_engine "staging"): las FK de
+        `refs` viajan como uuid y se traducen con el JOIN en PostgreSQL, sin
+        mapas de IDs en Python. Un uuid repetido en el lote se fusiona una
+        sola vez (DISTINCT ON). Devuelve (filas con todas sus referencias,
+        filas insertadas o actualizadas).
+        """
+        if not rows:
+            return 0, 0
+        staging = self._prepare_ref_staging(
+            self._staging_name(table, "_refs"), table, columns, refs,
+        )
+        buf = rows_to_copy_buffer(rows)
+        self.bytes_sent += len(buf.getvalue())
+        self.pg_cur.copy_expert(
+            f"COPY {staging} ({', '.join(columns)}) FROM STDIN WITH (FORMAT text)", buf,
+        )
+        self.pg_cur.execute(
+            f"""
+            WITH src AS (
+                {self._ref_select(staging, columns, refs, distinct=columns[0])}
+            ), ins AS (
+                INSERT INTO {table} ({', '.join(columns)})
+                SELECT * FROM src
+                {conflict}
+                RETURNING 1
+            )
+            SELECT (SELECT COUNT(*) FROM src), (SELECT COUNT(*) FROM ins)
+            """
+        )
+        matched, merged = self.pg_cur.fetchone()
+        return matched, merged
+
+    def _prepare_ref_staging(
+        self, staging: str, table: str, columns: Sequence[str], refs: Dict[str, str]
+    ) -> str:
+        """Staging TEMP con las columnas de `refs` como texto (uuid de la fila referenciada)."""
+        retype = "".join(
+            f"; ALTER TABLE {staging} ALTER COLUMN {c} TYPE text" for c in refs
+        )
+        self.pg_cur.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {staging} AS"
+            f" SELECT {', '.join(columns)} FROM {table} WITH NO DATA"
+            f"{retype}; TRUNCATE {staging}"
+        )
+        return staging
+
+    @staticmethod
+    def _ref_select(
+        staging: str, columns: Sequence[str], refs: Dict[str, str], distinct: Optional[str] = None
+    ) -> str:
+        """SELECT sobre `staging` con cada columna de `refs` reemplazada por el id del JOIN."""
+        select, joins = [], []
+        for i, column in enumerate(columns):
+            if column in refs:
+                alias = f"r{i}"
+                joins.append(f"JOIN {refs[column]} {alias} ON {alias}.uuid = s.{column}")
+                select.append(f"{alias}.id")
+            else:
+                select.append(f"s.{column}")
+        return (
+            f"SELECT {f'DISTINCT ON (s.{distinct}) ' if distinct else ''}{', '.join(select)}"
+            f" FROM {staging} s {' '.join(joins)}"
+            f"{f' ORDER BY s.{distinct}' if distinct else ''}"
+        )
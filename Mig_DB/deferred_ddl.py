@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índices y FK diferidos durante la carga masiva (--defer-indexes).
+
+Antes de cargar se guardan las definiciones de los índices secundarios y
+de las FK de las tablas destino y se eliminan; al terminar se recrean:
+
+  1. índices: un CREATE INDEX por trabajo, varios a la vez (conexiones
+     propias); sobre la misma tabla también corren en paralelo porque
+     CREATE INDEX solo toma un lock SHARE
+  2. FK: ADD CONSTRAINT ... NOT VALID (instantáneo, sin recorrer filas)
+  3. FK: VALIDATE CONSTRAINT en paralelo (recorre las filas sin bloquear
+     escrituras)
+
+Se conservan las claves primarias y los índices UNIQUE: ON CONFLICT los
+necesita como árbitro y las búsquedas por uuid / provider_auth_id del
+migrador los usan durante la carga.
+
+Las definiciones viven en el checkpoint hasta que la reconstrucción
+termina: si la ejecución se corta con los índices eliminados, la
+siguiente (con o sin --resume) los vuelve a encontrar allí. Cada paso es
+idempotente (IF NOT EXISTS, FK existentes se validan sin recrearse).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Sequence
+
+DEFERRED_DDL_KEY = "_deferred_ddl"
+
+
+def capture(pg_cur, tables: Sequence[str]) -> Dict[str, List[Dict]]:
+    """Definiciones de índices secundarios (no UNIQUE) y FK de `tables`."""
+    pg_cur.execute(
+        """
+        SELECT t.relname, i.relname, pg_get_indexdef(ix.indexrelid)
+        FROM pg_index ix
+        JOIN pg_class i ON i.oid = ix.indexrelid
+        JOIN pg_class t ON t.oid = ix.indrelid
+        JOIN pg_namespace n ON n.oid = t.relnamespace
+        WHERE n.nspname = current_schema()
+          AND t.relname = ANY(%s)
+          AND NOT ix.indisunique
+          AND NOT ix.indisprimary
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = ix.indexrelid)
+        ORDER BY t.relname, i.relname
+        """,
+        (list(tables),),
+    )
+    indexes = [{"table": t, "name": n, "definition": d} for t, n, d in pg_cur.fetchall()]
+    pg_cur.execute(
+        """
+        SELECT t.relname, c.conname, pg_get_constraintdef(c.oid)
+        FROM pg_constraint c
+        JOIN pg_class t ON t.oid = c.conrelid
+        JOIN pg_namespace n ON n.oid = t.relnamespace
+        WHERE n.nspname = current_schema()
+          AND c.contype = 'f'
+          AND t.relname = ANY(%s)
+        ORDER BY t.relname, c.conname
+        """,
+        (list(tables),),
+    )
+    foreign_keys = [{"table": t, "name": n, "definition": d} for t, n, d in pg_cur.fetchall()]
+    return {"indexes": indexes, "foreign_keys": foreign_keys}
+
+
+def merge(saved: Dict[str, List[Dict]], live: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
+    """Une lo guardado por una ejecución cortada con lo que sigue existiendo."""
+    merged = {}
+    for kind in ("indexes", "foreign_keys"):
+        known = {entry["name"] for entry in saved.get(kind, [])}
+        merged[kind] = saved.get(kind, []) + [e for e in live[kind] if e["name"] not in known]
+    return merged
+
+
+def drop(pg_cur, ddl: Dict[str, List[Dict]]):
+    """Elimina FK e índices (dentro de la transacción del llamador)."""
+    for fk in ddl["foreign_keys"]:
+        pg_cur.execute(f'ALTER TABLE {fk["table"]} DROP CONSTRAINT IF EXISTS {fk["name"]}')
+    for index in ddl["indexes"]:
+        pg_cur.execute(f'DROP INDEX IF EXISTS {index["name"]}')
+
+
+def _create_index(open_conn: Callable, close_conn: Callable, index: Dict):
+    definition = index["definition"]
+    for prefix in ("CREATE INDEX ", "CREATE UNIQUE INDEX "):
+        if definition.startswith(prefix):
+            definition = prefix + "IF NOT EXISTS " + definition[len(prefix):]
+            break
+    conn = open_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(definition)
+        conn.commit()
+    finally:
+        close_conn(conn)
+
+
+def _validate_fk(open_conn: Callable, close_conn: Callable, fk: Dict):
+    conn = open_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f'ALTER TABLE {fk["table"]} VALIDATE CONSTRAINT {fk["name"]}')
+        conn.commit()
+    finally:
+        close_conn(conn)
+
+
+def rebuild(
+    open_conn: Callable, close_conn: Callable, ddl: Dict[str, List[Dict]], workers: int
+) -> List[str]:
+    """
+    Recrea índices (en paralelo), agrega las FK como NOT VALID y las valida
+    (en paralelo). `open_conn` / `close_conn` abren y cierran una conexión
+    de PostgreSQL por trabajo. Devuelve los errores como texto; un trabajo
+    fallido no detiene a los demás.
+    """
+    errors: List[str] = []
+
+    def run_all(jobs: List[Dict], func: Callable):
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ddl") as pool:
+            futures = [(job, pool.submit(func, open_conn, close_conn, job)) for job in jobs]
+            for job, future in futures:
+                try:
+                    future.result()
+                except Exception as err:
+                    errors.append(f'{job["name"]}: {str(err).strip().splitlines()[0]}')
+
+    run_all(ddl["indexes"], _create_index)
+
+    # ADD CONSTRAINT toma locks sobre ambas tablas: en serie, en una transacción
+    conn = open_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT t.relname, c.conname FROM pg_constraint c"
+                " JOIN pg_class t ON t.oid = c.conrelid"
+                " WHERE c.contype = 'f' AND t.relname = ANY(%s)",
+                (list({fk["table"] for fk in ddl["foreign_keys"]}),),
+            )
+            existing = set(cur.fetchall())
+            for fk in ddl["foreign_keys"]:
+                if (fk["table"], fk["name"]) not in existing:
+                    cur.execute(
+                        f'ALTER TABLE {fk["table"]} ADD CONSTRAINT {fk["name"]}'
+                        f' {fk["definition"]} NOT VALID'
+                    )
+        conn.commit()
+    except Exception as err:
+        conn.rollback()
+        errors.append(f"ADD CONSTRAINT: {str(err).strip().splitlines()[0]}")
+        return errors
+    finally:
+        close_conn(conn)
+
+    run_all(ddl["foreign_keys"], _validate_fk)
+    return errors
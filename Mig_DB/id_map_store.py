@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mapas de claves ERP → IDs de PostgreSQL.
+
+Todos los mapas exponen la misma interfaz por lotes (get_many / put_many)
+además de get / [] / in / len, de modo que los pasos de la migración no
+dependen de dónde vivan los datos:
+
+  CompactIdMap     en memoria, claves empaquetadas en arrays int64
+                   ordenados (16 bytes por entrada frente a los más de
+                   100 de una tupla en un dict)
+  PersistentIdMap  tabla indexada en un archivo SQLite local: sobrevive a
+                   reinicios, la comparten --resume y --delta, y no ocupa
+                   el heap de Python en tablas de millones de filas
+  UuidKeyMap       modo --extract: sin PostgreSQL, cada clave se traduce al
+                   uuid determinista de su fila destino
+  SpillableIdMap   CompactIdMap que, si la migración supera su presupuesto
+                   de memoria (--memory-budget), se vuelca a un
+                   PersistentIdMap en un SQLite temporal y sigue desde ahí
+
+NumPy es opcional: si está instalado, las búsquedas por lote se hacen con
+searchsorted vectorizado; si no, con bisect sobre array('q').
+"""
+
+import sqlite3
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # opcional
+    np = None
+
+Key = Union[int, Tuple[int, ...]]
+
+DEFAULT_ID_MAP_FILE = "migration_id_maps.sqlite"
+
+# SQLite admite como máximo 999 parámetros por sentencia en versiones antiguas
+_SQLITE_CHUNK = 400
+
+# (id, dni): id es bigint unsigned (número de documento), dni es tinyint
+# unsigned (tipo de documento) → id * 256 + dni cabe en un int64 con signo
+_DNI_BITS = 8
+_MAX_PACKED_ID = (1 << (63 - _DNI_BITS)) - 1
+
+# Altas pendientes de fusionar con los arrays ordenados: se fusionan al
+# superar este mínimo o 1/8 del tamaño ya ordenado (coste amortizado lineal)
+_MIN_PENDING = 4096
+
+
+def _as_int64(values: array):
+    return np.frombuffer(values, dtype=np.int64) if len(values) else np.empty(0, np.int64)
+
+
+def _to_array(values) -> array:
+    out = array("q")
+    out.frombytes(values.astype(np.int64).tobytes())
+    return out
+
+
+def _merge_numpy(keys: array, values: array, new_keys: List[int], new_values: List[int]):
+    old_keys = _as_int64(keys)
+    merged_values = _as_int64(values).copy()
+    nk = np.array(new_keys, dtype=np.int64)
+    nv = np.array(new_values, dtype=np.int64)
+    pos = np.searchsorted(old_keys, nk)
+    exists = np.zeros(len(nk), dtype=bool)
+    if len(old_keys):
+        exists = (pos < len(old_keys)) & (old_keys[np.minimum(pos, len(old_keys) - 1)] == nk)
+    merged_values[pos[exists]] = nv[exists]
+    fresh = ~exists
+    merged_keys = np.insert(old_keys, pos[fresh], nk[fresh])
+    merged_values = np.insert(merged_values, pos[fresh], nv[fresh])
+    return _to_array(merged_keys), _to_array(merged_values)
+
+
+def _merge_python(keys: array, values: array, new_keys: List[int], new_values: List[int]):
+    out_keys, out_values = array("q"), array("q")
+    i = j = 0
+    while i < len(keys) and j < len(new_keys):
+        if keys[i] < new_keys[j]:
+            out_keys.append(keys[i])
+            out_values.append(values[i])
+            i += 1
+        else:
+            if keys[i] == new_keys[j]:
+                i += 1  # el valor nuevo reemplaza al anterior
+            out_keys.append(new_keys[j])
+            out_values.append(new_values[j])
+            j += 1
+    out_keys.extend(keys[i:])
+    out_values.extend(values[i:])
+    out_keys.extend(new_keys[j:])
+    out_values.extend(new_values[j:])
+    return out_keys, out_values
+
+
+class CompactIdMap:
+    """
+    Mapa en memoria con claves int (arity=1) o (id, dni) (arity=2).
+
+    Las entradas viven en dos arrays paralelos ordenados por clave
+    empaquetada; las altas recientes se acumulan en un dict pequeño y se
+    fusionan por bloques. Seguro para lectores y escritores concurrentes.
+    """
+
+    def __init__(self, arity: int = 1):
+        if arity not in (1, 2):
+            raise ValueError("arity debe ser 1 o 2")
+        self.arity = arity
+        self._lock = threading.Lock()
+        self._keys = array("q")
+        self._values = array("q")
+        self._pending: Dict[int, int] = {}
+
+    def _pack(self, key: Key) -> int:
+        if self.arity == 1:
+            return key
+        erp_id, dni = key
+        if not 0 <= erp_id <= _MAX_PACKED_ID or not 0 <= dni < (1 << _DNI_BITS):
+            raise ValueError(f"Clave fuera de rango para el mapa compacto: {key}")
+        return (erp_id << _DNI_BITS) | dni
+
+    def _unpack(self, packed: int) -> Key:
+        if self.arity == 1:
+            return packed
+        return packed >> _DNI_BITS, packed & ((1 << _DNI_BITS) - 1)
+
+    def _merge_pending(self):
+        """Fusiona las altas pendientes con los arrays ordenados (con el lock tomado)."""
+        if not self._pending:
+            return
+        new_keys = sorted(self._pending)
+        new_values = [self._pending[k] for k in new_keys]
+        if np is not None:
+            self._keys, self._values = _merge_numpy(
+                self._keys, self._values, new_keys, new_values
+            )
+        else:
+            self._keys, self._values = _merge_python(
+                self._keys, self._values, new_keys, new_values
+            )
+        self._pending = {}
+
+    def _lookup_sorted(self, packed: List[int]) -> List[Optional[int]]:
+        keys, values = self._keys, self._values
+        n = len(keys)
+        if not n:
+            return [None] * len(packed)
+        if np is not None:
+            arr_keys = _as_int64(keys)
+            probe = np.fromiter(packed, dtype=np.int64, count=len(packed))
+            pos = np.searchsorted(arr_keys, probe)
+            pos_clipped = np.minimum(pos, n - 1)
+            hit = arr_keys[pos_clipped] == probe
+            found = _as_int64(values)[pos_clipped]
+            return [int(v) if h else None for v, h in zip(found.tolist(), hit.tolist())]
+        out: List[Optional[int]] = []
+        for k in packed:
+            i = bisect_left(keys, k)
+            out.append(values[i] if i < n and keys[i] == k else None)
+        return out
+
+    # ── Lotes ────────────────────────────────────────────────────────────────
+
+    def get_many(self, keys: Iterable[Key]) -> Dict[Key, int]:
+        keys = list(dict.fromkeys(keys))
+        packed = [self._pack(k) for k in keys]
+        with self._lock:
+            pending = self._pending
+            found = self._lookup_sorted(packed)
+            result: Dict[Key, int] = {}
+            for key, p, value in zip(keys, packed, found):
+                value = pending.get(p, value)
+                if value is not None:
+                    result[key] = value
+        return result
+
+    def put_many(self, items: Iterable[Tuple[Key, int]]):
+        packed = {self._pack(k): v for k, v in items}
+        if not packed:
+            return
+        with self._lock:
+            self._pending.update(packed)
+            if len(self._pending) >= max(_MIN_PENDING, len(self._keys) // 8):
+                self._merge_pending()
+
+    def clear_all(self):
+        with self._lock:
+            self._keys = array("q")
+            self._values = array("q")
+            self._pending = {}
+
+    # ── Interfaz tipo dict (una clave) ───────────────────────────────────────
+
+    def get(self, key: Key, default: Optional[int] = None) -> Optional[int]:
+        return self.get_many([key]).get(key, default)
+
+    def __getitem__(self, key: Key) -> int:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: Key, value: int):
+        self.put_many([(key, value)])
+
+    def __contains__(self, key: Key) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._merge_pending()
+            return len(self._keys)
+
+    def items(self) -> Iterator[Tuple[Key, int]]:
+        with self._lock:
+            self._merge_pending()
+            keys, values = self._keys, self._values
+        for packed, value in zip(keys, values):
+            yield self._unpack(packed), value
+
+
+class IdMapStore:
+    """Archivo SQLite con todos los mapas de una migración (una tabla, un índice)."""
+
+    def __init__(self, path: str = DEFAULT_ID_MAP_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS id_map (
+                name  TEXT    NOT NULL,
+                k1    INTEGER NOT NULL,
+                k2    INTEGER NOT NULL,
+                value INTEGER NOT NULL,
+                PRIMARY KEY (name, k1, k2)
+            ) WITHOUT ROWID
+            """
+        )
+
+    def map(self, name: str, arity: int = 1) -> "PersistentIdMap":
+        return PersistentIdMap(self, name, arity)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PersistentIdMap:
+    """
+    Mapa con nombre dentro de un IdMapStore. Las claves son int (arity=1)
+    o tuplas de dos int (arity=2), p. ej. (usuario.id, usuario.dni).
+    """
+
+    def __init__(self, store: IdMapStore, name: str, arity: int = 1):
+        if arity not in (1, 2):
+            raise ValueError("arity debe ser 1 o 2")
+        self.store = store
+        self.name = name
+        self.arity = arity
+
+    def _split(self, key: Key) -> Tuple[int, int]:
+        return (key, 0) if self.arity == 1 else (key[0], key[1])
+
+    def _join(self, k1: int, k2: int) -> Key:
+        return k1 if self.arity == 1 else (k1, k2)
+
+    # ── Lotes ────────────────────────────────────────────────────────────────
+
+    def get_many(self, keys: Iterable[Key]) -> Dict[Key, int]:
+        """{clave → id} de las claves presentes, consultando en bloques."""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[Key, int] = {}
+        with self.store._lock:
+            for i in range(0, len(keys), _SQLITE_CHUNK):
+                chunk = [self._split(k) for k in keys[i:i + _SQLITE_CHUNK]]
+                placeholders = ",".join("(?,?)" for _ in chunk)
+                params: List[int] = [self.name]
+                for k1, k2 in chunk:
+                    params += [k1, k2]
+                rows = self.store._conn.execute(
+                    f"SELECT k1, k2, value FROM id_map"
+                    f" WHERE name = ? AND (k1, k2) IN (VALUES {placeholders})",
+                    params,
+                )
+                for k1, k2, value in rows:
+                    found[self._join(k1, k2)] = value
+        return found
+
+    def put_many(self, items: Iterable[Tuple[Key, int]]):
+        rows = [(self.name, *self._split(k), v) for k, v in items]
+        if not rows:
+            return
+        with self.store._lock:
+            conn = self.store._conn
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR REPLACE INTO id_map (name, k1, k2, value) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+
+    def clear_all(self):
+        with self.store._lock:
+            self.store._conn.execute("DELETE FROM id_map WHERE name = ?", (self.name,))
+
+    # ── Interfaz tipo dict (una clave) ───────────────────────────────────────
+
+    def get(self, key: Key, default: Optional[int] = None) -> Optional[int]:
+        return self.get_many([key]).get(key, default)
+
+    def __getitem__(self, key: Key) -> int:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: Key, value: int):
+        self.put_many([(key, value)])
+
+    def __contains__(self, key: Key) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        with self.store._lock:
+            return self.store._conn.execute(
+                "SELECT COUNT(*) FROM id_map WHERE name = ?", (self.name,)
+            ).fetchone()[0]
+
+    def items(self, page_size: int = 10000) -> Iterator[Tuple[Key, int]]:
+        """Recorre el mapa por páginas ordenadas, sin cargarlo entero."""
+        last = (-(2 ** 63), -(2 ** 63))
+        while True:
+            with self.store._lock:
+                rows = self.store._conn.execute(
+                    "SELECT k1, k2, value FROM id_map"
+                    " WHERE name = ? AND (k1, k2) > (?, ?)"
+                    " ORDER BY k1, k2 LIMIT ?",
+                    (self.name, last[0], last[1], page_size),
+                ).fetchall()
+            if not rows:
+                return
+            for k1, k2, value in rows:
+                yield self._join(k1, k2), value
+            last = (rows[-1][0], rows[-1][1])
+
+
+class SpillableIdMap:
+    """
+    CompactIdMap que puede pasarse a disco en caliente con spill(). La
+    copia se hace con las altas bloqueadas; las lecturas en curso terminan
+    sobre el mapa en memoria, que se suelta sin vaciarlo.
+    """
+
+    def __init__(self, arity: int = 1):
+        self.arity = arity
+        self._map: Union[CompactIdMap, PersistentIdMap] = CompactIdMap(arity)
+        self._write_lock = threading.Lock()
+
+    @property
+    def spilled(self) -> bool:
+        return isinstance(self._map, PersistentIdMap)
+
+    def spill(self, target: PersistentIdMap, page_size: int = 10000) -> int:
+        """Copia el mapa a `target` y lo usa desde ahora. Devuelve las entradas copiadas."""
+        with self._write_lock:
+            if self.spilled:
+                return 0
+            copied = 0
+            page: List[Tuple[Key, int]] = []
+            for item in self._map.items():
+                page.append(item)
+                if len(page) >= page_size:
+                    target.put_many(page)
+                    copied += len(page)
+                    page = []
+            target.put_many(page)
+            copied += len(page)
+            self._map = target
+            return copied
+
+    def get_many(self, keys: Iterable[Key]) -> Dict[Key, int]:
+        return self._map.get_many(keys)
+
+    def put_many(self, items: Iterable[Tuple[Key, int]]):
+        with self._write_lock:
+            self._map.put_many(items)
+
+    def clear_all(self):
+        with self._write_lock:
+            self._map.clear_all()
+
+    def get(self, key: Key, default: Optional[int] = None) -> Optional[int]:
+        return self._map.get(key, default)
+
+    def __getitem__(self, key: Key) -> int:
+        return self._map[key]
+
+    def __setitem__(self, key: Key, value: int):
+        self.put_many([(key, value)])
+
+    def __contains__(self, key: Key) -> bool:
+        return key in self._map
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def items(self) -> Iterator[Tuple[Key, int]]:
+        return self._map.items()
+
+
+class UuidKeyMap:
+    """
+    Mapa del modo extracción (--extract): toda clave ERP "existe" y su valor
+    es el uuid determinista de la fila destino, que la carga (--load)
+    resuelve a un id de PostgreSQL con un JOIN. Las altas se ignoran.
+    """
+
+    def __init__(self, to_uuid: Callable[[Key], str]):
+        self.to_uuid = to_uuid
+
+    def get_many(self, keys: Iterable[Key]) -> Dict[Key, str]:
+        return {k: self.to_uuid(k) for k in dict.fromkeys(keys)}
+
+    def put_many(self, items: Iterable[Tuple[Key, int]]):
+        pass
+
+    def clear_all(self):
+        pass
+
+    def get(self, key: Key, default: Optional[str] = None) -> Optional[str]:
+        return self.to_uuid(key)
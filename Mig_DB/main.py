@@ -21,6 +21,7 @@ SCRIPTS = {
     "2": ("diagnostic_tool_mejorado.py", "Diagnóstico avanzado MariaDB"),
     "3": ("migration_mariadb.py",        "Migración MariaDB → PostgreSQL"),
     "4": ("setup.py",                    "Instalación y configuración"),
+    "7": ("benchmark.py",                "Benchmark con datos sintéticos (10k)"),
 }
 
 # Archivos de documentación
@@ -77,7 +78,7 @@ def main():
         clear_screen()
         print_menu()
 
-        choice = input("  Selecciona una opcion (0-6): ").strip()
+        choice = input("  Selecciona una opcion (0-7): ").strip()
 
         if choice == "0":
             print("\n  Hasta luego.\n")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Métricas de rendimiento de la migración.
+
+Por cada paso se acumulan tramos por fase:
+
+  extract    consultas keyset a MariaDB (bytes = Bytes_sent de la sesión)
+  transform  armado de tuplas en Python
+  load       INSERT / COPY en PostgreSQL (bytes = tamaño de la sentencia o
+             del buffer COPY); incluye las búsquedas de IDs del lote
+  lookup     SELECT ... = ANY(%s) para recuperar IDs (subconjunto de load)
+  commit     COMMIT de cada lote
+
+Al terminar se escribe un reporte JSON junto a migration_mariadb.log para
+comparar ejecuciones entre sí.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPORT_PREFIX = "migration_report"
+PHASES = ("extract", "transform", "load", "lookup", "commit")
+
+
+class Span:
+    """Tramo en curso: quien lo abre puede anotar filas y bytes."""
+
+    __slots__ = ("rows", "nbytes")
+
+    def __init__(self):
+        self.rows = 0
+        self.nbytes = 0
+
+
+class RunMetrics:
+    """Acumulador {paso → {fase → segundos, llamadas, filas, bytes}}, seguro entre hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phases: Dict[str, Dict[str, Dict[str, float]]] = {}
+
+    def add(
+        self,
+        step: str,
+        phase: str,
+        seconds: float = 0.0,
+        calls: int = 1,
+        rows: int = 0,
+        nbytes: int = 0,
+    ):
+        with self._lock:
+            entry = self._phases.setdefault(step, {}).setdefault(
+                phase, {"seconds": 0.0, "calls": 0, "rows": 0, "bytes": 0}
+            )
+            entry["seconds"] += seconds
+            entry["calls"] += calls
+            entry["rows"] += rows
+            entry["bytes"] += nbytes
+
+    @contextmanager
+    def phase(self, step: str, phase: str, rows: int = 0) -> Iterator[Span]:
+        span = Span()
+        span.rows = rows
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            self.add(step, phase, time.perf_counter() - start,
+                     rows=span.rows, nbytes=span.nbytes)
+
+    def merge(self, data: Dict[str, Dict[str, Dict[str, float]]]):
+        """Suma las métricas de otro proceso (modo particionado)."""
+        for step, phases in data.items():
+            for phase, entry in phases.items():
+                self.add(step, phase, entry["seconds"], entry["calls"],
+                         entry["rows"], entry["bytes"])
+
+    def as_dict(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        with self._lock:
+            return {
+                step: {
+                    phase: dict(entry, seconds=round(entry["seconds"], 4))
+                    for phase, entry in phases.items()
+                }
+                for step, phases in self._phases.items()
+            }
+
+
+def peak_memory_mb(children: bool = False) -> Optional[float]:
+    """Memoria residente máxima del proceso (o de sus hijos), None si no se puede medir."""
+    if resource is None:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux informa KiB; macOS, bytes
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def current_memory_mb() -> Optional[float]:
+    """Memoria residente actual del proceso (Linux, /proc/self/statm); None si no se puede medir."""
+    try:
+        with open("/proc/self/statm") as fh:
+            pages = int(fh.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+
+
+def report_path(started_at: datetime) -> str:
+    return f"{REPORT_PREFIX}_{started_at:%Y%m%d_%H%M%S}.json"
+
+
+def write_report(path: str, report: Dict):
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, ensure_ascii=False, default=str)
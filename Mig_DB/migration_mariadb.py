@@ -4,21 +4,57 @@
 Migración ERP (MariaDB) → ALMA_BE_V2 (PostgreSQL)
 Tablas cubiertas: roles, users, user_roles, profiles,
                   profile_dni, profile_addresses, profile_employment, profile_family
+Con --academic, en el esquema de DB_ALMA_V2 (MIGRATION_SETTINGS['academic_schema']):
+                  users, branches, academic_programs, subjects,
+                  academic_groups, classes, enrollments, attendance_records
 """
 
+import os
 import sys
 import io
+import time
+import shutil
+import tempfile
+import argparse
 import uuid
+import threading
 import traceback
 import logging
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, Tuple, Optional
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Tuple, Optional
 
 import mysql.connector
 from mysql.connector import Error as MySQLError
 import psycopg2
 from psycopg2.extras import execute_values
 
+from config import CUSTOM_MAPPINGS, MIGRATION_SETTINGS
+from batch_sizer import BatchSizer
+from checkpoint import DEFAULT_CHECKPOINT_FILE, CheckpointStore
+from checksum import RowHasher, column_types, content_hash
+from connections import (
+    ConnectionPool, ReconnectingCursor, backoff_delay, is_transient, needs_reconnect,
+)
+from copy_loader import CopyLoader
+import deferred_ddl
+from deferred_ddl import DEFERRED_DDL_KEY
+from pipeline import run_pipeline
+from profiling import StepProfiler
+from mapping_engine import CompiledMapping, compile_mapping
+from metrics import RunMetrics, current_memory_mb, peak_memory_mb, report_path, write_report
+from id_map_store import (
+    DEFAULT_ID_MAP_FILE, CompactIdMap, IdMapStore, SpillableIdMap, UuidKeyMap,
+)
+from offline_files import (
+    ID_MAPS_COLUMNS, ID_MAPS_DATASET, ExtractWriter, open_part, read_manifest, read_rows,
+)
+from scheduler import Step, critical_path, run_dag
+
 # Forzar UTF-8 en consola Windows
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
 
@@ -34,52 +70,344 @@ logger = logging.getLogger(__name__)
 
 NOW = datetime.now()
 
+# Columnas destino por tabla (orden de las tuplas que arma cada paso)
+ROLES_COLUMNS = ("uuid", "name", "description", '"default"', "created_at", "updated_at")
+USERS_COLUMNS = (
+    "uuid", "provider_auth_id", "email", "status",
+    "is_email_verified", "created_at", "updated_at",
+)
+USER_ROLES_COLUMNS = ("user_id", "role_id", "created_at")
+PROFILES_COLUMNS = (
+    "uuid", "user_id", "dni", "first_name", "middle_name",
+    "last_name", "second_last_name", "gender", "birth_date",
+    "phone", "mobile", "avatar_url", "created_at", "updated_at",
+)
+PROFILE_ADDRESSES_COLUMNS = (
+    "uuid", "profile_id", "country", "state", "city",
+    '"adressType"', "is_primary", "address_line", "neighborhood",
+    "created_at", "updated_at",
+)
+PROFILE_EMPLOYMENT_COLUMNS = (
+    "uuid", "profile_id", "occupation", "company_name", "company_phone",
+    "start_date", "end_date", "created_at", "updated_at",
+)
+PROFILE_FAMILY_COLUMNS = (
+    "uuid", "profile_id", "marital_status", "children_count",
+    "created_at", "updated_at",
+)
+PROFILE_DNI_COLUMNS = (
+    "uuid", "profile_id", '"dniType"', "expedition_date",
+    "birthdate", "is_current", "created_at", "updated_at",
+)
+
+# Esquema DB_ALMA_V2 (--academic): los IDs de personas, sedes y programas
+# son uuid y las FK a personas apuntan a alma.users(id)
+ALMA_USERS_COLUMNS = (
+    "id", "first_name", "last_name", "document_type", "document_number",
+    "email", "phone", "address", "gender", "birthdate", "is_active",
+    "created_at", "updated_at",
+)
+BRANCHES_COLUMNS = (
+    "id", "name", "address", "city", "state", "country", "phone", "email",
+    "is_active", "created_at", "updated_at",
+)
+ACADEMIC_PROGRAMS_COLUMNS = ("id", "name", "description", "is_active", "created_at")
+SUBJECTS_COLUMNS = (
+    "id", "program_id", "name", "description", "is_active", "created_at", "updated_at",
+)
+ACADEMIC_GROUPS_COLUMNS = (
+    "id", "subject_id", "branch_id", "name", "status",
+    "professor_id", "created_at", "updated_at",
+)
+CLASSES_COLUMNS = (
+    "id", "group_id", "status", "recording_link", "start_class", "end_class",
+)
+ENROLLMENTS_COLUMNS = ("group_id", "student_id", "enrollment_date", "status")
+ATTENDANCE_COLUMNS = ("class_id", "student_id", "status", "attendance_type", "created_at")
+
+ROLES_CONFLICT = "ON CONFLICT (uuid) DO UPDATE SET name = EXCLUDED.name"
+USER_ROLES_CONFLICT = "ON CONFLICT (user_id, role_id) DO NOTHING"
+
+LOAD_ENGINES = ("values", "copy", "staging")
+
+PARTITIONS_KEY = "_partitions"
+
+# Tablas destino cuyos índices secundarios y FK difiere --defer-indexes
+# (las del esquema académico conservan los suyos: sus pasos descartan
+# antes de cargar las filas que violarían una FK)
+DEFERRED_DDL_TABLES = (
+    "roles", "users", "user_roles", "profiles",
+    "profile_addresses", "profile_employment", "profile_family", "profile_dni",
+)
+
+# Pasos académicos (--academic, esquema DB_ALMA_V2): primero personas y
+# catálogos (sede, programa, materia), leídos enteros; después grupo →
+# clase → matricula_materia / asistencia_clase, repartidos en rangos de
+# grupo cuyos cortes van al checkpoint
+ACADEMIC_CATALOG_STEPS = ("alma_users", "branches", "academic_programs", "subjects")
+ACADEMIC_STEPS = ("academic_groups", "classes", "enrollments", "attendance_records")
+
+# Programa al que quedan asignadas las materias sin fila en programa_x_materia
+# (subjects.program_id es NOT NULL)
+NO_PROGRAM = 0
+GROUP_RANGES_KEY = "_group_ranges"
+
+# Estado del ERP (texto de est_*) → estado de ALMA, por palabra clave
+GROUP_STATUS_RULES = (
+    (("CANCEL", "ANUL"), "cancelled"),
+    (("FINALIZ", "TERMIN", "CERRAD"), "finished"),
+)
+CLASS_STATUS_RULES = (
+    (("CANCEL", "ANUL"), "cancelled"),
+    (("DICTAD", "REALIZ", "FINALIZ", "TERMIN"), "completed"),
+)
+ENROLLMENT_STATUS_RULES = (
+    (("RETIR", "CANCEL", "ANUL"), "withdrawn"),
+    (("APROB", "FINALIZ", "TERMIN", "CURSAD"), "completed"),
+)
+ATTENDANCE_TYPES = {"PRESCENCIAL": "in_person", "VIRTUAL": "virtual", "VIDEO": "makeup"}
+
+# Tablas que compara --verify (las de --extract con uuid)
+VERIFY_DATASETS = (
+    "roles", "users", "profiles", "profile_addresses",
+    "profile_employment", "profile_family", "profile_dni",
+)
+# Columnas fuera de las sumas de --verify y de las huellas de
+# --skip-unchanged: se completan con la hora de la ejecución si faltan
+VOLATILE_COLUMNS = ("created_at", "updated_at")
+
+# Huellas de contenido por fila migrada (--skip-unchanged), en el destino
+ROW_HASHES_TABLE = "migration_row_hashes"
+VERIFY_SAMPLE = 1000  # uuids por tabla y tipo de diferencia en el reporte
+
+# Destinos alimentados por `usuario`, en orden de dependencia FK
+USUARIO_FANOUT_STEPS = (
+    "users", "profiles", "profile_addresses",
+    "profile_employment", "profile_family", "profile_dni",
+)
+
 
 def det_uuid(namespace: str, key: str) -> str:
     """UUID determinista: misma entrada → mismo UUID en cada ejecución."""
     return str(uuid.uuid5(uuid.NAMESPACE_OID, f"{namespace}:{key}"))
 
 
+def alma_table(table: str) -> str:
+    """`table` calificada con el esquema académico (MIGRATION_SETTINGS['academic_schema'])."""
+    return f"{MIGRATION_SETTINGS['academic_schema']}.{table}"
+
+
+def class_id(grupo: int, clase: int) -> int:
+    """
+    ID destino de una clase: (grupo, clase) empaquetados en un entero
+    (clase es tinyint). Las asistencias calculan su class_id sin consultar
+    a PostgreSQL y la reejecución cae en el mismo ON CONFLICT (id).
+    """
+    return (grupo << 8) | clase
+
+
+def estado_status(estado: Optional[str], rules: Tuple, default: str) -> str:
+    """Texto de una tabla est_* del ERP → estado de ALMA según `rules`."""
+    text = (estado or "").upper()
+    for words, status in rules:
+        if any(word in text for word in words):
+            return status
+    return default
+
+
 class MariaDBMigrator:
     def __init__(
         self,
         mariadb_config: Dict,
         postgres_config: Dict,
         limit: Optional[int] = None,
+        batch_size: int = MIGRATION_SETTINGS["batch_size"],
+        load_engine: str = "values",
+        fanout: bool = False,
+        workers: int = 1,
+        resume: bool = False,
+        checkpoint_path: str = DEFAULT_CHECKPOINT_FILE,
+        delta: bool = False,
+        id_map_path: Optional[str] = None,
+        partitions: int = 1,
+        queue_size: int = MIGRATION_SETTINGS["queue_size"],
+        defer_indexes: bool = False,
+        mappings: Optional[Dict[str, Dict]] = None,
+        skip_unchanged: bool = False,
+        adaptive_batch: bool = False,
+        profile: bool = False,
+        profile_dir: Optional[str] = None,
+        profile_stacks: bool = False,
+        memory_budget_mb: Optional[int] = MIGRATION_SETTINGS["memory_budget_mb"],
+        academic: bool = False,
     ):
+        if load_engine not in LOAD_ENGINES:
+            raise ValueError(f"load_engine inválido: {load_engine!r}")
+
         self.mariadb_config = mariadb_config
         self.postgres_config = postgres_config
         self.limit = limit          # None = todos los registros | int = cantidad máxima
-        self.mariadb_conn = None
-        self.postgres_conn = None
+        self.batch_size = batch_size  # filas por lote keyset (y por transacción)
+        # Lote adaptativo: por paso, hacia la latencia de carga objetivo dentro
+        # de los límites de MIGRATION_SETTINGS (batch_sizer.py); batch_size es
+        # el tamaño inicial
+        self.adaptive_batch = adaptive_batch
+        self._sizers: Dict[str, BatchSizer] = {}
+        self.queue_size = queue_size  # lotes en vuelo entre etapas del pipeline (0 = secuencial)
+        # "values" (execute_values) | "copy" (COPY + merge) | "staging" (COPY +
+        # merge, y la cadena de `usuario` traduce sus FK con JOIN en PostgreSQL)
+        self.load_engine = load_engine
+        self.fanout = fanout        # True = una sola lectura de `usuario` para todos los pasos
+        self.workers = workers      # hilos para pasos independientes (1 = secuencial)
+        self.resume = resume        # True = saltar pasos terminados y retomar marcas de agua
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint = CheckpointStore(checkpoint_path)
+        self.id_map_path = id_map_path
+        # Modo delta: solo filas con updated_at/created_at posteriores a la
+        # última sincronización, aplicadas con upsert por uuid
+        self.delta = delta
+        self.delta_since: Optional[datetime] = None
+        self.sync_started_at: Optional[datetime] = None
+        # Modo particionado: `usuario` se reparte en rangos disjuntos de
+        # (id, dni) y cada rango recorre users → profiles → profile_* en un
+        # proceso propio. `partition` es el rango (después de, hasta) que
+        # atiende este proceso; None en el proceso principal.
+        self.partitions = partitions
+        self.partition: Optional[Tuple[Optional[tuple], Optional[tuple]]] = None
+        # Carga masiva: índices secundarios y FK de las tablas destino se
+        # eliminan antes de cargar y se reconstruyen al final (deferred_ddl.py)
+        self.defer_indexes = defer_indexes
+        # Reejecuciones: cada fila con uuid guarda una huella de contenido en
+        # ROW_HASHES_TABLE y solo se envían las nuevas o cambiadas
+        self.skip_unchanged = skip_unchanged
+        # Esquema académico (DB_ALMA_V2): personas, sedes, programas, materias,
+        # grupos, clases, matrículas y asistencias en el esquema
+        # MIGRATION_SETTINGS['academic_schema'] del mismo destino
+        self.academic = academic
+        # Perfilado: cada paso bajo cProfile (y muestreo de pilas con
+        # profile_stacks) en profile_dir, por defecto profile_<inicio>/
+        self.profile = profile
+        self.profile_dir = profile_dir
+        self.profile_stacks = profile_stacks
+        self.profiler: Optional[StepProfiler] = None
+        # Modo desconectado: "extract" (solo MariaDB → archivos) o "load"
+        # (archivos → solo PostgreSQL); None = migración directa
+        self.offline: Optional[str] = None
+        self.offline_dir: Optional[str] = None
+
+        # Conexiones por hilo: cada worker del planificador toma las suyas
+        # de un pool por base y las devuelve al terminar (connections.py)
+        self._local = threading.local()
+        self._pools = {
+            "mariadb": ConnectionPool(
+                "mariadb", self._connect_mariadb_raw,
+                lambda conn: conn.ping(reconnect=False),
+                MIGRATION_SETTINGS["pool_size"], MIGRATION_SETTINGS["health_check_seconds"],
+            ),
+            "postgres": ConnectionPool(
+                "postgres", self._connect_postgres_raw, self._ping_postgres,
+                MIGRATION_SETTINGS["pool_size"], MIGRATION_SETTINGS["health_check_seconds"],
+                reset=lambda conn: conn.rollback(),
+            ),
+        }
+        self._stats_lock = threading.Lock()
+        # Stats anotados por el lote en curso de cada hilo (ver _batch_stats)
+        self._batch_local = threading.local()
+
+        # Presupuesto de memoria (MB residentes de este proceso): al superarlo
+        # los mapas de IDs pasan a un SQLite temporal y, si no alcanza, se
+        # reduce el lote a la mitad (ver _check_memory)
+        self.memory_budget_mb = memory_budget_mb
+        self._spill_store: Optional[IdMapStore] = None
+        self._spill_dir: Optional[str] = None
+        self._batch_cap: Optional[int] = None
+        self._memory_wait = 0  # lotes hasta la próxima medida tras actuar
 
         # ── Mapas ERP-ID → PostgreSQL-ID (construidos durante la migración)
-        self.role_id_map: Dict[int, int] = {}
+        # En memoria (arrays compactos) por defecto; con id_map_path viven
+        # en un SQLite local que sobrevive entre ejecuciones (--resume, --delta)
+        self.id_store: Optional[IdMapStore] = (
+            IdMapStore(id_map_path) if id_map_path else None
+        )
+
+        self.role_id_map = self._new_id_map("role")
         # {erp_roles.id → pg_roles.id}
 
-        self.erp_auth_user_map: Dict[int, int] = {}
+        self.erp_auth_user_map = self._new_id_map("auth_user")
         # {erp_users.id → pg_users.id}  (para mapear model_has_roles)
 
-        self.usuario_id_map: Dict[Tuple[int, int], int] = {}
+        self.usuario_id_map = self._new_id_map("usuario", arity=2)
         # {(erp_usuario.id, erp_usuario.dni) → pg_users.id}
 
-        self.profile_id_map: Dict[Tuple[int, int], int] = {}
+        self.profile_id_map = self._new_id_map("profile", arity=2)
         # {(erp_usuario.id, erp_usuario.dni) → pg_profiles.id}
 
+        # ── Mapeos declarativos (config.CUSTOM_MAPPINGS, ver mapping_engine.py)
+        # Se compilan aquí: una especificación inválida falla antes de conectar
+        specs = CUSTOM_MAPPINGS if mappings is None else mappings
+        self.mappings: Dict[str, CompiledMapping] = {
+            name: compile_mapping(name, spec, det_uuid)
+            for name, spec in specs.items() if not spec.get("skip")
+        }
+        self.mapping_id_maps = {
+            m.map_name: self._new_id_map(m.map_name, arity=len(m.uuid[1]))
+            for m in self.mappings.values() if m.map_name
+        }
+
         # ── Tablas de referencia ERP (IDs → nombres legibles)
         self.pais_map: Dict[int, str] = {}
         self.provincia_map: Dict[int, str] = {}
         self.t_dni_map: Dict[int, str] = {}       # id → abreviacion (CC, CE, ...)
         self.t_est_civil_map: Dict[int, str] = {}  # id → tipo
         self.t_ocupacion_map: Dict[int, str] = {}  # id → tipo
+        self.est_grupo_map: Dict[int, str] = {}      # id → estado
+        self.est_clase_map: Dict[int, str] = {}      # id → estado
+        self.est_matricula_map: Dict[int, str] = {}  # id → estado (matricula_materia)
 
         self.stats = {
             "migrated_tables": 0,
             "total_records": 0,
             "migrated_records": 0,
             "errors": [],
+            "quarantined": [],   # (tabla, uuid, error) filas desviadas al camino lento
+            "skipped": {},       # paso → filas sin mapeo FK
+            "unchanged": {},     # paso → filas no enviadas (--skip-unchanged)
+            "pipeline": {},      # paso → esperas por etapa del pipeline
+            "reconnects": {},    # paso → lotes repetidos tras un error transitorio
+            "memory": {"spilled": {}, "batch_cuts": []},  # acciones de --memory-budget
             "start_time": datetime.now(),
         }
+        self.metrics = RunMetrics()  # tiempos por paso y fase → reporte JSON
+        self.report_file: Optional[str] = None
+
+    def _new_id_map(self, name: str, arity: int = 1):
+        if self.id_store is not None:
+            return self.id_store.map(name, arity)
+        if self.memory_budget_mb:
+            return SpillableIdMap(arity)
+        return CompactIdMap(arity)
+
+    def _id_maps(self) -> Dict[str, object]:
+        return {
+            "role": self.role_id_map,
+            "auth_user": self.erp_auth_user_map,
+            "usuario": self.usuario_id_map,
+            "profile": self.profile_id_map,
+            **self.mapping_id_maps,
+        }
+
+    def _id_map_sources(self) -> Dict[str, Tuple[str, str]]:
+        """{mapa → (tabla destino, namespace del uuid)} para completar mapas desde PostgreSQL."""
+        return {
+            "role": ("roles", "role"),
+            "auth_user": ("users", "auth_user"),
+            "usuario": ("users", "usuario"),
+            "profile": ("profiles", "profile"),
+            **{
+                m.map_name: (m.target, m.uuid[0])
+                for m in self.mappings.values() if m.map_name
+            },
+        }
 
     # ──────────────────────────────────────────────────────────────────────────
     # Conexiones
@@ -89,15 +417,62 @@ class MariaDBMigrator:
 
     # ──────────────────────────────────────────────────────────────────────────
 
+    @property
+    def mariadb_conn(self):
+        return getattr(self._local, "mariadb_conn", None)
+
+    @mariadb_conn.setter
+    def mariadb_conn(self, conn):
+        self._local.mariadb_conn = conn
+
+    @property
+    def postgres_conn(self):
+        return getattr(self._local, "postgres_conn", None)
+
+    @postgres_conn.setter
+    def postgres_conn(self, conn):
+        self._local.postgres_conn = conn
+
+    def _connect_mariadb_raw(self):
+        return mysql.connector.connect(
+            **self.mariadb_config,
+            autocommit=True,
+            use_pure=True,
+            get_warnings=True,
+        )
+
+    def _connect_postgres_raw(self):
+        conn = psycopg2.connect(**self.postgres_config)
+        conn.autocommit = False
+        return conn
+
+    @staticmethod
+    def _ping_postgres(conn):
+        if conn.closed:
+            raise psycopg2.InterfaceError("conexión cerrada")
+        cur = conn.cursor()
+        cur.execute("SELECT 1")
+        cur.close()
+        conn.rollback()
+
+    def _open_mariadb(self):
+        return self._pools["mariadb"].acquire()
+
+    def _open_postgres(self):
+        return self._pools["postgres"].acquire()
+
     def connect(self) -> bool:
+        """Abre las conexiones que necesita el modo (ambas fuera del modo desconectado)."""
+        if self.offline != "load" and not self._connect_mariadb():
+            return False
+        if self.offline != "extract" and not self._connect_postgres():
+            return False
+        return True
+
+    def _connect_mariadb(self) -> bool:
         try:
             logger.info("Conectando a MariaDB...")
-            self.mariadb_conn = mysql.connector.connect(
-                **self.mariadb_config,
-                autocommit=True,
-                use_pure=True,
-                get_warnings=True,
-            )
+            self.mariadb_conn = self._open_mariadb()
             cur = self.mariadb_conn.cursor()
             cur.execute("SELECT VERSION()")
             version = cur.fetchone()[0]
@@ -106,11 +481,12 @@ class MariaDBMigrator:
         except MySQLError as err:
             logger.error(f"✗ MariaDB: {err}")
             return False
+        return True
 
+    def _connect_postgres(self) -> bool:
         try:
             logger.info("Conectando a PostgreSQL...")
-            self.postgres_conn = psycopg2.connect(**self.postgres_config)
-            self.postgres_conn.autocommit = False
+            self.postgres_conn = self._open_postgres()
             cur = self.postgres_conn.cursor()
             cur.execute("SELECT version()")
             cur.fetchone()
@@ -122,11 +498,194 @@ class MariaDBMigrator:
 
         return True
 
+    def _ensure_thread_connections(self):
+        """Abre las conexiones propias del hilo actual si aún no las tiene."""
+        if self.mariadb_conn is None and self.offline != "load":
+            self.mariadb_conn = self._open_mariadb()
+        if self.postgres_conn is None and self.offline != "extract":
+            self.postgres_conn = self._open_postgres()
+
+    def _pool_of(self, conn) -> ConnectionPool:
+        return self._pools["postgres" if isinstance(conn, psycopg2.extensions.connection) else "mariadb"]
+
+    def _close_conn(self, conn):
+        """Devuelve `conn` a su pool (la cierra si sobra o quedó inservible)."""
+        self._pool_of(conn).release(conn)
+
+    def _reconnect(self, database: str):
+        """Descarta la conexión `database` del hilo actual y toma una sana del pool."""
+        if database == "mariadb":
+            if self.mariadb_conn is not None:
+                self._pools["mariadb"].discard(self.mariadb_conn)
+            self.mariadb_conn = None
+            self.mariadb_conn = self._open_mariadb()
+        else:
+            if self.postgres_conn is not None:
+                self._pools["postgres"].discard(self.postgres_conn)
+            self.postgres_conn = None
+            self.postgres_conn = self._open_postgres()
+
+    def _rollback_postgres(self):
+        """
+        Deshace la transacción del hilo. Si la conexión se cayó la descarta:
+        el próximo paso del hilo toma otra (_ensure_thread_connections).
+        """
+        conn = self.postgres_conn
+        if conn is None:
+            return
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            self._pools["postgres"].discard(conn)
+            self.postgres_conn = None
+
+    def _pg_cursor(self) -> ReconnectingCursor:
+        """Cursor de PostgreSQL de un paso: sobrevive a las reconexiones del hilo."""
+        return ReconnectingCursor(lambda: self.postgres_conn)
+
+    def _with_retry(self, step: str, database: str, action: Callable):
+        """
+        Ejecuta `action()`; si falla por un error transitorio (connections.py)
+        la repite, hasta retry_attempts veces con espera exponencial. Tras
+        una caída de conexión reabre la conexión `database` del hilo; tras
+        un interbloqueo o conflicto de serialización solo deshace la
+        transacción y repite sobre la misma. `action` tiene que poder
+        repetirse entera: un lote sin confirmar o una consulta keyset.
+        """
+        attempts = MIGRATION_SETTINGS["retry_attempts"]
+        attempt = 0
+        reconnect = False
+        while True:
+            try:
+                if attempt:
+                    if reconnect:
+                        self._reconnect(database)
+                    else:
+                        self._reset_transaction(database)
+                return action()
+            except Exception as err:
+                if attempt >= attempts or not is_transient(err):
+                    raise
+                reconnect = needs_reconnect(err)
+                delay = backoff_delay(attempt, MIGRATION_SETTINGS["retry_backoff_seconds"])
+                attempt += 1
+                reason = (str(err).strip() or type(err).__name__).splitlines()[0]
+                logger.warning(
+                    f"  ⟳ {step}: {database} — {reason};"
+                    f" {'reconectando y repitiendo' if reconnect else 'repitiendo'}"
+                    f" en {delay:.0f}s ({attempt}/{attempts})"
+                )
+                if reconnect:
+                    with self._stats_lock:
+                        self.stats["reconnects"][step] = (
+                            self.stats["reconnects"].get(step, 0) + 1
+                        )
+                time.sleep(delay)
+
+    def _reset_transaction(self, database: str):
+        """Deshace la transacción abortada del hilo; si no se puede, reconecta."""
+        if database == "mariadb":
+            try:
+                if self.mariadb_conn is not None:
+                    self.mariadb_conn.rollback()
+                    return
+            except MySQLError:
+                pass
+        else:
+            self._rollback_postgres()
+            if self.postgres_conn is not None:
+                return
+        self._reconnect(database)
+
     def disconnect(self):
-        if self.mariadb_conn:
-            self.mariadb_conn.close()
-        if self.postgres_conn:
-            self.postgres_conn.close()
+        for pool in self._pools.values():
+            pool.close_all()
+        if self.id_store is not None:
+            self.id_store.close()
+            self.id_store = None
+        if self._spill_store is not None:
+            self._spill_store.close()
+            self._spill_store = None
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    # ──────────────────────────────────────────────────────────────────────────
+    # Presupuesto de memoria (--memory-budget)
+    # ──────────────────────────────────────────────────────────────────────────
+
+    def _check_memory(self, step: str):
+        """
+        Después de cada lote: si la memoria residente supera el presupuesto,
+        primero vuelca los mapas de IDs a disco; si ya estaban volcados,
+        reduce el lote a la mitad (hasta batch_size_min). Tras actuar espera
+        memory_check_batches lotes antes de volver a medir, para que la
+        medida refleje el cambio.
+        """
+        with self._stats_lock:
+            if self._memory_wait > 0:
+                self._memory_wait -= 1
+                return
+        # Fuera del lock: leer /proc no debe frenar a los demás pasos
+        used = current_memory_mb()
+        if used is None or used <= self.memory_budget_mb:
+            return
+        with self._stats_lock:
+            if self._memory_wait > 0:
+                return  # otro paso ya actuó con esta misma medida
+            self._memory_wait = MIGRATION_SETTINGS["memory_check_batches"]
+            pending = {
+                name: m for name, m in self._id_maps().items()
+                if isinstance(m, SpillableIdMap) and not m.spilled
+            }
+        if pending:
+            self._spill_id_maps(step, used, pending)
+        else:
+            self._cut_batch_size(step, used)
+
+    def _spill_id_maps(self, step: str, used: float, maps: Dict[str, SpillableIdMap]):
+        if self._spill_store is None:
+            self._spill_dir = tempfile.mkdtemp(
+                prefix="migration_spill_", dir=MIGRATION_SETTINGS["spill_dir"]
+            )
+            self._spill_store = IdMapStore(os.path.join(self._spill_dir, "id_maps.sqlite"))
+        logger.warning(
+            f"  ⚠ {step}: {used:.0f} MB > presupuesto {self.memory_budget_mb} MB;"
+            f" volcando mapas de IDs a {self._spill_dir}"
+        )
+        for name, id_map in maps.items():
+            copied = id_map.spill(self._spill_store.map(name, id_map.arity))
+            with self._stats_lock:
+                self.stats["memory"]["spilled"][name] = copied
+            logger.warning(f"    mapa {name}: {copied} entradas en disco")
+
+    def _cut_batch_size(self, step: str, used: float):
+        with self._stats_lock:
+            smaller = max(MIGRATION_SETTINGS["batch_size_min"], self.batch_size // 2)
+            if smaller >= self.batch_size:
+                logger.warning(
+                    f"  ⚠ {step}: {used:.0f} MB > presupuesto {self.memory_budget_mb} MB;"
+                    f" el lote ya está en el mínimo ({self.batch_size})"
+                )
+                return
+            logger.warning(
+                f"  ⚠ {step}: {used:.0f} MB > presupuesto {self.memory_budget_mb} MB;"
+                f" lote {self.batch_size} → {smaller}"
+            )
+            self.stats["memory"]["batch_cuts"].append((step, self.batch_size, smaller))
+            self.batch_size = self._batch_cap = smaller
+            for sizer in self._sizers.values():
+                sizer.cap(smaller)
+
+    def _memory_report(self) -> Optional[Dict]:
+        if not self.memory_budget_mb:
+            return None
+        return {
+            "budget_mb": self.memory_budget_mb,
+            "spilled": self.stats["memory"]["spilled"],
+            "batch_cuts": self.stats["memory"]["batch_cuts"],
+            "final_batch_size": self.batch_size,
+        }
 
     # ──────────────────────────────────────────────────────────────────────────
     # Tablas de referencia
@@ -141,6 +700,9 @@ class MariaDBMigrator:
             ("provincia",   "provincia_map",   "id", "nombre"),
             ("t_est_civil", "t_est_civil_map", "id", "tipo"),
             ("t_ocupacion", "t_ocupacion_map", "id", "tipo"),
+            ("est_grupo",   "est_grupo_map",   "id", "estado"),
+            ("est_clase",   "est_clase_map",   "id", "estado"),
+            ("est_matricula_materia", "est_matricula_map", "id", "estado"),
         ]:
             try:
                 cur.execute(f"SELECT {key_col}, {val_col} FROM {table}")
@@ -163,6 +725,743 @@ class MariaDBMigrator:
     # Helpers
     # ──────────────────────────────────────────────────────────────────────────
 
+    def _iter_keyset(
+        self,
+        table: str,
+        columns: str,
+        keys: Tuple[str, ...] = ("id", "dni"),
+        where: str = "",
+        limit: Optional[int] = None,
+        start_after: Optional[tuple] = None,
+        step: Optional[str] = None,
+    ) -> Iterator[List[Dict]]:
+        """
+        Recorre `table` por paginación keyset: cada página es una consulta
+        ORDER BY <keys> LIMIT batch_size que arranca después de la última
+        clave leída. Ninguna consulta mantiene abierto un cursor largo en
+        MariaDB y la memoria usada no depende del tamaño de la tabla.
+
+        La condición (id, dni) > (%s, %s) se escribe expandida porque MariaDB
+        no convierte la comparación de filas en un rango sobre la PK.
+        `start_after` retoma el recorrido desde una marca de agua guardada.
+        El tiempo de cada consulta se mide como fase extract de `step`. Con
+        --adaptive-batch cada consulta pide el tamaño actual del paso.
+        """
+        step = step or table
+        sizer = self._batch_sizer(step) if self.adaptive_batch else None
+        last_key: Optional[tuple] = start_after
+        remaining = limit
+        bytes_before = self._mariadb_bytes_sent()
+
+        def fetch_page(sql: str, params: list) -> List[Dict]:
+            cur = self.mariadb_conn.cursor(dictionary=True)
+            try:
+                cur.execute(sql, params)
+                return cur.fetchall()
+            finally:
+                cur.close()
+
+        try:
+            while remaining is None or remaining > 0:
+                batch = sizer.size if sizer else self.batch_size
+                size = batch if remaining is None else min(batch, remaining)
+                conditions = [where] if where else []
+                params: list = []
+                if last_key is not None:
+                    conditions.append(self._keyset_condition(keys))
+                    params = self._keyset_params(last_key)
+                sql = f"""
+                    SELECT {columns}
+                    FROM {table}
+                    {"WHERE " + " AND ".join(conditions) if conditions else ""}
+                    ORDER BY {", ".join(keys)}
+                    LIMIT {size}
+                    """
+                with self.metrics.phase(step, "extract") as span:
+                    # Una caída de MariaDB repite la misma página desde last_key
+                    rows = self._with_retry(
+                        step, "mariadb", lambda: fetch_page(sql, params)
+                    )
+                    span.rows = len(rows)
+                if not rows:
+                    break
+                yield rows
+                last_key = tuple(rows[-1][k] for k in keys)
+                if remaining is not None:
+                    remaining -= len(rows)
+                if len(rows) < size:
+                    break
+        finally:
+            if bytes_before is not None:
+                bytes_after = self._mariadb_bytes_sent()
+                # Tras una reconexión el contador de la sesión nueva arranca de cero
+                if bytes_after is not None and bytes_after >= bytes_before:
+                    self.metrics.add(step, "extract", calls=0,
+                                     nbytes=bytes_after - bytes_before)
+
+    def _batch_sizer(self, step: str) -> BatchSizer:
+        """BatchSizer de `step` (se crea con el primer lote del paso)."""
+        with self._stats_lock:
+            sizer = self._sizers.get(step)
+            if sizer is None:
+                sizer = self._sizers[step] = BatchSizer(
+                    self.batch_size,
+                    MIGRATION_SETTINGS["batch_size_min"],
+                    MIGRATION_SETTINGS["batch_size_max"],
+                    MIGRATION_SETTINGS["batch_target_seconds"],
+                )
+                if self._batch_cap is not None:
+                    sizer.cap(self._batch_cap)
+            return sizer
+
+    def _mariadb_bytes_sent(self) -> Optional[int]:
+        """Bytes enviados por MariaDB a esta sesión (None si no se pudo leer)."""
+        try:
+            cur = self.mariadb_conn.cursor()
+            cur.execute("SHOW SESSION STATUS LIKE 'Bytes_sent'")
+            row = cur.fetchone()
+            cur.close()
+            return int(row[1]) if row else None
+        except MySQLError:
+            return None
+
+    @staticmethod
+    def _keyset_condition(keys: Tuple[str, ...]) -> str:
+        """(a, b) > (x, y)  →  a > x OR (a = x AND b > y)"""
+        if len(keys) == 1:
+            return f"{keys[0]} > %s"
+        first, rest = keys[0], keys[1:]
+        return (
+            f"({first} > %s OR ({first} = %s"
+            f" AND {MariaDBMigrator._keyset_condition(rest)}))"
+        )
+
+    @staticmethod
+    def _keyset_params(last_key: tuple) -> list:
+        if len(last_key) == 1:
+            return [last_key[0]]
+        return [last_key[0], last_key[0]] + MariaDBMigrator._keyset_params(last_key[1:])
+
+    def _delta_condition(self) -> str:
+        """Filtro SQL del modo delta (vacío en una carga completa)."""
+        if not self.delta or self.delta_since is None:
+            return ""
+        since = self.delta_since.strftime("%Y-%m-%d %H:%M:%S")
+        return f"updated_at > '{since}' OR created_at > '{since}'"
+
+    def _partition_condition(self) -> str:
+        """Rango (id, dni) de la partición de este proceso (vacío fuera del modo particionado)."""
+        if self.partition is None:
+            return ""
+        after, upto = self.partition
+        conditions = []
+        if after is not None:
+            erp_id, dni = int(after[0]), int(after[1])
+            conditions.append(f"id > {erp_id} OR (id = {erp_id} AND dni > {dni})")
+        if upto is not None:
+            erp_id, dni = int(upto[0]), int(upto[1])
+            conditions.append(f"id < {erp_id} OR (id = {erp_id} AND dni <= {dni})")
+        return self._and_where(*conditions)
+
+    def _on_conflict(
+        self, target: Optional[str], columns: Tuple[str, ...], upsert: str = "uuid"
+    ) -> str:
+        """
+        Cláusula ON CONFLICT de un paso. En carga completa las filas existentes
+        se dejan como están; en modo delta se actualizan (upsert por `upsert`,
+        el uuid salvo en las tablas académicas, que no lo tienen).
+        `target` None = cualquier restricción UNIQUE (caso de profiles).
+        """
+        if not self.delta:
+            return f"ON CONFLICT ({target}) DO NOTHING" if target else "ON CONFLICT DO NOTHING"
+        return self._upsert_clause(columns, upsert)
+
+    @staticmethod
+    def _upsert_clause(columns: Tuple[str, ...], upsert: str = "uuid") -> str:
+        """ON CONFLICT (upsert) DO UPDATE de todas las columnas salvo la clave y created_at."""
+        keys = upsert.split(", ")
+        updates = ", ".join(
+            f"{c} = EXCLUDED.{c}" for c in columns if c not in keys and c != "created_at"
+        )
+        return f"ON CONFLICT ({upsert}) DO UPDATE SET {updates}"
+
+    @staticmethod
+    def _and_where(*conditions: str) -> str:
+        return " AND ".join(f"({c})" for c in conditions if c)
+
+    def _stream_usuario(
+        self, columns: str, step: str, where: str = "", limited: bool = True
+    ) -> Iterator[List[Dict]]:
+        """
+        Lotes de `usuario` ordenados por (id, dni), respetando self.limit.
+        Con --resume arranca después de la marca de agua del paso.
+        """
+        start_after = None
+        limit = self.limit if limited else None
+        if self.resume:
+            start_after = self.checkpoint.watermark(step)
+            if start_after is not None:
+                logger.info(f"  Retomando {step} después de {start_after}")
+                if limit is not None:
+                    limit = max(limit - self.checkpoint.rows_done(step), 0)
+        return self._iter_keyset(
+            "usuario", columns,
+            where=self._and_where(where, self._delta_condition(), self._partition_condition()),
+            limit=limit, start_after=start_after, step=step,
+        )
+
+    def _commit_batch(self, step: str, rows: List[Dict], keys: Tuple[str, ...] = ("id", "dni")):
+        """
+        Confirma en PostgreSQL el lote recién cargado de `step` y mueve su
+        marca de agua en el checkpoint (solo después del COMMIT).
+        """
+        with self.metrics.phase(step, "commit"):
+            self.postgres_conn.commit()
+        last_key = tuple(rows[-1][k] for k in keys)
+        self.checkpoint.advance(step, last_key, len(rows))
+        logger.debug(f"  {step}: lote confirmado hasta {last_key}")
+
+    def _usuario_specs(self) -> Dict[str, Dict]:
+        """
+        Pasos alimentados por `usuario`, en orden de dependencia FK.
+
+          columns   columnas de `usuario` que necesita el paso
+          where     filtro SQL del paso cuando se ejecuta por separado
+          accept    el mismo filtro evaluado en Python (lectura única / fan-out)
+          limited   si se aplica self.limit (los pasos hijos dependen de
+                    profile_id_map, que ya quedó acotado por el límite)
+          transform lote de filas → carga
+          load      (pg_cur, carga) → filas migradas
+        """
+        def child_loader(table: str, columns: Tuple[str, ...], conflict: str):
+            return lambda pg_cur, to_insert: self._load_rows(
+                pg_cur, table, columns, to_insert, self._on_conflict(conflict, columns),
+            )
+
+        specs = {
+            "users": {
+                "columns": ("id", "dni", "email", "vigente", "email_verified_at",
+                            "created_at", "updated_at"),
+                "where": "",
+                "accept": None,
+                "limited": True,
+                "transform": self._transform_users,
+                "load": self._load_users,
+            },
+            "profiles": {
+                "columns": ("id", "dni", "nombre1", "nombre2", "apellido1", "apellido2",
+                            "genero", "fecha_nacimiento", "telefono", "celular", "imagen",
+                            "created_at", "updated_at"),
+                "where": "",
+                "accept": None,
+                "limited": True,
+                "transform": self._transform_profiles,
+                "load": self._load_profiles,
+            },
+            "profile_addresses": {
+                "columns": ("id", "dni", "pais", "provincia", "ciudad", "direccion",
+                            "barrio", "created_at", "updated_at"),
+                "where": "pais IS NOT NULL OR ciudad IS NOT NULL OR direccion IS NOT NULL",
+                "accept": lambda u: (
+                    u["pais"] is not None
+                    or u["ciudad"] is not None
+                    or u["direccion"] is not None
+                ),
+                "limited": False,
+                "transform": self._transform_profile_addresses,
+                "load": child_loader(
+                    "profile_addresses", PROFILE_ADDRESSES_COLUMNS, "uuid"
+                ),
+            },
+            "profile_employment": {
+                "columns": ("id", "dni", "ocupacion", "empresa", "telefono_empresa",
+                            "fecha_ingreso_empresa", "created_at", "updated_at"),
+                "where": "empresa IS NOT NULL OR ocupacion IS NOT NULL",
+                "accept": lambda u: u["empresa"] is not None or u["ocupacion"] is not None,
+                "limited": False,
+                "transform": self._transform_profile_employment,
+                "load": child_loader(
+                    "profile_employment", PROFILE_EMPLOYMENT_COLUMNS, "uuid"
+                ),
+            },
+            "profile_family": {
+                "columns": ("id", "dni", "est_civil", "cant_hijos",
+                            "created_at", "updated_at"),
+                "where": "est_civil IS NOT NULL OR cant_hijos IS NOT NULL",
+                "accept": lambda u: u["est_civil"] is not None or u["cant_hijos"] is not None,
+                "limited": False,
+                "transform": self._transform_profile_family,
+                "load": child_loader(
+                    "profile_family", PROFILE_FAMILY_COLUMNS, "profile_id"
+                ),
+            },
+            "profile_dni": {
+                "columns": ("id", "dni", "fecha_nacimiento", "created_at", "updated_at"),
+                "where": "",
+                "accept": None,
+                "limited": False,
+                "transform": self._transform_profile_dni,
+                "load": child_loader("profile_dni", PROFILE_DNI_COLUMNS, "uuid"),
+            },
+        }
+        if self.load_engine == "staging" and self.offline is None:
+            self._stage_usuario_specs(specs)
+        return specs
+
+    def _stage_usuario_specs(self, specs: Dict[str, Dict]):
+        """
+        load_engine "staging": la cadena de `usuario` deja de traducir FK en
+        Python. Los transformadores reciben mapas de uuid (como en --extract)
+        y la carga copia el lote a staging y lo fusiona con un INSERT ...
+        SELECT que resuelve user_id / profile_id con un JOIN por uuid contra
+        users / profiles (CopyLoader.merge_refs). Tampoco se consulta el
+        destino para llenar usuario_id_map y profile_id_map: los pasos que
+        los necesitan después los completan por uuid (_fill_missing_ids).
+        Un lote que el merge rechaza se reenvía fila a fila y las filas
+        culpables van a cuarentena (_send_rows), como en _insert_profiles_batch.
+        """
+        user_refs = UuidKeyMap(lambda k: det_uuid("usuario", f"{k[0]}_{k[1]}"))
+        profile_refs = UuidKeyMap(lambda k: det_uuid("profile", f"{k[0]}_{k[1]}"))
+
+        def staged_loader(step: str, columns: Tuple[str, ...], conflict: Optional[str], refs):
+            return lambda pg_cur, to_insert: self._load_rows(
+                pg_cur, step, columns, to_insert, self._on_conflict(conflict, columns),
+                step=step, refs=refs,
+            )
+
+        specs["users"]["load"] = lambda pg_cur, payload: self._load_rows(
+            pg_cur, "users", USERS_COLUMNS, payload[0],
+            self._on_conflict("provider_auth_id", USERS_COLUMNS), step="users",
+        )
+        specs["profiles"]["transform"] = (
+            lambda rows: self._transform_profiles(rows, user_refs)[0]
+        )
+        specs["profiles"]["load"] = staged_loader(
+            "profiles", PROFILES_COLUMNS, None, {"user_id": "users"},
+        )
+        for step, columns, conflict in (
+            ("profile_addresses", PROFILE_ADDRESSES_COLUMNS, "uuid"),
+            ("profile_employment", PROFILE_EMPLOYMENT_COLUMNS, "uuid"),
+            ("profile_family", PROFILE_FAMILY_COLUMNS, "profile_id"),
+            ("profile_dni", PROFILE_DNI_COLUMNS, "uuid"),
+        ):
+            specs[step]["transform"] = partial(specs[step]["transform"], profile_map=profile_refs)
+            specs[step]["load"] = staged_loader(step, columns, conflict, {"profile_id": "profiles"})
+
+    def _run_usuario_step(self, step: str) -> bool:
+        """
+        Ejecuta un paso alimentado por `usuario`: por cada lote keyset aplica
+        transform(rows) → carga, load(pg_cur, carga) → filas migradas, y
+        confirma. Cada lote es su propia transacción en PostgreSQL.
+        """
+        spec = self._usuario_specs()[step]
+        logger.info("\n" + "=" * 60)
+        logger.info(f"MIGRANDO: {step}")
+        try:
+            pg_cur = self._pg_cursor()
+
+            def load(rows: List[Dict], to_insert):
+                return {"migrated": spec["load"](pg_cur, to_insert), "total": len(rows)}
+
+            counts = self._pipeline_usuario(
+                step, spec["columns"], load, transform=spec["transform"],
+                where=spec["where"], limited=spec["limited"],
+            )
+            migrated, total = counts["migrated"], counts["total"]
+
+            pg_cur.close()
+
+            self._record_step(migrated, total)
+            logger.info(f"✓ {migrated}/{total} {step}{self._step_detail(step)}")
+            return True
+
+        except Exception as err:
+            self._rollback_postgres()
+            logger.error(f"✗ {step}: {err}")
+            traceback.print_exc()
+            self.stats["errors"].append(f"{step}: {err}")
+            return False
+
+    def _pipeline_usuario(
+        self,
+        step: str,
+        columns: Tuple[str, ...],
+        load: Callable[[List[Dict], object], Optional[Dict]],
+        transform: Optional[Callable[[List[Dict]], object]] = None,
+        where: str = "",
+        limited: bool = True,
+        commit: bool = True,
+    ) -> Counter:
+        """
+        Recorre `usuario` para `step` solapando lectura, transformación y
+        carga (ver pipeline.py): load(lote, transform(lote)) corre en este
+        hilo y después se confirma el lote (commit=False en --extract, donde
+        no hay transacción). La lectura usa una conexión a MariaDB propia
+        del hilo lector, que se cierra al terminar. Devuelve la suma de los
+        contadores que devuelve `load` (ver _pipeline_batches).
+        """
+        return self._pipeline_batches(
+            step,
+            lambda: self._stream_usuario(", ".join(columns), step, where=where, limited=limited),
+            load, transform=transform, commit=commit,
+        )
+
+    def _pipeline_batches(
+        self,
+        step: str,
+        batches: Callable[[], Iterator[List[Dict]]],
+        load: Callable[[List[Dict], object], Optional[Dict]],
+        transform: Optional[Callable[[List[Dict]], object]] = None,
+        keys: Tuple[str, ...] = ("id", "dni"),
+        commit: bool = True,
+    ) -> Counter:
+        """
+        Cuerpo de _pipeline_usuario para cualquier fuente keyset: `batches`
+        se invoca en el hilo lector y cada lote se confirma con su última
+        clave `keys` como marca de agua.
+
+        `load` devuelve los contadores del lote ({nombre → cantidad}) y no
+        los acumula por su cuenta: _with_retry puede repetir un lote entero,
+        así que los contadores (y los stats anotados con _batch_stats) se
+        suman recién cuando el lote quedó confirmado. Devuelve la suma.
+        """
+        counts: Counter = Counter()
+
+        def batches_in_thread():
+            self.mariadb_conn = self._open_mariadb()
+            try:
+                yield from batches()
+            finally:
+                # La del final: una reconexión pudo reemplazar la inicial
+                if self.mariadb_conn is not None:
+                    self._close_conn(self.mariadb_conn)
+                self.mariadb_conn = None
+
+        def timed_transform(rows: List[Dict]):
+            with self.metrics.phase(step, "transform", rows=len(rows)):
+                return transform(rows)
+
+        sizer = self._batch_sizer(step) if self.adaptive_batch else None
+
+        def load_once(rows: List[Dict], payload):
+            with self._batch_stats() as batch_stats:
+                if transform:
+                    with self.metrics.phase(step, "load", rows=len(rows)):
+                        batch_counts = load(rows, payload)
+                else:
+                    batch_counts = load(rows, payload)  # el propio load mide sus fases
+                if commit:
+                    self._commit_batch(step, rows, keys=keys)
+            return batch_counts, batch_stats
+
+        def load_and_commit(rows: List[Dict], payload):
+            started = time.perf_counter()
+            if commit:
+                # El lote no confirmado se repite entero sobre una conexión nueva
+                batch_counts, batch_stats = self._with_retry(
+                    step, "postgres", lambda: load_once(rows, payload),
+                )
+            else:
+                batch_counts, batch_stats = load_once(rows, payload)
+            self._apply_batch_stats(batch_stats)
+            counts.update(batch_counts or {})
+            if sizer:
+                sizer.observe(len(rows), time.perf_counter() - started)
+            if self.memory_budget_mb:
+                self._check_memory(step)
+
+        stats = run_pipeline(
+            batches_in_thread if self.queue_size > 0 else batches,
+            load_and_commit,
+            transform=timed_transform if transform else None,
+            queue_size=self.queue_size,
+            thread_wrapper=self.profiler.attach if self.profiler is not None else None,
+        )
+        with self._stats_lock:
+            self.stats["pipeline"][step] = stats.as_dict()
+        if self.queue_size > 0:
+            logger.info(f"  pipeline {step}: {stats.summary()}")
+        if sizer:
+            logger.info(f"  lotes {step}: {sizer.summary()}")
+        return counts
+
+    @contextmanager
+    def _batch_stats(self):
+        """
+        Abre el registro de stats del lote que carga este hilo: mientras
+        está abierto, _count_stat y _quarantine anotan ahí en vez de en
+        self.stats. Si el intento falla, el registro se descarta con él.
+        """
+        batch_stats = {"skipped": Counter(), "unchanged": Counter(), "quarantined": []}
+        self._batch_local.stats = batch_stats
+        try:
+            yield batch_stats
+        finally:
+            self._batch_local.stats = None
+
+    def _apply_batch_stats(self, batch_stats: Dict):
+        """Suma a self.stats lo anotado por un lote ya confirmado."""
+        with self._stats_lock:
+            for kind in ("skipped", "unchanged"):
+                for step, count in batch_stats[kind].items():
+                    self.stats[kind][step] = self.stats[kind].get(step, 0) + count
+            self.stats["quarantined"] += batch_stats["quarantined"]
+
+    def _count_stat(self, kind: str, step: str, count: int):
+        """Suma `count` a stats[kind][step] ("skipped" / "unchanged"), o al lote abierto."""
+        batch_stats = getattr(self._batch_local, "stats", None)
+        if batch_stats is not None:
+            batch_stats[kind][step] += count
+            return
+        with self._stats_lock:
+            self.stats[kind][step] = self.stats[kind].get(step, 0) + count
+
+    def _quarantine(self, table: str, row_uuid, error: BaseException):
+        """Registra una fila rechazada (primera línea del error), o la anota en el lote abierto."""
+        entry = (table, row_uuid, str(error).strip().splitlines()[0])
+        batch_stats = getattr(self._batch_local, "stats", None)
+        if batch_stats is not None:
+            batch_stats["quarantined"].append(entry)
+            return
+        with self._stats_lock:
+            self.stats["quarantined"].append(entry)
+
+    def _record_step(self, migrated: int, total: int, tables: int = 1):
+        """Suma los contadores de un paso terminado (seguro entre hilos)."""
+        with self._stats_lock:
+            self.stats["migrated_tables"] += tables
+            self.stats["migrated_records"] += migrated
+            self.stats["total_records"] += total
+
+    def _step_detail(self, step: str) -> str:
+        """Sufijo del log de resumen: omitidos sin FK y filas en cuarentena."""
+        detail = ""
+        if self.stats["skipped"].get(step):
+            detail += f" (omitidos: {self.stats['skipped'][step]})"
+        if self.stats["unchanged"].get(step):
+            detail += f" (sin cambios: {self.stats['unchanged'][step]})"
+        quarantined = sum(1 for q in self.stats["quarantined"] if q[0] == step)
+        if quarantined:
+            detail += f" (en cuarentena: {quarantined})"
+        return detail
+
+    def _load_rows(
+        self,
+        pg_cur,
+        table: str,
+        columns: Tuple[str, ...],
+        rows: List[tuple],
+        conflict: str,
+        step: Optional[str] = None,
+        engine: Optional[str] = None,
+        refs: Optional[Dict[str, str]] = None,
+    ) -> int:
+        """
+        Inserta un lote con el motor configurado (execute_values o COPY), o
+        con `engine` si el paso lo fija. Los bytes enviados se anotan en la
+        fase load de `step` (o de `table`). Con --skip-unchanged las filas
+        con uuid pasan antes por _load_changed_rows. `refs` = {columna →
+        tabla}: FK que llegan como uuid y se resuelven en PostgreSQL
+        (CopyLoader.merge_refs); las filas sin referencia se omiten.
+        Devuelve las filas aceptadas.
+        """
+        if not rows:
+            return 0
+        if self.skip_unchanged and columns[0] == "uuid":
+            return self._load_changed_rows(
+                pg_cur, table, columns, rows, conflict, step, engine, refs,
+            )
+        return self._send_rows(pg_cur, table, columns, rows, conflict, step, engine, refs)
+
+    def _send_rows(
+        self,
+        pg_cur,
+        table: str,
+        columns: Tuple[str, ...],
+        rows: List[tuple],
+        conflict: str,
+        step: Optional[str],
+        engine: Optional[str],
+        refs: Optional[Dict[str, str]] = None,
+        rejected: Optional[set] = None,
+    ) -> int:
+        """
+        Envía el lote bajo un SAVEPOINT. Si el motor falla por una fila
+        (NOT NULL, FK, CHECK, otra UNIQUE distinta del conflicto) se vuelve
+        al SAVEPOINT y se reenvía fila a fila: las culpables quedan en
+        stats["quarantined"] y el resto del lote se carga igual. Los errores
+        transitorios se propagan para repetir el lote entero (_with_retry).
+        `rejected` recibe la primera columna (uuid) de las filas en cuarentena.
+        """
+        if not rows:
+            return 0
+        step = step or table
+        pg_cur.execute("SAVEPOINT sp_send")
+        try:
+            accepted, nbytes = self._send_batch(pg_cur, table, columns, rows, conflict, engine, refs)
+            pg_cur.execute("RELEASE SAVEPOINT sp_send")
+            failed = 0
+        except psycopg2.Error as err:
+            if is_transient(err):
+                raise
+            pg_cur.execute("ROLLBACK TO SAVEPOINT sp_send")
+            pg_cur.execute("RELEASE SAVEPOINT sp_send")
+            logger.warning(
+                f"  {step}: lote de {len(rows)} rechazado ({str(err).strip().splitlines()[0]});"
+                " reintentando fila a fila"
+            )
+            accepted, nbytes, failed = self._send_rows_one_by_one(
+                pg_cur, table, columns, rows, conflict, step, engine, refs, rejected,
+            )
+        if refs and accepted < len(rows) - failed:
+            self._count_stat("skipped", step, len(rows) - failed - accepted)
+        self.metrics.add(step, "load", calls=0, nbytes=nbytes)
+        return accepted
+
+    def _send_batch(
+        self,
+        pg_cur,
+        table: str,
+        columns: Tuple[str, ...],
+        rows: List[tuple],
+        conflict: str,
+        engine: Optional[str],
+        refs: Optional[Dict[str, str]],
+    ) -> Tuple[int, int]:
+        """Un envío con el motor del paso → (filas aceptadas, bytes enviados)."""
+        if refs:
+            loader = CopyLoader(pg_cur)
+            accepted, _ = loader.merge_refs(table, columns, rows, conflict, refs)
+            return accepted, loader.bytes_sent
+        if (engine or self.load_engine) in ("copy", "staging"):
+            loader = CopyLoader(pg_cur)
+            loader.merge(table, columns, rows, conflict)
+            return len(rows), loader.bytes_sent
+        execute_values(
+            pg_cur,
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s {conflict}",
+            rows,
+            page_size=len(rows),
+        )
+        return len(rows), len(pg_cur.query or b"")
+
+    def _send_rows_one_by_one(
+        self,
+        pg_cur,
+        table: str,
+        columns: Tuple[str, ...],
+        rows: List[tuple],
+        conflict: str,
+        step: str,
+        engine: Optional[str],
+        refs: Optional[Dict[str, str]],
+        rejected: Optional[set] = None,
+    ) -> Tuple[int, int, int]:
+        """Camino lento de _send_rows → (aceptadas, bytes, filas en cuarentena)."""
+        accepted = nbytes = failed = 0
+        for row in rows:
+            pg_cur.execute("SAVEPOINT sp_row")
+            try:
+                row_accepted, row_bytes = self._send_batch(
+                    pg_cur, table, columns, [row], conflict, engine, refs,
+                )
+                pg_cur.execute("RELEASE SAVEPOINT sp_row")
+            except psycopg2.Error as err:
+                if is_transient(err):
+                    raise
+                pg_cur.execute("ROLLBACK TO SAVEPOINT sp_row")
+                pg_cur.execute("RELEASE SAVEPOINT sp_row")
+                failed += 1
+                # Un rango de grupo (`<paso>:<rango>`) se informa bajo su paso
+                self._quarantine(step.split(":")[0], row[0], err)
+                if rejected is not None:
+                    rejected.add(row[0])
+                continue
+            accepted += row_accepted
+            nbytes += row_bytes
+        return accepted, nbytes, failed
+
+    def _load_changed_rows(
+        self,
+        pg_cur,
+        table: str,
+        columns: Tuple[str, ...],
+        rows: List[tuple],
+        conflict: str,
+        step: Optional[str],
+        engine: Optional[str],
+        refs: Optional[Dict[str, str]] = None,
+    ) -> int:
+        """
+        --skip-unchanged: compara la huella de cada fila con la guardada en
+        ROW_HASHES_TABLE (una consulta por lote) y envía solo las nuevas,
+        con la cláusula del paso, y las cambiadas, con DO UPDATE por uuid.
+        Las huellas se actualizan en la misma transacción que las filas y
+        solo para las que quedaron en el destino: una nueva descartada por
+        otra UNIQUE (DO NOTHING), sin sus `refs` o en cuarentena (p. ej. una
+        cambiada cuyo dni choca con el de otra fila) no guarda huella y se
+        vuelve a enviar en la próxima ejecución. Devuelve las filas del lote
+        (enviadas o ya al día) menos las que no llegaron al destino.
+        """
+        step = step or table
+        positions = [i for i, c in enumerate(columns) if c not in VOLATILE_COLUMNS]
+        hashes = [content_hash([row[i] for i in positions]) for row in rows]
+        with self.metrics.phase(step, "lookup", rows=len(rows)):
+            stored = dict(self._fetch_any(
+                pg_cur,
+                f"SELECT uuid, hash FROM {ROW_HASHES_TABLE}"
+                " WHERE table_name = %s AND uuid = ANY(%s)",
+                [row[0] for row in rows], table,
+            ))
+
+        new, changed, hash_rows = [], [], []
+        for row, row_hash in zip(rows, hashes):
+            previous = stored.get(row[0])
+            if previous == row_hash:
+                continue
+            (new if previous is None else changed).append(row)
+            hash_rows.append((table, row[0], row_hash))
+
+        sent = len(new) + len(changed)
+        rejected: set = set()
+        self._send_rows(pg_cur, table, columns, new, conflict, step, engine, refs, rejected)
+        self._send_rows(
+            pg_cur, table, columns, changed, self._upsert_clause(columns), step, engine, refs,
+            rejected,
+        )
+        if hash_rows:
+            with self.metrics.phase(step, "lookup", rows=len(hash_rows)):
+                present = {row[0] for row in self._fetch_any(
+                    pg_cur, f"SELECT uuid FROM {table} WHERE uuid = ANY(%s)",
+                    [h[1] for h in hash_rows if h[1] not in rejected],
+                )}
+            hash_rows = [h for h in hash_rows if h[1] in present]
+        if hash_rows:
+            execute_values(
+                pg_cur,
+                f"INSERT INTO {ROW_HASHES_TABLE} (table_name, uuid, hash) VALUES %s"
+                " ON CONFLICT (table_name, uuid) DO UPDATE SET hash = EXCLUDED.hash",
+                hash_rows,
+                page_size=len(hash_rows),
+            )
+        unchanged = len(rows) - sent
+        if unchanged:
+            self._count_stat("unchanged", step, unchanged)
+        return unchanged + len(hash_rows)
+
+    def _ensure_row_hashes_table(self):
+        """Crea ROW_HASHES_TABLE en el destino si no existe (--skip-unchanged)."""
+        pg_cur = self.postgres_conn.cursor()
+        pg_cur.execute(
+            f"CREATE TABLE IF NOT EXISTS {ROW_HASHES_TABLE} ("
+            " table_name text NOT NULL,"
+            " uuid text NOT NULL,"
+            " hash char(32) NOT NULL,"
+            " PRIMARY KEY (table_name, uuid))"
+        )
+        self.postgres_conn.commit()
+        pg_cur.close()
+
     def _insert_one_with_savepoint(self, pg_cur, sql: str, params: tuple) -> Optional[int]:
         """
         Inserta una fila usando un SAVEPOINT para aislar errores de constraint.
@@ -179,6 +1478,70 @@ class MariaDBMigrator:
             pg_cur.execute("RELEASE SAVEPOINT sp_row")
             return None
 
+    def _insert_profiles_batch(self, pg_cur, profile_rows: List[tuple]) -> Dict[str, int]:
+        """
+        Inserta un lote de profiles en una sola sentencia y devuelve {uuid → id}.
+
+        Camino rápido: un INSERT multi-fila con RETURNING id, uuid; los perfiles
+        que ya existían (reejecución) se recuperan con un único SELECT por uuid.
+        Sin destino de conflicto, cualquier UNIQUE (uuid, user_id, dni) descarta
+        la fila igual que antes (en modo delta, upsert por uuid). Solo si el
+        lote viola otra restricción (NOT NULL, FK, CHECK) se reintenta fila a
+        fila con SAVEPOINT y las filas culpables quedan en stats["quarantined"].
+        """
+        uuid_to_id: Dict[str, int] = {}
+        conflict = self._on_conflict(None, PROFILES_COLUMNS)
+        sql = f"INSERT INTO profiles ({', '.join(PROFILES_COLUMNS)}) VALUES %s {conflict}"
+
+        pg_cur.execute("SAVEPOINT sp_batch")
+        try:
+            if self.skip_unchanged:
+                # Los IDs de las filas no enviadas salen de la consulta por uuid de abajo
+                self._load_rows(pg_cur, "profiles", PROFILES_COLUMNS, profile_rows, conflict)
+                nbytes = 0
+            elif self.load_engine == "copy":
+                loader = CopyLoader(pg_cur)
+                loader.merge("profiles", PROFILES_COLUMNS, profile_rows, conflict)
+                nbytes = loader.bytes_sent
+            else:
+                returned = execute_values(
+                    pg_cur, sql + " RETURNING id, uuid", profile_rows,
+                    page_size=len(profile_rows), fetch=True,
+                )
+                nbytes = len(pg_cur.query or b"")
+                uuid_to_id.update({row[1]: row[0] for row in returned})
+            pg_cur.execute("RELEASE SAVEPOINT sp_batch")
+            self.metrics.add("profiles", "load", calls=0, nbytes=nbytes)
+        except psycopg2.Error as err:
+            if is_transient(err):
+                raise  # conexión caída: se repite el lote entero (_with_retry)
+            pg_cur.execute("ROLLBACK TO SAVEPOINT sp_batch")
+            pg_cur.execute("RELEASE SAVEPOINT sp_batch")
+            self._insert_rows_slow_path(pg_cur, "profiles", sql, profile_rows)
+
+        pending = [row[0] for row in profile_rows if row[0] not in uuid_to_id]
+        if pending:
+            with self.metrics.phase("profiles", "lookup", rows=len(pending)):
+                found = self._fetch_any(
+                    pg_cur, "SELECT id, uuid FROM profiles WHERE uuid = ANY(%s)", pending,
+                )
+                uuid_to_id.update({row[1]: row[0] for row in found})
+        return uuid_to_id
+
+    def _insert_rows_slow_path(self, pg_cur, table: str, sql: str, rows: List[tuple]):
+        """Reintenta fila a fila un lote fallido y pone en cuarentena las que fallan."""
+        for row in rows:
+            pg_cur.execute("SAVEPOINT sp_row")
+            try:
+                execute_values(pg_cur, sql, [row])
+                pg_cur.execute("RELEASE SAVEPOINT sp_row")
+            except psycopg2.Error as err:
+                if is_transient(err):
+                    raise
+                pg_cur.execute("ROLLBACK TO SAVEPOINT sp_row")
+                pg_cur.execute("RELEASE SAVEPOINT sp_row")
+                self._quarantine(table, row[0], err)
+
     # ──────────────────────────────────────────────────────────────────────────
     # migrate_roles
     # ──────────────────────────────────────────────────────────────────────────
@@ -191,60 +1554,74 @@ class MariaDBMigrator:
         logger.info("\n" + "=" * 60)
         logger.info("MIGRANDO: roles")
         try:
-            cur = self.mariadb_conn.cursor(dictionary=True)
-            cur.execute(
-                "SELECT id, name, guard_name, created_at, updated_at FROM roles"
-            )
-            rows = cur.fetchall()
-            cur.close()
-
+            rows = self._read_roles()
             if not rows:
-                logger.warning("Sin roles en ERP")
+                logger.warning("Sin roles nuevos" if self.delta else "Sin roles en ERP")
                 return True
 
             pg_cur = self.postgres_conn.cursor()
             migrated = 0
-
-            for r in rows:
-                role_uuid = det_uuid("role", str(r["id"]))
-                pg_id = self._insert_one_with_savepoint(
-                    pg_cur,
-                    """
-                    INSERT INTO roles
-                        (uuid, name, description, "default", created_at, updated_at)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (uuid) DO UPDATE
-                        SET name = EXCLUDED.name
-                    RETURNING id
-                    """,
-                    (
-                        role_uuid,
-                        r["name"],
-                        r.get("guard_name") or "",
-                        False,
-                        r["created_at"] or NOW,
-                        r["updated_at"] or NOW,
-                    ),
-                )
-                if pg_id:
-                    self.role_id_map[r["id"]] = pg_id
-                    migrated += 1
-
-            self.postgres_conn.commit()
+            role_ids: Dict[int, int] = {}
+
+            with self.metrics.phase("roles", "load", rows=len(rows)):
+                for r, values in zip(rows, self._transform_roles(rows)):
+                    pg_id = self._insert_one_with_savepoint(
+                        pg_cur,
+                        f"""
+                        INSERT INTO roles ({", ".join(ROLES_COLUMNS)})
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                        {ROLES_CONFLICT}
+                        RETURNING id
+                        """,
+                        values,
+                    )
+                    if pg_id:
+                        role_ids[r["id"]] = pg_id
+                        migrated += 1
+
+            self.role_id_map.put_many(role_ids.items())
+
+            with self.metrics.phase("roles", "commit"):
+                self.postgres_conn.commit()
             pg_cur.close()
 
-            self.stats["migrated_tables"] += 1
-            self.stats["migrated_records"] += migrated
-            self.stats["total_records"] += len(rows)
+            self._record_step(migrated, len(rows))
             logger.info(f"✓ {migrated}/{len(rows)} roles")
             return True
 
         except Exception as err:
-            self.postgres_conn.rollback()
+            self._rollback_postgres()
             logger.error(f"✗ roles: {err}")
             self.stats["errors"].append(f"roles: {err}")
             return False
 
+    def _read_roles(self) -> List[Dict]:
+        cur = self.mariadb_conn.cursor(dictionary=True)
+        delta = self._delta_condition()
+        with self.metrics.phase("roles", "extract") as span:
+            cur.execute(
+                "SELECT id, name, guard_name, created_at, updated_at FROM roles"
+                + (f" WHERE {delta}" if delta else "")
+            )
+            rows = cur.fetchall()
+            span.rows = len(rows)
+        cur.close()
+        return rows
+
+    @staticmethod
+    def _transform_roles(rows: List[Dict]) -> List[tuple]:
+        return [
+            (
+                det_uuid("role", str(r["id"])),
+                r["name"],
+                r.get("guard_name") or "",
+                False,
+                r["created_at"] or NOW,
+                r["updated_at"] or NOW,
+            )
+            for r in rows
+        ]
+
     # ──────────────────────────────────────────────────────────────────────────
     # migrate_users
     # ──────────────────────────────────────────────────────────────────────────
@@ -262,123 +1639,28 @@ class MariaDBMigrator:
         logger.info("\n" + "=" * 60)
         logger.info("MIGRANDO: users")
         try:
-            pg_cur = self.postgres_conn.cursor()
-
-            # ── 1. Tabla `usuario` (personas reales del ERP)
-            cur = self.mariadb_conn.cursor(dictionary=True)
-            cur.execute(
-                f"""
-                SELECT id, dni, email, vigente,
-                       email_verified_at, created_at, updated_at
-                FROM usuario
-                ORDER BY id, dni
-                {self._limit_sql()}
-                """
-            )
-            usuarios = cur.fetchall()
-            cur.close()
+            pg_cur = self._pg_cursor()
+            spec = self._usuario_specs()["users"]
 
-            rows_usuario = []
-            key_to_provider: Dict[Tuple[int, int], str] = {}
-
-            for u in usuarios:
-                provider_id = f"erp_usuario_{u['id']}_{u['dni']}"
-                email = u["email"] or f"{provider_id}@noemail.local"
-                status = "ACTIVE" if u.get("vigente", 1) else "INACTIVE"
-                u_uuid = det_uuid("usuario", f"{u['id']}_{u['dni']}")
-
-                rows_usuario.append((
-                    u_uuid,
-                    provider_id,
-                    email,
-                    status,
-                    bool(u.get("email_verified_at")),
-                    u["created_at"] or NOW,
-                    u["updated_at"] or NOW,
-                ))
-                key_to_provider[(u["id"], u["dni"])] = provider_id
+            # ── 1. Tabla `usuario` (personas reales del ERP), por lotes keyset
+            def load(usuarios: List[Dict], payload):
+                return {"migrated": spec["load"](pg_cur, payload), "total": len(usuarios)}
 
-            if rows_usuario:
-                execute_values(
-                    pg_cur,
-                    """
-                    INSERT INTO users
-                        (uuid, provider_auth_id, email, status,
-                         is_email_verified, created_at, updated_at)
-                    VALUES %s
-                    ON CONFLICT (provider_auth_id) DO NOTHING
-                    """,
-                    rows_usuario,
-                )
-                # Reconstruir mapa (id, dni) → pg_users.id usando provider_auth_id
-                provider_ids = list(key_to_provider.values())
-                pg_cur.execute(
-                    "SELECT id, provider_auth_id FROM users"
-                    " WHERE provider_auth_id = ANY(%s)",
-                    (provider_ids,),
-                )
-                provider_to_pg = {row[1]: row[0] for row in pg_cur.fetchall()}
-                for key, provider_id in key_to_provider.items():
-                    if provider_id in provider_to_pg:
-                        self.usuario_id_map[key] = provider_to_pg[provider_id]
-
-            # ── 2. Tabla `users` del ERP (auth Laravel → para user_roles)
-            cur2 = self.mariadb_conn.cursor(dictionary=True)
-            cur2.execute(
-                "SELECT id, email, name, email_verified_at, created_at, updated_at"
-                " FROM users"
-            )
-            auth_users = cur2.fetchall()
-            cur2.close()
-
-            rows_auth = []
-            auth_key_to_provider: Dict[int, str] = {}
-
-            for u in auth_users:
-                provider_id = f"erp_auth_{u['id']}"
-                email = u["email"] or f"{provider_id}@noemail.local"
-                u_uuid = det_uuid("auth_user", str(u["id"]))
-
-                rows_auth.append((
-                    u_uuid,
-                    provider_id,
-                    email,
-                    "ACTIVE",
-                    bool(u.get("email_verified_at")),
-                    u["created_at"] or NOW,
-                    u["updated_at"] or NOW,
-                ))
-                auth_key_to_provider[u["id"]] = provider_id
+            counts = self._pipeline_usuario(
+                "users", spec["columns"], load, transform=spec["transform"],
+            )
+            migrated, total = counts["migrated"], counts["total"]
 
-            if rows_auth:
-                execute_values(
-                    pg_cur,
-                    """
-                    INSERT INTO users
-                        (uuid, provider_auth_id, email, status,
-                         is_email_verified, created_at, updated_at)
-                    VALUES %s
-                    ON CONFLICT (provider_auth_id) DO NOTHING
-                    """,
-                    rows_auth,
-                )
-                provider_ids = list(auth_key_to_provider.values())
-                pg_cur.execute(
-                    "SELECT id, provider_auth_id FROM users"
-                    " WHERE provider_auth_id = ANY(%s)",
-                    (provider_ids,),
-                )
-                provider_to_pg = {row[1]: row[0] for row in pg_cur.fetchall()}
-                for erp_id, provider_id in auth_key_to_provider.items():
-                    if provider_id in provider_to_pg:
-                        self.erp_auth_user_map[erp_id] = provider_to_pg[provider_id]
+            # ── 2. Tabla `users` del ERP (auth Laravel → para user_roles).
+            # En modo particionado la migra el proceso principal (users_auth)
+            if self.partition is None:
+                auth_migrated, auth_total = self._migrate_auth_users(pg_cur)
+                migrated += auth_migrated
+                total += auth_total
 
-            self.postgres_conn.commit()
             pg_cur.close()
 
-            self.stats["migrated_tables"] += 1
-            self.stats["migrated_records"] += len(rows_usuario) + len(rows_auth)
-            self.stats["total_records"] += len(usuarios) + len(auth_users)
+            self._record_step(migrated, total)
             logger.info(
                 f"✓ {len(self.usuario_id_map)} personas"
                 f" | {len(self.erp_auth_user_map)} auth users"
@@ -386,12 +1668,182 @@ class MariaDBMigrator:
             return True
 
         except Exception as err:
-            self.postgres_conn.rollback()
+            self._rollback_postgres()
             logger.error(f"✗ users: {err}")
             traceback.print_exc()
             self.stats["errors"].append(f"users: {err}")
             return False
 
+    def migrate_auth_users(self) -> bool:
+        """ERP users → ALMA users (solo auth). Paso propio del modo particionado."""
+        logger.info("\n" + "=" * 60)
+        logger.info("MIGRANDO: users (auth)")
+        try:
+            pg_cur = self._pg_cursor()
+            migrated, total = self._migrate_auth_users(pg_cur)
+            pg_cur.close()
+
+            self._record_step(migrated, total, tables=0)
+            logger.info(f"✓ {migrated}/{total} auth users")
+            return True
+
+        except Exception as err:
+            self._rollback_postgres()
+            logger.error(f"✗ users_auth: {err}")
+            traceback.print_exc()
+            self.stats["errors"].append(f"users_auth: {err}")
+            return False
+
+    def _migrate_auth_users(self, pg_cur) -> Tuple[int, int]:
+        """Tabla `users` del ERP por lotes keyset. Devuelve (migrados, leídos)."""
+        migrated = 0
+        total = 0
+        for auth_users in self._iter_keyset(
+            "users",
+            "id, email, name, email_verified_at, created_at, updated_at",
+            keys=("id",),
+            where=self._and_where(self._delta_condition()),
+            start_after=self.checkpoint.watermark("users_auth") if self.resume else None,
+            step="users_auth",
+        ):
+            with self.metrics.phase("users_auth", "transform", rows=len(auth_users)):
+                payload = self._transform_auth_users(auth_users)
+
+            def load_batch() -> int:
+                with self.metrics.phase("users_auth", "load", rows=len(auth_users)):
+                    loaded = self._load_auth_users(pg_cur, payload)
+                self._commit_batch("users_auth", auth_users, keys=("id",))
+                return loaded
+
+            migrated += self._with_retry("users_auth", "postgres", load_batch)
+            total += len(auth_users)
+        return migrated, total
+
+    def _transform_users(self, usuarios: List[Dict]):
+        rows_usuario = []
+        key_to_provider: Dict[Tuple[int, int], str] = {}
+
+        for u in usuarios:
+            provider_id = f"erp_usuario_{u['id']}_{u['dni']}"
+            email = u["email"] or f"{provider_id}@noemail.local"
+            status = "ACTIVE" if u.get("vigente", 1) else "INACTIVE"
+            u_uuid = det_uuid("usuario", f"{u['id']}_{u['dni']}")
+
+            rows_usuario.append((
+                u_uuid,
+                provider_id,
+                email,
+                status,
+                bool(u.get("email_verified_at")),
+                u["created_at"] or NOW,
+                u["updated_at"] or NOW,
+            ))
+            key_to_provider[(u["id"], u["dni"])] = provider_id
+
+        return rows_usuario, key_to_provider
+
+    def _load_users(self, pg_cur, payload) -> int:
+        rows_usuario, key_to_provider = payload
+        self._load_rows(
+            pg_cur, "users", USERS_COLUMNS, rows_usuario,
+            self._on_conflict("provider_auth_id", USERS_COLUMNS),
+        )
+        # Reconstruir mapa (id, dni) → pg_users.id usando provider_auth_id
+        provider_to_pg = self._users_by_provider(
+            pg_cur, list(key_to_provider.values()), "users"
+        )
+        self.usuario_id_map.put_many(
+            (key, provider_to_pg[provider_id])
+            for key, provider_id in key_to_provider.items()
+            if provider_id in provider_to_pg
+        )
+        return len(rows_usuario)
+
+    def _transform_auth_users(self, auth_users: List[Dict]):
+        rows_auth = []
+        auth_key_to_provider: Dict[int, str] = {}
+
+        for u in auth_users:
+            provider_id = f"erp_auth_{u['id']}"
+            email = u["email"] or f"{provider_id}@noemail.local"
+            u_uuid = det_uuid("auth_user", str(u["id"]))
+
+            rows_auth.append((
+                u_uuid,
+                provider_id,
+                email,
+                "ACTIVE",
+                bool(u.get("email_verified_at")),
+                u["created_at"] or NOW,
+                u["updated_at"] or NOW,
+            ))
+            auth_key_to_provider[u["id"]] = provider_id
+
+        return rows_auth, auth_key_to_provider
+
+    def _load_auth_users(self, pg_cur, payload) -> int:
+        rows_auth, auth_key_to_provider = payload
+        self._load_rows(
+            pg_cur, "users", USERS_COLUMNS, rows_auth,
+            self._on_conflict("provider_auth_id", USERS_COLUMNS), step="users_auth",
+        )
+        provider_to_pg = self._users_by_provider(
+            pg_cur, list(auth_key_to_provider.values()), "users_auth"
+        )
+        self.erp_auth_user_map.put_many(
+            (erp_id, provider_to_pg[provider_id])
+            for erp_id, provider_id in auth_key_to_provider.items()
+            if provider_id in provider_to_pg
+        )
+        return len(rows_auth)
+
+    def _fill_missing_ids(
+        self, pg_cur, table: str, namespace: str, id_map: Dict, erp_ids, step: str
+    ):
+        """
+        Completa `id_map` con los IDs de PostgreSQL de las claves ERP que
+        falten, buscándolas por uuid determinista. Las claves compuestas
+        usan el mismo texto que los pasos: (id, dni) → "id_dni".
+        """
+        known = id_map.get_many(erp_ids)
+        missing = {
+            det_uuid(namespace, "_".join(map(str, i)) if isinstance(i, tuple) else str(i)): i
+            for i in erp_ids if i not in known
+        }
+        if not missing:
+            return
+        with self.metrics.phase(step, "lookup", rows=len(missing)):
+            found = self._fetch_any(
+                pg_cur, f"SELECT id, uuid FROM {table} WHERE uuid = ANY(%s)", list(missing),
+            )
+        id_map.put_many((missing[row_uuid], pg_id) for pg_id, row_uuid in found)
+
+    def _users_by_provider(self, pg_cur, provider_ids: List[str], step: str) -> Dict[str, int]:
+        """{provider_auth_id → pg_users.id} para los ids indicados."""
+        if not provider_ids:
+            return {}
+        with self.metrics.phase(step, "lookup", rows=len(provider_ids)):
+            found = self._fetch_any(
+                pg_cur,
+                "SELECT id, provider_auth_id FROM users WHERE provider_auth_id = ANY(%s)",
+                provider_ids,
+            )
+            return {row[1]: row[0] for row in found}
+
+    @staticmethod
+    def _fetch_any(pg_cur, sql: str, values: List, *params) -> List[tuple]:
+        """
+        Ejecuta `sql`, cuyo último parámetro es un ANY(%s), en bloques de
+        lookup_chunk valores y junta las filas: un lote grande no arma un
+        array gigante en un solo mensaje ni en el plan de PostgreSQL.
+        """
+        chunk = MIGRATION_SETTINGS["lookup_chunk"]
+        rows: List[tuple] = []
+        for i in range(0, len(values), chunk):
+            pg_cur.execute(sql, (*params, values[i:i + chunk]))
+            rows += pg_cur.fetchall()
+        return rows
+
     # ──────────────────────────────────────────────────────────────────────────
     # migrate_user_roles
     # ──────────────────────────────────────────────────────────────────────────
@@ -406,52 +1858,38 @@ class MariaDBMigrator:
         logger.info("\n" + "=" * 60)
         logger.info("MIGRANDO: user_roles")
         try:
-            cur = self.mariadb_conn.cursor(dictionary=True)
-            cur.execute(
-                """
-                SELECT role_id, model_id
-                FROM model_has_roles
-                WHERE model_type = 'App\\\\Models\\\\User'
-                """
-            )
-            rows = cur.fetchall()
-            cur.close()
-
+            rows = self._read_user_roles()
             if not rows:
                 logger.warning("Sin registros en model_has_roles")
                 return True
 
             pg_cur = self.postgres_conn.cursor()
-            to_insert = []
-            skipped = 0
 
-            for r in rows:
-                pg_role_id = self.role_id_map.get(r["role_id"])
-                pg_user_id = self.erp_auth_user_map.get(r["model_id"])
-
-                if pg_role_id is None or pg_user_id is None:
-                    skipped += 1
-                    continue
+            # Roles o usuarios auth que no pasaron por esta ejecución (modo
+            # delta, --resume) se buscan en PostgreSQL por su uuid determinista
+            self._fill_missing_ids(
+                pg_cur, "roles", "role", self.role_id_map,
+                {r["role_id"] for r in rows}, "user_roles",
+            )
+            self._fill_missing_ids(
+                pg_cur, "users", "auth_user", self.erp_auth_user_map,
+                {r["model_id"] for r in rows}, "user_roles",
+            )
 
-                to_insert.append((pg_user_id, pg_role_id, NOW))
+            to_insert, skipped = self._transform_user_roles(rows)
 
             if to_insert:
-                execute_values(
-                    pg_cur,
-                    """
-                    INSERT INTO user_roles (user_id, role_id, created_at)
-                    VALUES %s
-                    ON CONFLICT (user_id, role_id) DO NOTHING
-                    """,
-                    to_insert,
-                )
-
-            self.postgres_conn.commit()
+                with self.metrics.phase("user_roles", "load", rows=len(to_insert)):
+                    self._load_rows(
+                        pg_cur, "user_roles", USER_ROLES_COLUMNS, to_insert,
+                        USER_ROLES_CONFLICT,
+                    )
+
+            with self.metrics.phase("user_roles", "commit"):
+                self.postgres_conn.commit()
             pg_cur.close()
 
-            self.stats["migrated_tables"] += 1
-            self.stats["migrated_records"] += len(to_insert)
-            self.stats["total_records"] += len(rows)
+            self._record_step(len(to_insert), len(rows))
             logger.info(
                 f"✓ {len(to_insert)}/{len(rows)} user_roles"
                 f" (omitidos sin mapeo: {skipped})"
@@ -459,12 +1897,45 @@ class MariaDBMigrator:
             return True
 
         except Exception as err:
-            self.postgres_conn.rollback()
+            self._rollback_postgres()
             logger.error(f"✗ user_roles: {err}")
             self.stats["errors"].append(f"user_roles: {err}")
             return False
 
-    # ──────────────────────────────────────────────────────────────────────────
+    def _read_user_roles(self) -> List[Dict]:
+        cur = self.mariadb_conn.cursor(dictionary=True)
+        with self.metrics.phase("user_roles", "extract") as span:
+            cur.execute(
+                """
+                SELECT role_id, model_id
+                FROM model_has_roles
+                WHERE model_type = 'App\\\\Models\\\\User'
+                """
+            )
+            rows = cur.fetchall()
+            span.rows = len(rows)
+        cur.close()
+        return rows
+
+    def _transform_user_roles(self, rows: List[Dict]) -> Tuple[List[tuple], int]:
+        """(filas user_roles, omitidas sin mapeo de rol o usuario auth)."""
+        to_insert = []
+        skipped = 0
+        role_ids = self.role_id_map.get_many({r["role_id"] for r in rows})
+        user_ids = self.erp_auth_user_map.get_many({r["model_id"] for r in rows})
+
+        for r in rows:
+            pg_role_id = role_ids.get(r["role_id"])
+            pg_user_id = user_ids.get(r["model_id"])
+
+            if pg_role_id is None or pg_user_id is None:
+                skipped += 1
+                continue
+
+            to_insert.append((pg_user_id, pg_role_id, NOW))
+        return to_insert, skipped
+
+    # ──────────────────────────────────────────────────────────────────────────
     # migrate_profiles
     # ──────────────────────────────────────────────────────────────────────────
 
@@ -485,406 +1956,2257 @@ class MariaDBMigrator:
           usuario.celular   → mobile
           usuario.imagen    → avatar_url
         """
+        return self._run_usuario_step("profiles")
+
+    def _transform_profiles(self, rows: List[Dict], user_map=None):
+        """`user_map` reemplaza a usuario_id_map (UuidKeyMap con load_engine "staging")."""
+        profile_rows = []
+        uuid_to_key: Dict[str, Tuple[int, int]] = {}
+        skipped = 0
+        user_map = self.usuario_id_map if user_map is None else user_map
+        user_ids = user_map.get_many((u["id"], u["dni"]) for u in rows)
+
+        for u in rows:
+            key = (u["id"], u["dni"])
+            pg_user_id = user_ids.get(key)
+            if pg_user_id is None:
+                skipped += 1
+                continue
+
+            profile_uuid = det_uuid("profile", f"{u['id']}_{u['dni']}")
+            profile_rows.append((
+                profile_uuid,
+                pg_user_id,
+                str(u["id"]),         # nro de documento
+                u["nombre1"],
+                u.get("nombre2"),
+                u["apellido1"],
+                u.get("apellido2"),
+                u.get("genero"),
+                u.get("fecha_nacimiento"),
+                u.get("telefono"),
+                u.get("celular"),
+                u.get("imagen"),
+                u["created_at"] or NOW,
+                u["updated_at"] or NOW,
+            ))
+            uuid_to_key[profile_uuid] = key
+
+        if skipped:
+            # En el hilo de transformación, o dentro de la carga con fan-out
+            self._count_stat("skipped", "profiles", skipped)
+        return profile_rows, uuid_to_key
+
+    def _load_profiles(self, pg_cur, payload) -> int:
+        profile_rows, uuid_to_key = payload
+        if not profile_rows:
+            return 0
+        uuid_to_id = self._insert_profiles_batch(pg_cur, profile_rows)
+        self.profile_id_map.put_many(
+            (uuid_to_key[profile_uuid], pg_id) for profile_uuid, pg_id in uuid_to_id.items()
+        )
+        return len(uuid_to_id)
+
+    # ──────────────────────────────────────────────────────────────────────────
+    # migrate_profile_addresses
+    # ──────────────────────────────────────────────────────────────────────────
+
+    def migrate_profile_addresses(self) -> bool:
+        """
+        ERP usuario → ALMA profile_addresses
+
+        Columnas ERP → ALMA:
+          pais.nombre   → country   (join con tabla pais)
+          provincia.nombre → state  (join con tabla provincia)
+          usuario.ciudad   → city
+          usuario.direccion → address_line
+          usuario.barrio   → neighborhood
+        """
+        return self._run_usuario_step("profile_addresses")
+
+    def _transform_profile_addresses(self, rows: List[Dict], profile_map=None) -> List[tuple]:
+        to_insert = []
+        profile_map = self.profile_id_map if profile_map is None else profile_map
+        profile_ids = profile_map.get_many((u["id"], u["dni"]) for u in rows)
+        for u in rows:
+            pg_profile_id = profile_ids.get((u["id"], u["dni"]))
+            if pg_profile_id is None:
+                continue
+
+            to_insert.append((
+                det_uuid("address", f"{u['id']}_{u['dni']}"),
+                pg_profile_id,
+                self.pais_map.get(u["pais"]) if u["pais"] else None,
+                self.provincia_map.get(u["provincia"]) if u["provincia"] else None,
+                u.get("ciudad"),
+                "HOME",
+                True,
+                u.get("direccion"),
+                u.get("barrio"),
+                u["created_at"] or NOW,
+                u["updated_at"] or NOW,
+            ))
+        return to_insert
+
+    # ──────────────────────────────────────────────────────────────────────────
+    # migrate_profile_employment
+    # ──────────────────────────────────────────────────────────────────────────
+
+    def migrate_profile_employment(self) -> bool:
+        """
+        ERP usuario → ALMA profile_employment
+
+        Columnas ERP → ALMA:
+          t_ocupacion.tipo   → occupation  (join con t_ocupacion)
+          usuario.empresa    → company_name
+          usuario.telefono_empresa → company_phone
+          usuario.fecha_ingreso_empresa → start_date
+          end_date → NULL (no disponible en ERP)
+        """
+        return self._run_usuario_step("profile_employment")
+
+    def _transform_profile_employment(self, rows: List[Dict], profile_map=None) -> List[tuple]:
+        to_insert = []
+        profile_map = self.profile_id_map if profile_map is None else profile_map
+        profile_ids = profile_map.get_many((u["id"], u["dni"]) for u in rows)
+        for u in rows:
+            pg_profile_id = profile_ids.get((u["id"], u["dni"]))
+            if pg_profile_id is None:
+                continue
+
+            occupation = (
+                self.t_ocupacion_map.get(u["ocupacion"])
+                if u["ocupacion"] else None
+            )
+            to_insert.append((
+                det_uuid("employment", f"{u['id']}_{u['dni']}"),
+                pg_profile_id,
+                occupation,
+                u.get("empresa"),
+                u.get("telefono_empresa"),
+                u.get("fecha_ingreso_empresa"),
+                None,   # end_date: no disponible en ERP
+                u["created_at"] or NOW,
+                u["updated_at"] or NOW,
+            ))
+        return to_insert
+
+    # ──────────────────────────────────────────────────────────────────────────
+    # migrate_profile_family
+    # ──────────────────────────────────────────────────────────────────────────
+
+    def migrate_profile_family(self) -> bool:
+        """
+        ERP usuario → ALMA profile_family
+
+        Columnas ERP → ALMA:
+          t_est_civil.tipo  → marital_status  (join con t_est_civil)
+          usuario.cant_hijos → children_count
+        """
+        return self._run_usuario_step("profile_family")
+
+    def _transform_profile_family(self, rows: List[Dict], profile_map=None) -> List[tuple]:
+        to_insert = []
+        profile_map = self.profile_id_map if profile_map is None else profile_map
+        profile_ids = profile_map.get_many((u["id"], u["dni"]) for u in rows)
+        for u in rows:
+            pg_profile_id = profile_ids.get((u["id"], u["dni"]))
+            if pg_profile_id is None:
+                continue
+
+            marital_status = (
+                self.t_est_civil_map.get(u["est_civil"])
+                if u["est_civil"] else None
+            )
+            to_insert.append((
+                det_uuid("family", f"{u['id']}_{u['dni']}"),
+                pg_profile_id,
+                marital_status,
+                u.get("cant_hijos"),
+                u["created_at"] or NOW,
+                u["updated_at"] or NOW,
+            ))
+        return to_insert
+
+    # ──────────────────────────────────────────────────────────────────────────
+    # migrate_profile_dni
+    # ──────────────────────────────────────────────────────────────────────────
+
+    def migrate_profile_dni(self) -> bool:
+        """
+        ERP usuario → ALMA profile_dni
+
+        Columnas ERP → ALMA:
+          usuario.id            → (el número de documento está en usuario.id)
+          t_dni.abreviacion     → "dniType"  (CC, CE, PP, …)
+          usuario.fecha_nacimiento → birthdate
+          expedition_date → NULL (no disponible en ERP)
+          is_current → True
+        """
+        return self._run_usuario_step("profile_dni")
+
+    def _transform_profile_dni(self, rows: List[Dict], profile_map=None) -> List[tuple]:
+        to_insert = []
+        profile_map = self.profile_id_map if profile_map is None else profile_map
+        profile_ids = profile_map.get_many((u["id"], u["dni"]) for u in rows)
+        for u in rows:
+            pg_profile_id = profile_ids.get((u["id"], u["dni"]))
+            if pg_profile_id is None:
+                continue
+
+            # Tipo de documento: usar abreviacion si existe, si no el ID como string
+            dni_type = self.t_dni_map.get(u["dni"], str(u["dni"]))
+
+            to_insert.append((
+                det_uuid("profile_dni", f"{u['id']}_{u['dni']}"),
+                pg_profile_id,
+                dni_type,
+                None,                       # expedition_date: no disponible
+                u.get("fecha_nacimiento"),  # birthdate
+                True,                       # is_current
+                u["created_at"] or NOW,
+                u["updated_at"] or NOW,
+            ))
+        return to_insert
+
+    # ──────────────────────────────────────────────────────────────────────────
+    # migrate_usuario_fanout
+    # ──────────────────────────────────────────────────────────────────────────
+
+    def migrate_usuario_fanout(self) -> bool:
+        """
+        Lectura única de `usuario` → users, profiles, profile_addresses,
+        profile_employment, profile_family y profile_dni.
+
+        Se lee `usuario` una sola vez con la unión de columnas de todos los
+        pasos y cada lote se reparte entre los transformadores en orden de
+        dependencia FK (users → profiles → profile_*), dentro de la misma
+        transacción. Reemplaza a los seis recorridos separados.
+        """
         logger.info("\n" + "=" * 60)
-        logger.info("MIGRANDO: profiles")
+        logger.info("MIGRANDO (lectura única): " + ", ".join(USUARIO_FANOUT_STEPS))
+        specs = self._usuario_specs()
+        columns: List[str] = []
+        for step in USUARIO_FANOUT_STEPS:
+            columns += [c for c in specs[step]["columns"] if c not in columns]
+
+        try:
+            pg_cur = self._pg_cursor()
+
+            # Las transformaciones de profile_* necesitan los IDs que deja la
+            # carga de profiles del mismo lote: se transforma en el hilo de carga
+            def load(rows: List[Dict], _payload):
+                batch: Counter = Counter()
+                for step in USUARIO_FANOUT_STEPS:
+                    spec = specs[step]
+                    accepted = (
+                        [u for u in rows if spec["accept"](u)]
+                        if spec["accept"] else rows
+                    )
+                    if not accepted:
+                        continue
+                    with self.metrics.phase(step, "transform", rows=len(accepted)):
+                        to_insert = spec["transform"](accepted)
+                    with self.metrics.phase(step, "load", rows=len(accepted)):
+                        batch[step, "migrated"] += spec["load"](pg_cur, to_insert)
+                    batch[step, "total"] += len(accepted)
+                return batch
+
+            counts = self._pipeline_usuario("usuario_fanout", tuple(columns), load)
+            migrated = {step: counts[step, "migrated"] for step in USUARIO_FANOUT_STEPS}
+            total = {step: counts[step, "total"] for step in USUARIO_FANOUT_STEPS}
+
+            if self.partition is None:
+                auth_migrated, auth_total = self._migrate_auth_users(pg_cur)
+                migrated["users"] += auth_migrated
+                total["users"] += auth_total
+
+            pg_cur.close()
+
+            for step in USUARIO_FANOUT_STEPS:
+                self._record_step(migrated[step], total[step])
+                logger.info(
+                    f"✓ {migrated[step]}/{total[step]} {step}{self._step_detail(step)}"
+                )
+            return True
+
+        except Exception as err:
+            self._rollback_postgres()
+            logger.error(f"✗ usuario_fanout: {err}")
+            traceback.print_exc()
+            self.stats["errors"].append(f"usuario_fanout: {err}")
+            return False
+
+    # ──────────────────────────────────────────────────────────────────────────
+    # migrate_mapping (config.CUSTOM_MAPPINGS)
+    # ──────────────────────────────────────────────────────────────────────────
+
+    def migrate_mapping(self, name: str) -> bool:
+        """
+        Paso genérico de un mapeo declarativo: lectura keyset de `source`,
+        transformador generado por mapping_engine en el hilo de
+        transformación, carga con el motor configurado y commit por lote.
+
+        Las FK (obligatorias u opcionales con valor) que no están en los
+        mapas en memoria (pasos de una ejecución anterior, procesos del
+        modo particionado) se buscan en PostgreSQL por uuid en el hilo de
+        carga y solo esas filas se transforman de nuevo; las que siguen sin
+        resolver se omiten. Con 'map', los IDs destino quedan publicados para los
+        mapeos que dependan de este.
+        """
+        mapping = self.mappings[name]
+        logger.info("\n" + "=" * 60)
+        logger.info(f"MIGRANDO: {mapping.target} (desde {mapping.source})")
+        id_maps = self._id_maps()
+        sources = self._id_map_sources()
         try:
+            for map_name, _, _ in mapping.fks:
+                if map_name not in id_maps:
+                    raise ValueError(f"mapa de IDs desconocido: {map_name}")
+            fk_maps = [id_maps[map_name] for map_name, _, _ in mapping.fks]
+            lookups = [getattr(self, attr) for attr in mapping.lookups]
+            conflict = self._on_conflict(mapping.conflict, mapping.columns)
+            pg_cur = self._pg_cursor()
+
+            def transform(rows: List[Dict]):
+                fks = [
+                    fk_map.get_many(mapping.fk_keys(i, rows))
+                    for i, fk_map in enumerate(fk_maps)
+                ]
+                return mapping.build(rows, fks, lookups, NOW)
+
+            def load(rows: List[Dict], payload):
+                to_insert, missing, keys = payload
+                skipped = 0
+                if missing:
+                    for i, (map_name, _, _) in enumerate(mapping.fks):
+                        table, namespace = sources[map_name]
+                        self._fill_missing_ids(
+                            pg_cur, table, namespace, fk_maps[i],
+                            mapping.fk_keys(i, missing), name,
+                        )
+                    more, missing, more_keys = transform(missing)
+                    # Listas nuevas: el payload queda intacto si _with_retry repite el lote
+                    to_insert = to_insert + more
+                    keys = keys + more_keys
+                    skipped = len(missing)
+                migrated = self._load_rows(
+                    pg_cur, mapping.target, mapping.columns, to_insert, conflict, step=name,
+                )
+                if mapping.map_name and to_insert:
+                    self._publish_ids(pg_cur, mapping, to_insert, keys)
+                return {"migrated": migrated, "total": len(rows), "skipped": skipped}
+
+            start_after = self.checkpoint.watermark(name) if self.resume else None
+            if start_after is not None:
+                logger.info(f"  Retomando {name} después de {start_after}")
+            where = self._and_where(
+                mapping.where, self._delta_condition() if mapping.delta else "",
+            )
+            counts = self._pipeline_batches(
+                name,
+                lambda: self._iter_keyset(
+                    mapping.source, ", ".join(mapping.select), keys=mapping.keys,
+                    where=where, limit=self.limit if mapping.limited else None,
+                    start_after=start_after, step=name,
+                ),
+                load, transform=transform, keys=mapping.keys,
+            )
+            pg_cur.close()
+
+            migrated, total = counts["migrated"], counts["total"]
+            if counts["skipped"]:
+                self._count_stat("skipped", name, counts["skipped"])
+            self._record_step(migrated, total)
+            logger.info(f"✓ {migrated}/{total} {name}{self._step_detail(name)}")
+            return True
+
+        except Exception as err:
+            self._rollback_postgres()
+            logger.error(f"✗ {name}: {err}")
+            traceback.print_exc()
+            self.stats["errors"].append(f"{name}: {err}")
+            return False
+
+    def _publish_ids(self, pg_cur, mapping: CompiledMapping, rows: List[tuple], keys: List):
+        """Guarda {clave ERP → id destino} del lote en el mapa `mapping.map_name`."""
+        uuid_to_key = {row[0]: key for row, key in zip(rows, keys)}
+        with self.metrics.phase(mapping.name, "lookup", rows=len(uuid_to_key)):
+            found = self._fetch_any(
+                pg_cur, f"SELECT id, uuid FROM {mapping.target} WHERE uuid = ANY(%s)",
+                list(uuid_to_key),
+            )
+        self.mapping_id_maps[mapping.map_name].put_many(
+            (uuid_to_key[row_uuid], pg_id) for pg_id, row_uuid in found
+        )
+
+    def _mapping_steps(self, names: List[str]) -> List[Step]:
+        """
+        Pasos de los mapeos declarativos. Las dependencias que nombran un
+        paso de `usuario` se traducen al paso que lo contiene en esta
+        ejecución (usuario_fanout / usuario_partitions).
+        """
+        chain = {s.name for s in self._usuario_chain()} | set(USUARIO_FANOUT_STEPS)
+
+        def resolve(dep: str) -> str:
+            if dep in names:
+                return dep
+            if self.partitions > 1 and dep in chain:
+                return "usuario_partitions"
+            if self.fanout and dep in USUARIO_FANOUT_STEPS:
+                return "usuario_fanout"
+            return dep
+
+        return [
+            Step(
+                name,
+                partial(self.migrate_mapping, name),
+                deps=tuple(dict.fromkeys(resolve(d) for d in mapping.deps)),
+            )
+            for name, mapping in self.mappings.items()
+        ]
+
+    # ──────────────────────────────────────────────────────────────────────────
+    # Esquema académico (DB_ALMA_V2): personas y catálogos
+    # ──────────────────────────────────────────────────────────────────────────
+
+    def _require_tables(self, step: str, tables: Tuple[str, ...]):
+        """Falla el paso si el destino no tiene alguna de `tables` (esquema académico)."""
+        pg_cur = self.postgres_conn.cursor()
+        missing = []
+        for table in tables:
+            pg_cur.execute("SELECT to_regclass(%s)", (table,))
+            if pg_cur.fetchone()[0] is None:
+                missing.append(table)
+        self.postgres_conn.commit()
+        pg_cur.close()
+        if missing:
+            raise RuntimeError(
+                f"{', '.join(missing)} no existe en el destino: --academic necesita el"
+                f" esquema de DB_ALMA_V2.sql en '{MIGRATION_SETTINGS['academic_schema']}'"
+            )
+
+    def migrate_alma_users(self) -> bool:
+        """
+        ERP usuario → alma.users. El id es el uuid determinista de la persona
+        (el mismo de users.uuid en ALMA_BE_V2): los pasos académicos calculan
+        professor_id / student_id desde (id, dni) sin mapa de IDs y antes de
+        cargar descartan las personas que no llegaron a alma.users.
+        """
+        step = "alma_users"
+        logger.info("\n" + "=" * 60)
+        logger.info(f"MIGRANDO: {step} (desde usuario)")
+        try:
+            self._require_tables(step, (alma_table("users"),))
+            pg_cur = self._pg_cursor()
+
+            def load(rows: List[Dict], to_insert):
+                return {"migrated": self._load_alma_users(pg_cur, to_insert), "total": len(rows)}
+
+            counts = self._pipeline_usuario(
+                step,
+                ("id", "dni", "nombre1", "nombre2", "apellido1", "apellido2", "email",
+                 "telefono", "celular", "direccion", "genero", "fecha_nacimiento",
+                 "vigente", "created_at", "updated_at"),
+                load, transform=self._transform_alma_users,
+            )
+            pg_cur.close()
+
+            migrated, total = counts["migrated"], counts["total"]
+            self._record_step(migrated, total)
+            logger.info(f"✓ {migrated}/{total} {step}{self._step_detail(step)}")
+            return True
+
+        except Exception as err:
+            self._rollback_postgres()
+            logger.error(f"✗ {step}: {err}")
+            traceback.print_exc()
+            self.stats["errors"].append(f"{step}: {err}")
+            return False
+
+    def _transform_alma_users(self, rows: List[Dict]) -> List[tuple]:
+        """usuario → alma.users (documento: abreviación de t_dni + id del ERP)."""
+        out = []
+        for u in rows:
+            out.append((
+                det_uuid("usuario", f"{u['id']}_{u['dni']}"),
+                " ".join(filter(None, (u["nombre1"], u["nombre2"]))),
+                " ".join(filter(None, (u["apellido1"], u["apellido2"]))),
+                self.t_dni_map.get(u["dni"], str(u["dni"])),
+                str(u["id"]),
+                (u["email"] or "").strip().lower() or None,
+                (u["celular"] or u["telefono"] or "")[:20] or None,  # phone es varchar(20)
+                u["direccion"],
+                u["genero"],
+                u["fecha_nacimiento"],
+                bool(u["vigente"]),
+                u["created_at"] or NOW,
+                u["updated_at"] or NOW,
+            ))
+        return out
+
+    def _load_alma_users(self, pg_cur, rows: List[tuple]) -> int:
+        """
+        Carga un lote de alma.users. email es UNIQUE allí y en el ERP se
+        repite (familias con un mismo correo): queda NULL si ya lo usa otra
+        persona, en el destino o antes en el mismo lote.
+        """
+        emails = list({row[5] for row in rows if row[5]})
+        with self.metrics.phase("alma_users", "lookup", rows=len(emails)):
+            owners = dict(self._fetch_any(
+                pg_cur, f"SELECT email, id::text FROM {alma_table('users')} WHERE email = ANY(%s)",
+                emails,
+            ))
+        to_insert = []
+        for row in rows:
+            if row[5] and owners.setdefault(row[5], row[0]) != row[0]:
+                row = row[:5] + (None,) + row[6:]
+            to_insert.append(row)
+        return self._load_rows(
+            pg_cur, alma_table("users"), ALMA_USERS_COLUMNS, to_insert,
+            self._on_conflict("id", ALMA_USERS_COLUMNS, upsert="id"),
+            step="alma_users", engine="copy",
+        )
+
+    def _academic_catalog_specs(self) -> Dict[str, Dict]:
+        """
+        Catálogos del esquema académico: tablas chicas del ERP que se leen y
+        cargan enteras en una transacción.
+
+          sql        lectura en MariaDB
+          target     tabla destino y sus columnas (orden de las tuplas)
+          serial     la tabla conserva los IDs del ERP: al terminar se
+                     adelanta su secuencia
+          transform  filas del ERP → tuplas
+        """
+        return {
+            "branches": {
+                "sql": "SELECT id, nombre, direccion, ciudad, provincia, pais, telefono,"
+                       " email, vigente, fecha_trans FROM sede",
+                "target": "branches", "target_columns": BRANCHES_COLUMNS, "serial": False,
+                "transform": self._transform_branches,
+            },
+            "academic_programs": {
+                "sql": "SELECT id, nombre, descripcion, vigente, fecha_trans FROM programa",
+                "target": "academic_programs", "target_columns": ACADEMIC_PROGRAMS_COLUMNS,
+                "serial": False,
+                "transform": self._transform_academic_programs,
+            },
+            "subjects": {
+                # program_id es uno solo: el menor programa que incluye la materia
+                "sql": "SELECT m.id, m.nombre, m.descripcion, m.fecha_trans,"
+                       " m.fecha_modificar, MIN(px.programa) AS programa"
+                       " FROM materia m"
+                       " LEFT JOIN programa_x_materia px ON px.materia = m.id"
+                       " GROUP BY m.id",
+                "target": "subjects", "target_columns": SUBJECTS_COLUMNS, "serial": True,
+                "transform": self._transform_subjects,
+            },
+        }
+
+    def _transform_branches(self, rows: List[Dict]) -> List[tuple]:
+        """sede → branches (id = uuid determinista de la sede, como branch_id de los grupos)."""
+        return [
+            (
+                det_uuid("sede", str(r["id"])),
+                r["nombre"],
+                r["direccion"],
+                r["ciudad"],
+                self.provincia_map.get(r["provincia"]),
+                self.pais_map.get(r["pais"]),
+                r["telefono"],
+                r["email"],
+                bool(r["vigente"]),
+                r["fecha_trans"] or NOW,
+                r["fecha_trans"] or NOW,
+            )
+            for r in rows
+        ]
+
+    @staticmethod
+    def _transform_academic_programs(rows: List[Dict]) -> List[tuple]:
+        """programa → academic_programs, más el programa NO_PROGRAM de las materias sueltas."""
+        out = [
+            (
+                det_uuid("programa", str(r["id"])),
+                r["nombre"],
+                r["descripcion"],
+                bool(r["vigente"]),
+                r["fecha_trans"] or NOW,
+            )
+            for r in rows
+        ]
+        out.append((
+            det_uuid("programa", str(NO_PROGRAM)),
+            "Sin programa",
+            "Materias del ERP que no pertenecen a ningún programa",
+            True,
+            NOW,
+        ))
+        return out
+
+    @staticmethod
+    def _transform_subjects(rows: List[Dict]) -> List[tuple]:
+        """
+        materia → subjects. Conserva el id del ERP: es el subject_id que
+        ponen los grupos. est_materia no tiene equivalente y is_active
+        queda en TRUE.
+        """
+        return [
+            (
+                r["id"],
+                det_uuid("programa", str(r["programa"] if r["programa"] is not None else NO_PROGRAM)),
+                r["nombre"],
+                r["descripcion"],
+                True,
+                r["fecha_trans"] or NOW,
+                r["fecha_modificar"] or r["fecha_trans"] or NOW,
+            )
+            for r in rows
+        ]
+
+    def migrate_academic_catalog(self, step: str) -> bool:
+        """Un catálogo de _academic_catalog_specs: lectura completa, COPY y un commit."""
+        spec = self._academic_catalog_specs()[step]
+        target = alma_table(spec["target"])
+        logger.info("\n" + "=" * 60)
+        logger.info(f"MIGRANDO: {step}")
+        try:
+            self._require_tables(step, (target,))
             cur = self.mariadb_conn.cursor(dictionary=True)
+            with self.metrics.phase(step, "extract") as span:
+                cur.execute(spec["sql"])
+                rows = cur.fetchall()
+                span.rows = len(rows)
+            cur.close()
+            with self.metrics.phase(step, "transform", rows=len(rows)):
+                to_insert = spec["transform"](rows)
+
+            pg_cur = self.postgres_conn.cursor()
+            columns = spec["target_columns"]
+            migrated = self._load_rows(
+                pg_cur, target, columns, to_insert,
+                self._on_conflict("id", columns, upsert="id"), step=step, engine="copy",
+            )
+            if spec["serial"]:
+                self._advance_sequence(pg_cur, target)
+            with self.metrics.phase(step, "commit"):
+                self.postgres_conn.commit()
+            pg_cur.close()
+
+            self._record_step(migrated, len(rows))
+            logger.info(f"✓ {migrated}/{len(to_insert)} {step}{self._step_detail(step)}")
+            return True
+
+        except Exception as err:
+            self._rollback_postgres()
+            logger.error(f"✗ {step}: {err}")
+            traceback.print_exc()
+            self.stats["errors"].append(f"{step}: {err}")
+            return False
+
+    @staticmethod
+    def _advance_sequence(pg_cur, table: str):
+        """Adelanta la secuencia de `table`.id después de cargar IDs del ERP."""
+        pg_cur.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'),"
+            f" GREATEST((SELECT MAX(id) FROM {table}), 1))"
+        )
+
+    # ──────────────────────────────────────────────────────────────────────────
+    # Grupos académicos: grupo, clase, matricula_materia, asistencia_clase
+    # ──────────────────────────────────────────────────────────────────────────
+
+    def _academic_specs(self) -> Dict[str, Dict]:
+        """
+        Pasos académicos (esquema DB_ALMA_V2), en orden de dependencia FK.
+
+          source     tabla del ERP; `group` es su columna de grupo, primera
+                     de `keys`. La lectura keyset recorre la PK en grupo,
+                     clase y asistencia_clase; en matricula_materia (PK
+                     (sede, id)) recorre el índice de su FK a grupo, que en
+                     InnoDB lleva la PK al final: (grupo, sede, id)
+          columns    columnas de `source` que necesita el paso
+          user       posición en la tupla del uuid de la persona (professor_id
+                     / student_id), que debe existir en alma.users; o None
+          delta      aplicar el filtro updated_at/created_at de --delta
+          limited    aplicar self.limit (los demás pasos siguen a los grupos)
+          unique     columnas iniciales de la tupla que forman `conflict`
+          serial     la tabla conserva los IDs del ERP: al terminar se
+                     adelanta su secuencia
+          transform  (lote, grupos migrados) → (tuplas, descartadas)
+        """
+        return {
+            "academic_groups": {
+                "source": "grupo", "group": "id", "keys": ("id",),
+                "columns": ("id", "materia", "sede", "id_maestro", "dni_maestro",
+                            "est_grupo", "fecha_trans", "fecha_modificar", "title"),
+                "user": 5,
+                "delta": False, "limited": True,
+                "target": "academic_groups", "target_columns": ACADEMIC_GROUPS_COLUMNS,
+                "conflict": "id", "unique": 1, "serial": True,
+                "transform": self._transform_academic_groups,
+            },
+            "classes": {
+                "source": "clase", "group": "grupo", "keys": ("grupo", "id"),
+                "columns": ("grupo", "id", "fecha_inicio", "fecha_fin", "est_clase",
+                            "url_video", "fecha_asistencia", "fecha_cancelar"),
+                "user": None,
+                "delta": False, "limited": False,
+                "target": "classes", "target_columns": CLASSES_COLUMNS,
+                "conflict": "id", "unique": 1, "serial": True,
+                "transform": self._transform_classes,
+            },
+            "enrollments": {
+                "source": "matricula_materia", "group": "grupo", "keys": ("grupo", "sede", "id"),
+                "columns": ("grupo", "sede", "id", "id_alumno", "dni_alumno", "est_matricula",
+                            "vigente", "fecha_trans", "fecha_anular"),
+                "user": 1,
+                "delta": False, "limited": False,
+                "target": "enrollments", "target_columns": ENROLLMENTS_COLUMNS,
+                "conflict": "group_id, student_id", "unique": 2, "serial": False,
+                "transform": self._transform_enrollments,
+            },
+            "attendance_records": {
+                "source": "asistencia_clase", "group": "grupo",
+                "keys": ("grupo", "clase", "id_alumno", "dni_alumno"),
+                "columns": ("grupo", "clase", "id_alumno", "dni_alumno",
+                            "tipo_asistencia", "created_at"),
+                "user": 1,
+                "delta": True, "limited": False,
+                "target": "attendance_records", "target_columns": ATTENDANCE_COLUMNS,
+                "conflict": "class_id, student_id", "unique": 2, "serial": False,
+                "transform": self._transform_attendance,
+            },
+        }
+
+    @staticmethod
+    def _user_uuids(rows: List[Dict], user: Tuple[str, str]) -> Dict[tuple, str]:
+        """uuid de alma.users de los pares (id, dni) del lote (uno por persona distinta)."""
+        erp_id, dni = user
+        return {
+            key: det_uuid("usuario", f"{key[0]}_{key[1]}")
+            for key in {(r[erp_id], r[dni]) for r in rows if r[erp_id] is not None}
+        }
+
+    def _present_users(self, pg_cur, step: str, rows: List[tuple], position: int):
+        """
+        Filas de `rows` cuya persona (uuid en `position`) existe en
+        alma.users → (filas, descartadas). Una consulta por lote: no hay
+        mapa de personas en memoria.
+        """
+        uuids = list({row[position] for row in rows})
+        with self.metrics.phase(step, "lookup", rows=len(uuids)):
+            present = {row[0] for row in self._fetch_any(
+                pg_cur, f"SELECT id::text FROM {alma_table('users')} WHERE id = ANY(%s::uuid[])",
+                uuids,
+            )}
+        kept = [row for row in rows if row[position] in present]
+        return kept, len(rows) - len(kept)
+
+    def _transform_academic_groups(self, rows: List[Dict], _groups):
+        """
+        grupo → academic_groups. Conserva el id del ERP (clases, matrículas y
+        asistencias lo usan sin mapa). subject_id es el id de `materia` (el
+        que conserva subjects) y branch_id el uuid determinista de la sede
+        (el id de branches).
+        """
+        status = {
+            k: estado_status(v, GROUP_STATUS_RULES, "active")
+            for k, v in self.est_grupo_map.items()
+        }
+        teachers = self._user_uuids(rows, ("id_maestro", "dni_maestro"))
+        out, dropped = [], 0
+        for r in rows:
+            professor = teachers.get((r["id_maestro"], r["dni_maestro"]))
+            if professor is None:
+                dropped += 1  # professor_id es NOT NULL
+                continue
+            out.append((
+                r["id"],
+                r["materia"],
+                det_uuid("sede", str(r["sede"])),
+                r["title"] or f"Grupo {r['id']}",
+                status.get(r["est_grupo"], "active"),
+                professor,
+                r["fecha_trans"],
+                r["fecha_modificar"] or r["fecha_trans"],
+            ))
+        return out, dropped
+
+    def _transform_classes(self, rows: List[Dict], groups: set):
+        """clase → classes (id = class_id(grupo, clase))."""
+        status = {
+            k: estado_status(v, CLASS_STATUS_RULES, "scheduled")
+            for k, v in self.est_clase_map.items()
+        }
+        out, dropped = [], 0
+        for r in rows:
+            if r["grupo"] not in groups:
+                dropped += 1
+                continue
+            if r["fecha_cancelar"] is not None:
+                class_status = "cancelled"
+            elif r["fecha_asistencia"] is not None:
+                class_status = "completed"
+            else:
+                class_status = status.get(r["est_clase"], "scheduled")
+            out.append((
+                class_id(r["grupo"], r["id"]),
+                r["grupo"],
+                class_status,
+                r["url_video"],
+                r["fecha_inicio"],
+                r["fecha_fin"],
+            ))
+        return out, dropped
+
+    def _transform_enrollments(self, rows: List[Dict], groups: set):
+        """matricula_materia → enrollments (anuladas o no vigentes → withdrawn)."""
+        status = {
+            k: estado_status(v, ENROLLMENT_STATUS_RULES, "active")
+            for k, v in self.est_matricula_map.items()
+        }
+        students = self._user_uuids(rows, ("id_alumno", "dni_alumno"))
+        out, dropped = [], 0
+        for r in rows:
+            if r["grupo"] not in groups or r["id_alumno"] is None:
+                dropped += 1
+                continue
+            if r["fecha_anular"] is not None or not r["vigente"]:
+                enrollment_status = "withdrawn"
+            else:
+                enrollment_status = status.get(r["est_matricula"], "active")
+            out.append((
+                r["grupo"],
+                students[(r["id_alumno"], r["dni_alumno"])],
+                r["fecha_trans"].date() if r["fecha_trans"] else None,
+                enrollment_status,
+            ))
+        return out, dropped
+
+    def _transform_attendance(self, rows: List[Dict], groups: set):
+        """asistencia_clase → attendance_records (el ERP solo registra presentes)."""
+        students = self._user_uuids(rows, ("id_alumno", "dni_alumno"))
+        out, dropped = [], 0
+        append = out.append
+        for r in rows:
+            if r["grupo"] not in groups:
+                dropped += 1
+                continue
+            append((
+                class_id(r["grupo"], r["clase"]),
+                students[(r["id_alumno"], r["dni_alumno"])],
+                "present",
+                ATTENDANCE_TYPES.get(r["tipo_asistencia"]),
+                r["created_at"] or NOW,
+            ))
+        return out, dropped
+
+    def migrate_academic(self, step: str) -> bool:
+        """
+        Paso académico repartido en rangos de grupo con una cantidad de
+        filas parecida, migrados en paralelo (MIGRATION_SETTINGS
+        ['group_ranges'] hilos, cada uno con sus conexiones). Cada rango se
+        lee por keyset sobre `keys` (ver _academic_specs), se transforma en
+        el pipeline, se carga siempre con COPY y se confirma por lote con
+        su propia marca de agua (`<paso>:<rango>`).
+
+        Las filas de grupos que no llegaron a academic_groups (límite,
+        profesor sin migrar) y las de personas que no están en alma.users
+        se descartan antes de cargar y cuentan como omitidas.
+        """
+        spec = self._academic_specs()[step]
+        target = alma_table(spec["target"])
+        logger.info("\n" + "=" * 60)
+        logger.info(f"MIGRANDO: {step} (desde {spec['source']})")
+        try:
+            self._require_tables(step, (target,))
+            groups: set = set()
+            if step != "academic_groups":
+                pg_cur = self.postgres_conn.cursor()
+                pg_cur.execute(f"SELECT id FROM {alma_table('academic_groups')}")
+                groups = {row[0] for row in pg_cur.fetchall()}
+                self.postgres_conn.commit()
+                pg_cur.close()
+
+            ranges = self._group_ranges(step, spec)
+            if not ranges:
+                logger.info(f"✓ {step} sin filas para migrar")
+                return True
+            migrate_range = self._migrate_group_range
+            if self.profiler is not None:
+                migrate_range = self.profiler.attach(migrate_range)
+            with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix=step) as pool:
+                futures = [
+                    pool.submit(migrate_range, step, spec, f"{step}:{i + 1}", r, groups)
+                    for i, r in enumerate(ranges)
+                ]
+                outcomes = [f.result() for f in futures]
+
+            migrated = sum(o[0] for o in outcomes)
+            total = sum(o[1] for o in outcomes)
+            skipped = sum(o[2] for o in outcomes)
+            if spec["serial"]:
+                pg_cur = self.postgres_conn.cursor()
+                self._advance_sequence(pg_cur, target)
+                self.postgres_conn.commit()
+                pg_cur.close()
+
+            if skipped:
+                self._count_stat("skipped", step, skipped)
+            self._record_step(migrated, total)
+            logger.info(
+                f"✓ {migrated}/{total} {step} en {len(ranges)} rangos de grupo"
+                f"{self._step_detail(step)}"
+            )
+            return True
+
+        except Exception as err:
+            self._rollback_postgres()
+            logger.error(f"✗ {step}: {err}")
+            traceback.print_exc()
+            self.stats["errors"].append(f"{step}: {err}")
+            return False
+
+    def _migrate_group_range(
+        self, step: str, spec: Dict, label: str, bounds: Tuple, groups: set
+    ) -> Tuple[int, int, int]:
+        """Un rango de grupos de `step` → (migradas, leídas, omitidas)."""
+        self._ensure_thread_connections()
+        try:
+            pg_cur = self._pg_cursor()
+            conflict = self._on_conflict(
+                spec["conflict"], spec["target_columns"], upsert=spec["conflict"],
+            )
+            def load(rows: List[Dict], payload):
+                to_insert, dropped = payload
+                if spec["user"] is not None:
+                    to_insert, absent = self._present_users(pg_cur, label, to_insert, spec["user"])
+                    dropped += absent
+                # Una clave de conflicto repetida en el lote haría fallar el upsert
+                unique = spec["unique"]
+                to_insert = list({row[:unique]: row for row in to_insert}.values())
+                migrated = self._load_rows(
+                    pg_cur, alma_table(spec["target"]), spec["target_columns"], to_insert,
+                    conflict, step=label, engine="copy",
+                )
+                return {"migrated": migrated, "total": len(rows), "skipped": dropped}
+
+            start_after = self.checkpoint.watermark(label) if self.resume else None
+            if start_after is not None:
+                logger.info(f"  Retomando {label} después de {start_after}")
+            where = self._and_where(
+                self._group_range_condition(spec["group"], bounds),
+                self._delta_condition() if spec["delta"] else "",
+            )
+            counts = self._pipeline_batches(
+                label,
+                lambda: self._iter_keyset(
+                    spec["source"], ", ".join(spec["columns"]), keys=spec["keys"],
+                    where=where, limit=self.limit if spec["limited"] else None,
+                    start_after=start_after, step=label,
+                ),
+                load,
+                transform=lambda rows: spec["transform"](rows, groups),
+                keys=spec["keys"],
+            )
+            pg_cur.close()
+            migrated, total = counts["migrated"], counts["total"]
+            logger.info(f"  {label}: {migrated}/{total}")
+            return migrated, total, counts["skipped"]
+        except Exception:
+            self._rollback_postgres()
+            raise
+        finally:
+            for conn in (self.mariadb_conn, self.postgres_conn):
+                if conn is not None:
+                    self._close_conn(conn)
+            self.mariadb_conn = None
+            self.postgres_conn = None
+
+    @staticmethod
+    def _group_range_condition(column: str, bounds: Tuple) -> str:
+        after, upto = bounds
+        return MariaDBMigrator._and_where(
+            f"{column} > {int(after)}" if after is not None else "",
+            f"{column} <= {int(upto)}" if upto is not None else "",
+        )
+
+    def _group_ranges(self, step: str, spec: Dict) -> List[Tuple[Optional[int], Optional[int]]]:
+        """
+        Cortes de grupo que reparten `source` en rangos (después de, hasta)
+        con una cantidad de filas parecida; None = sin cota. El conteo por
+        grupo recorre solo un índice que empieza por la columna de grupo (la
+        PK, o el de la FK a grupo en matricula_materia). Con --resume se
+        reutilizan los guardados en el checkpoint: las marcas de agua son
+        por rango.
+        """
+        key = f"{GROUP_RANGES_KEY}:{step}"
+        saved = self.checkpoint.value(key) if self.resume else None
+        if saved is not None:
+            return [tuple(b) for b in saved]
+
+        # Con límite, un único rango: el LIMIT se aplica a toda la lectura
+        count = 1 if spec["limited"] and self.limit is not None else max(
+            1, MIGRATION_SETTINGS["group_ranges"]
+        )
+        column = spec["group"]
+        where = self._delta_condition() if spec["delta"] else ""
+        cur = self.mariadb_conn.cursor()
+        try:
             cur.execute(
-                f"""
-                SELECT id, dni, nombre1, nombre2, apellido1, apellido2,
-                       genero, fecha_nacimiento, telefono, celular, imagen,
-                       created_at, updated_at
-                FROM usuario
-                ORDER BY id, dni
-                {self._limit_sql()}
-                """
+                f"SELECT {column}, COUNT(*) FROM {spec['source']}"
+                f" {'WHERE ' + where if where else ''}"
+                f" GROUP BY {column} ORDER BY {column}"
             )
-            rows = cur.fetchall()
+            per_group = cur.fetchall()
+        finally:
             cur.close()
 
-            pg_cur = self.postgres_conn.cursor()
-            migrated = 0
-            skipped = 0
+        total = sum(n for _, n in per_group)
+        cuts: List[int] = []
+        seen = 0
+        for group, n in per_group:
+            seen += n
+            if len(cuts) < count - 1 and seen >= total * (len(cuts) + 1) / count:
+                cuts.append(group)
+        # Último rango abierto: incluye los grupos creados durante el conteo
+        bounds = [None] + cuts + [None]
+        ranges = [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)] if total else []
+        self.checkpoint.set_value(key, ranges)
+        return ranges
 
-            for u in rows:
-                key = (u["id"], u["dni"])
-                pg_user_id = self.usuario_id_map.get(key)
-                if pg_user_id is None:
-                    skipped += 1
-                    continue
+    # ──────────────────────────────────────────────────────────────────────────
+    # migrate_usuario_partitions
+    # ──────────────────────────────────────────────────────────────────────────
 
-                profile_uuid = det_uuid("profile", f"{u['id']}_{u['dni']}")
+    def migrate_usuario_partitions(self) -> bool:
+        """
+        Reparte `usuario` en rangos disjuntos de (id, dni) con la misma
+        cantidad de filas y migra cada uno (users → profiles → profile_*) en
+        un proceso propio, con sus conexiones, mapas de IDs y checkpoint.
+        La transformación (uuid5, armado de tuplas, adaptación de psycopg2)
+        deja así de estar limitada a un núcleo.
+
+        Los rangos se guardan en el checkpoint: --resume reutiliza los mismos
+        aunque `usuario` haya cambiado y cada proceso retoma su marca de agua.
+        """
+        logger.info("\n" + "=" * 60)
+        logger.info(f"MIGRANDO: usuario en {self.partitions} particiones")
+        try:
+            bounds = self.checkpoint.value(PARTITIONS_KEY) if self.resume else None
+            if bounds is None:
+                bounds = self._partition_bounds()
+                self.checkpoint.set_value(PARTITIONS_KEY, bounds)
+            bounds = [
+                tuple(tuple(key) if key is not None else None for key in b) for b in bounds
+            ]
+            if not bounds:
+                logger.info("✓ usuario sin filas para migrar")
+                return True
 
-                pg_id = self._insert_one_with_savepoint(
-                    pg_cur,
-                    """
-                    INSERT INTO profiles
-                        (uuid, user_id, dni, first_name, middle_name,
-                         last_name, second_last_name, gender, birth_date,
-                         phone, mobile, avatar_url, created_at, updated_at)
-                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                    ON CONFLICT (uuid) DO NOTHING
-                    RETURNING id
-                    """,
-                    (
-                        profile_uuid,
-                        pg_user_id,
-                        str(u["id"]),         # nro de documento
-                        u["nombre1"],
-                        u.get("nombre2"),
-                        u["apellido1"],
-                        u.get("apellido2"),
-                        u.get("genero"),
-                        u.get("fecha_nacimiento"),
-                        u.get("telefono"),
-                        u.get("celular"),
-                        u.get("imagen"),
-                        u["created_at"] or NOW,
-                        u["updated_at"] or NOW,
-                    ),
+            budget = self._partition_budget(len(bounds))
+            jobs = [
+                self._partition_job(i, len(bounds), b, budget) for i, b in enumerate(bounds)
+            ]
+            outcomes: Dict[str, Dict] = {}
+            # spawn: un fork heredaría conexiones y locks de los hilos del padre
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=len(jobs), mp_context=context) as pool:
+                futures = {pool.submit(_run_partition, job): job["label"] for job in jobs}
+                for future in as_completed(futures):
+                    outcomes[futures[future]] = future.result()
+
+        except Exception as err:
+            logger.error(f"✗ usuario_partitions: {err}")
+            traceback.print_exc()
+            self.stats["errors"].append(f"usuario_partitions: {err}")
+            return False
+
+        return self._merge_partitions(outcomes)
+
+    def _partition_bounds(self) -> List[Tuple[Optional[tuple], Optional[tuple]]]:
+        """
+        Cortes (id, dni) que reparten `usuario` en self.partitions rangos de
+        igual cantidad de filas, respetando el límite y el filtro delta.
+        Cada rango es (después de, hasta); None = sin cota.
+        """
+        where = self._and_where(self._delta_condition())
+        where_sql = f"WHERE {where}" if where else ""
+        cur = self.mariadb_conn.cursor()
+        try:
+            cur.execute(f"SELECT COUNT(*) FROM usuario {where_sql}")
+            total = cur.fetchone()[0]
+            if self.limit is not None:
+                total = min(total, self.limit)
+            count = min(self.partitions, total)
+            cuts: List[Optional[tuple]] = []
+            for i in range(1, count + 1):
+                if i == count and self.limit is None:
+                    # Último rango abierto: incluye lo insertado durante el conteo
+                    cuts.append(None)
+                    break
+                cur.execute(
+                    f"SELECT id, dni FROM usuario {where_sql}"
+                    f" ORDER BY id, dni LIMIT 1 OFFSET {total * i // count - 1}"
                 )
-                if pg_id:
-                    self.profile_id_map[key] = pg_id
-                    migrated += 1
+                cuts.append(tuple(cur.fetchone()))
+        finally:
+            cur.close()
+        return [(cuts[i - 1] if i else None, cuts[i]) for i in range(count)]
 
-            self.postgres_conn.commit()
-            pg_cur.close()
+    def _partition_budget(self, count: int) -> Optional[int]:
+        """
+        Presupuesto de memoria de cada proceso de partición: lo que queda
+        del total tras reservar lo que ya ocupa este proceso, repartido en
+        partes iguales (cada proceso mide solo su propia memoria).
+        """
+        if not self.memory_budget_mb:
+            return None
+        parent = current_memory_mb() or 0.0
+        budget = max(1, int(self.memory_budget_mb - parent) // count)
+        logger.info(
+            f"  Presupuesto de memoria: {budget} MB por partición"
+            f" ({self.memory_budget_mb} MB - {parent:.0f} MB del proceso principal)"
+        )
+        return budget
+
+    def _partition_job(
+        self, index: int, count: int, bounds: Tuple, memory_budget_mb: Optional[int]
+    ) -> Dict:
+        """Parámetros (serializables) del proceso que migra una partición."""
+        return {
+            "label": f"p{index + 1}/{count}",
+            "bounds": bounds,
+            "delta_since": self.delta_since,
+            "migrator": {
+                "mariadb_config": self.mariadb_config,
+                "postgres_config": self.postgres_config,
+                "batch_size": self.batch_size,
+                "queue_size": self.queue_size,
+                "load_engine": self.load_engine,
+                "fanout": self.fanout,
+                "workers": self.workers,
+                "resume": self.resume,
+                "delta": self.delta,
+                "skip_unchanged": self.skip_unchanged,
+                "adaptive_batch": self.adaptive_batch,
+                "memory_budget_mb": memory_budget_mb,
+                "checkpoint_path": _partition_file(self.checkpoint_path, index),
+                "id_map_path": (
+                    _partition_file(self.id_map_path, index) if self.id_map_path else None
+                ),
+            },
+        }
+
+    def _merge_partitions(self, outcomes: Dict[str, Dict]) -> bool:
+        """Suma contadores, errores y cuarentena de las particiones al resumen."""
+        ok = True
+        for label in sorted(outcomes):
+            out = outcomes[label]
+            part_ok = bool(out["steps"]) and all(out["steps"].values()) and not out["errors"]
+            ok = ok and part_ok
+            with self._stats_lock:
+                self.stats["migrated_records"] += out["migrated_records"]
+                self.stats["total_records"] += out["total_records"]
+                self.stats["errors"] += [f"{label} {e}" for e in out["errors"]]
+                self.stats["quarantined"] += [tuple(q) for q in out["quarantined"]]
+                for key in ("skipped", "unchanged", "reconnects"):
+                    for step, count in out[key].items():
+                        self.stats[key][step] = self.stats[key].get(step, 0) + count
+                self.stats.setdefault("partitions", {})[label] = {
+                    "seconds": round(out["seconds"], 3),
+                    "peak_memory_mb": out["peak_memory_mb"],
+                    "pipeline": out["pipeline"],
+                    "batch_sizes": out["batch_sizes"],
+                    "memory": out["memory"],
+                }
+            self.metrics.merge(out["metrics"])
+            logger.info(
+                f"  {'✓' if part_ok else '✗'} {label}: {out['migrated_records']}"
+                f"/{out['total_records']} registros en {out['seconds']:.1f}s"
+            )
+        # Una tabla cuenta como migrada si terminó en todas las particiones
+        tables = min(out["migrated_tables"] for out in outcomes.values())
+        self._record_step(0, 0, tables=tables)
+        return ok
+
+    def execute_partition(self) -> Dict:
+        """
+        Cuerpo de un proceso del modo particionado: migra la cadena de
+        `usuario` dentro de self.partition y devuelve contadores y errores
+        (serializables) para que el proceso principal arme el resumen.
+        """
+        results = {}
+        try:
+            if self.connect():
+                self._load_lookup_tables()
+                steps = self._usuario_chain()
+                self._prepare_run(steps)
+                results = run_dag(steps, max_workers=self.workers)
+            else:
+                self.stats["errors"].append("sin conexión")
+        except Exception as err:
+            logger.error(f"Error fatal: {err}")
+            traceback.print_exc()
+            self.stats["errors"].append(str(err))
+        finally:
+            self.disconnect()
+
+        return {
+            "steps": {name: r.ok for name, r in results.items()},
+            "seconds": (datetime.now() - self.stats["start_time"]).total_seconds(),
+            "metrics": self.metrics.as_dict(),
+            "pipeline": self.stats["pipeline"],
+            "batch_sizes": {step: s.as_dict() for step, s in self._sizers.items()},
+            "peak_memory_mb": peak_memory_mb(),
+            "memory": self._memory_report(),
+            **{
+                key: self.stats[key]
+                for key in ("migrated_tables", "total_records", "migrated_records",
+                            "errors", "quarantined", "skipped", "unchanged", "reconnects")
+            },
+        }
+
+    # ──────────────────────────────────────────────────────────────────────────
+    # Modo desconectado: extracción a archivos (--extract) y carga (--load)
+    # ──────────────────────────────────────────────────────────────────────────
+
+    def _offline_datasets(self) -> Dict[str, Dict]:
+        """
+        Conjuntos de --extract: tabla destino, columnas, ON CONFLICT y FK que
+        viajan como uuid ({columna → tabla referenciada}).
+        """
+        profile_ref = {"profile_id": "profiles"}
+        users_conflict = self._on_conflict("provider_auth_id", USERS_COLUMNS)
+        return {
+            "roles": {
+                "table": "roles", "columns": ROLES_COLUMNS,
+                "conflict": ROLES_CONFLICT, "refs": {},
+            },
+            "users": {
+                "table": "users", "columns": USERS_COLUMNS,
+                "conflict": users_conflict, "refs": {},
+            },
+            "users_auth": {
+                "table": "users", "columns": USERS_COLUMNS,
+                "conflict": users_conflict, "refs": {},
+            },
+            "profiles": {
+                "table": "profiles", "columns": PROFILES_COLUMNS,
+                "conflict": self._on_conflict(None, PROFILES_COLUMNS),
+                "refs": {"user_id": "users"},
+            },
+            "profile_addresses": {
+                "table": "profile_addresses", "columns": PROFILE_ADDRESSES_COLUMNS,
+                "conflict": self._on_conflict("uuid", PROFILE_ADDRESSES_COLUMNS),
+                "refs": profile_ref,
+            },
+            "profile_employment": {
+                "table": "profile_employment", "columns": PROFILE_EMPLOYMENT_COLUMNS,
+                "conflict": self._on_conflict("uuid", PROFILE_EMPLOYMENT_COLUMNS),
+                "refs": profile_ref,
+            },
+            "profile_family": {
+                "table": "profile_family", "columns": PROFILE_FAMILY_COLUMNS,
+                "conflict": self._on_conflict("profile_id", PROFILE_FAMILY_COLUMNS),
+                "refs": profile_ref,
+            },
+            "profile_dni": {
+                "table": "profile_dni", "columns": PROFILE_DNI_COLUMNS,
+                "conflict": self._on_conflict("uuid", PROFILE_DNI_COLUMNS),
+                "refs": profile_ref,
+            },
+            "user_roles": {
+                "table": "user_roles", "columns": USER_ROLES_COLUMNS,
+                "conflict": USER_ROLES_CONFLICT,
+                "refs": {"user_id": "users", "role_id": "roles"},
+            },
+        }
+
+    def _use_uuid_maps(self):
+        """Mapas de --extract: clave ERP → uuid determinista de la fila destino."""
+        self.role_id_map = UuidKeyMap(lambda k: det_uuid("role", str(k)))
+        self.erp_auth_user_map = UuidKeyMap(lambda k: det_uuid("auth_user", str(k)))
+        self.usuario_id_map = UuidKeyMap(lambda k: det_uuid("usuario", f"{k[0]}_{k[1]}"))
+        self.profile_id_map = UuidKeyMap(lambda k: det_uuid("profile", f"{k[0]}_{k[1]}"))
+
+    def extract_roles(self, writer: ExtractWriter) -> bool:
+        logger.info("\n" + "=" * 60)
+        logger.info("EXTRAYENDO: roles")
+        try:
+            rows = self._read_roles()
+            with self.metrics.phase("roles", "transform", rows=len(rows)):
+                values = self._transform_roles(rows)
+            with self.metrics.phase("roles", "load", rows=len(rows)):
+                writer.write("roles", values)
+                writer.write(
+                    ID_MAPS_DATASET,
+                    (("role", r["id"], 0, v[0]) for r, v in zip(rows, values)),
+                )
+            self._record_step(len(values), len(rows))
+            logger.info(f"✓ {len(values)} roles")
+            return True
+
+        except Exception as err:
+            logger.error(f"✗ roles: {err}")
+            traceback.print_exc()
+            self.stats["errors"].append(f"roles: {err}")
+            return False
+
+    def extract_usuario(self, writer: ExtractWriter) -> bool:
+        """
+        Lectura única de `usuario` → users, profiles y profile_*. Sin
+        PostgreSQL no hay dependencia entre destinos: cada lote se reparte
+        entre todos los transformadores y se escribe en sus archivos.
+        """
+        logger.info("\n" + "=" * 60)
+        logger.info("EXTRAYENDO (lectura única): " + ", ".join(USUARIO_FANOUT_STEPS))
+        specs = self._usuario_specs()
+        columns: List[str] = []
+        for step in USUARIO_FANOUT_STEPS:
+            columns += [c for c in specs[step]["columns"] if c not in columns]
+
+        try:
+            def load(rows: List[Dict], _payload):
+                batch: Counter = Counter()
+                for step in USUARIO_FANOUT_STEPS:
+                    spec = specs[step]
+                    accepted = (
+                        [u for u in rows if spec["accept"](u)]
+                        if spec["accept"] else rows
+                    )
+                    if not accepted:
+                        continue
+                    with self.metrics.phase(step, "transform", rows=len(accepted)):
+                        payload = spec["transform"](accepted)
+                    out = payload[0] if isinstance(payload, tuple) else payload
+                    with self.metrics.phase(step, "load", rows=len(accepted)):
+                        writer.write(step, out)
+                        if step == "users":
+                            writer.write(ID_MAPS_DATASET, (
+                                ("usuario", key[0], key[1], row[0])
+                                for key, row in zip(payload[1], out)
+                            ))
+                        elif step == "profiles":
+                            writer.write(ID_MAPS_DATASET, (
+                                ("profile", key[0], key[1], profile_uuid)
+                                for profile_uuid, key in payload[1].items()
+                            ))
+                    batch[step, "written"] += len(out)
+                    batch[step, "total"] += len(accepted)
+                return batch
+
+            counts = self._pipeline_usuario("usuario", tuple(columns), load, commit=False)
+            written = {step: counts[step, "written"] for step in USUARIO_FANOUT_STEPS}
+            total = {step: counts[step, "total"] for step in USUARIO_FANOUT_STEPS}
+
+            for step in USUARIO_FANOUT_STEPS:
+                self._record_step(written[step], total[step])
+                logger.info(f"✓ {written[step]}/{total[step]} {step}")
+            return True
+
+        except Exception as err:
+            logger.error(f"✗ usuario: {err}")
+            traceback.print_exc()
+            self.stats["errors"].append(f"usuario: {err}")
+            return False
+
+    def extract_auth_users(self, writer: ExtractWriter) -> bool:
+        logger.info("\n" + "=" * 60)
+        logger.info("EXTRAYENDO: users (auth)")
+        written = 0
+        try:
+            for auth_users in self._iter_keyset(
+                "users",
+                "id, email, name, email_verified_at, created_at, updated_at",
+                keys=("id",),
+                where=self._and_where(self._delta_condition()),
+                step="users_auth",
+            ):
+                with self.metrics.phase("users_auth", "transform", rows=len(auth_users)):
+                    rows_auth, auth_key_to_provider = self._transform_auth_users(auth_users)
+                with self.metrics.phase("users_auth", "load", rows=len(auth_users)):
+                    writer.write("users_auth", rows_auth)
+                    writer.write(ID_MAPS_DATASET, (
+                        ("auth_user", erp_id, 0, row[0])
+                        for erp_id, row in zip(auth_key_to_provider, rows_auth)
+                    ))
+                written += len(rows_auth)
+
+            self._record_step(written, written, tables=0)
+            logger.info(f"✓ {written} auth users")
+            return True
+
+        except Exception as err:
+            logger.error(f"✗ users_auth: {err}")
+            traceback.print_exc()
+            self.stats["errors"].append(f"users_auth: {err}")
+            return False
+
+    def extract_user_roles(self, writer: ExtractWriter) -> bool:
+        logger.info("\n" + "=" * 60)
+        logger.info("EXTRAYENDO: user_roles")
+        try:
+            rows = self._read_user_roles()
+            with self.metrics.phase("user_roles", "transform", rows=len(rows)):
+                to_insert, _ = self._transform_user_roles(rows)
+            with self.metrics.phase("user_roles", "load", rows=len(to_insert)):
+                writer.write("user_roles", to_insert)
+            self._record_step(len(to_insert), len(rows))
+            logger.info(f"✓ {len(to_insert)} user_roles")
+            return True
+
+        except Exception as err:
+            logger.error(f"✗ user_roles: {err}")
+            traceback.print_exc()
+            self.stats["errors"].append(f"user_roles: {err}")
+            return False
+
+    def execute_extract(self, directory: str) -> bool:
+        """
+        Modo --extract: lee el ERP una sola vez y deja en `directory` las
+        filas transformadas de cada destino y el mapa clave ERP → uuid, sin
+        conectarse a PostgreSQL (ver offline_files.py). Como las FK viajan
+        como uuid, los cuatro recorridos son independientes y se solapan
+        con workers > 1.
+        """
+        if self.resume:
+            raise ValueError("--resume no aplica a --extract: repetir la extracción")
+        self.offline, self.offline_dir = "extract", directory
+        writer: Optional[ExtractWriter] = None
+        try:
+            if not self.connect():
+                return False
+
+            logger.info("\n" + "█" * 60)
+            logger.info("EXTRACCIÓN ERP → ARCHIVOS".center(60))
+            logger.info("█" * 60)
+            logger.info(f"  Destino: {directory}")
+            self._load_lookup_tables()
+            self._start_sync()
+            self._use_uuid_maps()
+
+            writer = ExtractWriter(directory, MIGRATION_SETTINGS["offline_part_rows"])
+            for name, meta in self._offline_datasets().items():
+                writer.dataset(name, **meta)
+            writer.dataset(ID_MAPS_DATASET, None, ID_MAPS_COLUMNS)
+
+            steps = [
+                Step("roles", partial(self.extract_roles, writer)),
+                Step("usuario", partial(self.extract_usuario, writer)),
+                Step("users_auth", partial(self.extract_auth_users, writer)),
+                Step("user_roles", partial(self.extract_user_roles, writer)),
+            ]
+            if self.workers > 1:
+                for step in steps:
+                    step.func = self._with_thread_connections(step.func)
+            steps = self._with_profiling(steps)
+            results = run_dag(steps, max_workers=self.workers)
+            ok = all(r.ok for r in results.values())
+            if ok:
+                writer.close({
+                    "source": self.mariadb_config.get("database"),
+                    "sync_started_at": self.sync_started_at,
+                    "delta": self.delta,
+                    "delta_since": self.delta_since,
+                    "limit": self.limit,
+                })
+                self.checkpoint.set_last_sync(self.sync_started_at)
+            else:
+                writer.abort()
+
+            elapsed = (datetime.now() - self.stats["start_time"]).total_seconds()
+            path, path_seconds = critical_path(steps, results)
+            self.report_file = report_path(self.stats["start_time"])
+            write_report(
+                self.report_file,
+                self._build_report(steps, results, path, path_seconds, elapsed),
+            )
+
+            logger.info("\n" + "█" * 60)
+            logger.info(("EXTRACCIÓN COMPLETADA" if ok else "EXTRACCIÓN INCOMPLETA").center(60))
+            logger.info("█" * 60)
+            logger.info(f"  Duración   : {elapsed:.1f}s")
+            for name in self._offline_datasets():
+                logger.info(f"    {name:<20} {writer.rows(name):>10} filas")
+            logger.info(f"  Errores    : {len(self.stats['errors'])}")
+            for e in self.stats["errors"][:10]:
+                logger.warning(f"  - {e}")
+            if self.profiler is not None:
+                self.profiler.log_summary(MIGRATION_SETTINGS["profile_top"])
+            logger.info(f"  Reporte    : {self.report_file}")
+            logger.info("█" * 60 + "\n")
+            return ok
+
+        except Exception as err:
+            if writer is not None:
+                writer.abort()
+            logger.error(f"Error fatal: {err}")
+            traceback.print_exc()
+            return False
+        finally:
+            self.disconnect()
+
+    def load_dataset(self, directory: str, name: str, dataset: Dict) -> bool:
+        """
+        Carga las partes de un conjunto de --extract. Con workers > 1 las
+        partes se cargan en paralelo; cada una usa su propia conexión y
+        transacción y queda marcada en el checkpoint al confirmarse.
+        """
+        logger.info("\n" + "=" * 60)
+        logger.info(f"CARGANDO: {name} ({dataset['rows']} filas, {len(dataset['parts'])} partes)")
+        try:
+            pending = [
+                part for part in dataset["parts"]
+                if not (self.resume and self.checkpoint.is_done(f"load:{part['file']}"))
+            ]
+            if len(pending) < len(dataset["parts"]):
+                logger.info(f"  Retomando {name}: {len(pending)} partes pendientes")
+
+            def load(part: Dict) -> int:
+                return self._load_part(directory, name, dataset, part)
+
+            if self.profiler is not None:
+                load = self.profiler.attach(load)
+            if self.workers > 1 and len(pending) > 1:
+                with ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix=f"load-{name}"
+                ) as pool:
+                    migrated = sum(pool.map(load, pending))
+            else:
+                migrated = sum(load(part) for part in pending)
 
-            self.stats["migrated_tables"] += 1
-            self.stats["migrated_records"] += migrated
-            self.stats["total_records"] += len(rows)
-            logger.info(f"✓ {migrated}/{len(rows)} profiles (omitidos: {skipped})")
+            total = sum(part["rows"] for part in pending)
+            self._record_step(migrated, total, tables=0 if name == "users_auth" else 1)
+            logger.info(f"✓ {migrated}/{total} {name}")
             return True
 
         except Exception as err:
-            self.postgres_conn.rollback()
-            logger.error(f"✗ profiles: {err}")
+            logger.error(f"✗ {name}: {err}")
             traceback.print_exc()
-            self.stats["errors"].append(f"profiles: {err}")
+            self.stats["errors"].append(f"{name}: {err}")
             return False
 
-    # ──────────────────────────────────────────────────────────────────────────
-    # migrate_profile_addresses
-    # ──────────────────────────────────────────────────────────────────────────
+    def _load_part(self, directory: str, name: str, dataset: Dict, part: Dict) -> int:
+        """COPY de una parte a staging + INSERT ... SELECT con las FK resueltas por uuid."""
+        conn = self._open_postgres()
+        try:
+            pg_cur = conn.cursor()
+            with open_part(directory, part) as source, \
+                    self.metrics.phase(name, "load", rows=part["rows"]) as span:
+                migrated = CopyLoader(pg_cur).merge_file(
+                    dataset["table"], dataset["columns"], source,
+                    dataset["conflict"], dataset["refs"],
+                )
+                span.nbytes = os.path.getsize(os.path.join(directory, part["file"]))
+            with self.metrics.phase(name, "commit"):
+                conn.commit()
+            pg_cur.close()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._close_conn(conn)
+        self.checkpoint.mark_done(f"load:{part['file']}")
+        logger.debug(f"  {name}: {part['file']} confirmado ({migrated}/{part['rows']})")
+        return migrated
 
-    def migrate_profile_addresses(self) -> bool:
+    def load_id_maps(self, directory: str, dataset: Dict) -> bool:
         """
-        ERP usuario → ALMA profile_addresses
-
-        Columnas ERP → ALMA:
-          pais.nombre   → country   (join con tabla pais)
-          provincia.nombre → state  (join con tabla provincia)
-          usuario.ciudad   → city
-          usuario.direccion → address_line
-          usuario.barrio   → neighborhood
+        Llena los mapas persistentes (--id-maps) con los IDs que recibieron en
+        PostgreSQL las claves ERP de la extracción, para que un --delta o
+        --resume posterior en modo directo no tenga que reconstruirlos.
         """
         logger.info("\n" + "=" * 60)
-        logger.info("MIGRANDO: profile_addresses")
+        logger.info("CARGANDO: mapas de IDs")
+        tables = {"role": "roles", "auth_user": "users", "usuario": "users", "profile": "profiles"}
+        id_maps = self._id_maps()
+        conn = self._open_postgres()
         try:
-            cur = self.mariadb_conn.cursor(dictionary=True)
-            cur.execute(
-                """
-                SELECT id, dni, pais, provincia, ciudad, direccion, barrio,
-                       created_at, updated_at
-                FROM usuario
-                WHERE pais IS NOT NULL
-                   OR ciudad IS NOT NULL
-                   OR direccion IS NOT NULL
-                """
-            )
-            rows = cur.fetchall()
-            cur.close()
-
-            pg_cur = self.postgres_conn.cursor()
-            to_insert = []
-
-            for u in rows:
-                key = (u["id"], u["dni"])
-                pg_profile_id = self.profile_id_map.get(key)
-                if pg_profile_id is None:
-                    continue
-
-                to_insert.append((
-                    det_uuid("address", f"{u['id']}_{u['dni']}"),
-                    pg_profile_id,
-                    self.pais_map.get(u["pais"]) if u["pais"] else None,
-                    self.provincia_map.get(u["provincia"]) if u["provincia"] else None,
-                    u.get("ciudad"),
-                    "HOME",
-                    True,
-                    u.get("direccion"),
-                    u.get("barrio"),
-                    u["created_at"] or NOW,
-                    u["updated_at"] or NOW,
-                ))
-
-            if to_insert:
-                execute_values(
-                    pg_cur,
-                    """
-                    INSERT INTO profile_addresses
-                        (uuid, profile_id, country, state, city,
-                         "adressType", is_primary, address_line, neighborhood,
-                         created_at, updated_at)
-                    VALUES %s
-                    ON CONFLICT (uuid) DO NOTHING
-                    """,
-                    to_insert,
-                )
-
-            self.postgres_conn.commit()
+            pg_cur = conn.cursor()
+            for part in dataset["parts"]:
+                pending: Dict[str, List[Tuple[tuple, str]]] = {}
+                for map_name, k1, k2, row_uuid in read_rows(directory, part):
+                    batch = pending.setdefault(map_name, [])
+                    batch.append(((int(k1), int(k2)), row_uuid))
+                    if len(batch) >= self.batch_size:
+                        self._resolve_id_map(pg_cur, tables[map_name], id_maps[map_name], batch)
+                        batch.clear()
+                for map_name, batch in pending.items():
+                    self._resolve_id_map(pg_cur, tables[map_name], id_maps[map_name], batch)
+            conn.commit()
             pg_cur.close()
 
-            self.stats["migrated_tables"] += 1
-            self.stats["migrated_records"] += len(to_insert)
-            self.stats["total_records"] += len(rows)
-            logger.info(f"✓ {len(to_insert)}/{len(rows)} profile_addresses")
+            logger.info(
+                f"✓ roles: {len(self.role_id_map)} | personas: {len(self.usuario_id_map)}"
+                f" | auth: {len(self.erp_auth_user_map)} | profiles: {len(self.profile_id_map)}"
+            )
             return True
 
         except Exception as err:
-            self.postgres_conn.rollback()
-            logger.error(f"✗ profile_addresses: {err}")
-            self.stats["errors"].append(f"profile_addresses: {err}")
+            logger.error(f"✗ id_maps: {err}")
+            traceback.print_exc()
+            self.stats["errors"].append(f"id_maps: {err}")
             return False
+        finally:
+            self._close_conn(conn)
 
-    # ──────────────────────────────────────────────────────────────────────────
-    # migrate_profile_employment
-    # ──────────────────────────────────────────────────────────────────────────
+    def _resolve_id_map(self, pg_cur, table: str, id_map, entries: List[Tuple[tuple, str]]):
+        if not entries:
+            return
+        by_uuid = {
+            row_uuid: key if id_map.arity == 2 else key[0] for key, row_uuid in entries
+        }
+        with self.metrics.phase("id_maps", "lookup", rows=len(by_uuid)):
+            found = self._fetch_any(
+                pg_cur, f"SELECT id, uuid FROM {table} WHERE uuid = ANY(%s)", list(by_uuid),
+            )
+        id_map.put_many((by_uuid[row_uuid], pg_id) for pg_id, row_uuid in found)
 
-    def migrate_profile_employment(self) -> bool:
+    def execute_load(self, directory: str) -> bool:
         """
-        ERP usuario → ALMA profile_employment
-
-        Columnas ERP → ALMA:
-          t_ocupacion.tipo   → occupation  (join con t_ocupacion)
-          usuario.empresa    → company_name
-          usuario.telefono_empresa → company_phone
-          usuario.fecha_ingreso_empresa → start_date
-          end_date → NULL (no disponible en ERP)
+        Modo --load: carga en PostgreSQL una extracción de --extract sin
+        tocar el ERP. Cada conjunto es un paso del planificador y depende
+        de los conjuntos de las tablas que referencian sus FK. Las partes
+        se fusionan con ON CONFLICT, así que la carga puede repetirse;
+        con --resume se saltan las partes ya confirmadas.
         """
-        logger.info("\n" + "=" * 60)
-        logger.info("MIGRANDO: profile_employment")
+        self.offline, self.offline_dir = "load", directory
         try:
-            cur = self.mariadb_conn.cursor(dictionary=True)
-            cur.execute(
-                """
-                SELECT id, dni, ocupacion, empresa, telefono_empresa,
-                       fecha_ingreso_empresa, created_at, updated_at
-                FROM usuario
-                WHERE empresa IS NOT NULL OR ocupacion IS NOT NULL
-                """
-            )
-            rows = cur.fetchall()
-            cur.close()
-
-            pg_cur = self.postgres_conn.cursor()
-            to_insert = []
+            manifest = read_manifest(directory)
+            if not self.connect():
+                return False
 
-            for u in rows:
-                key = (u["id"], u["dni"])
-                pg_profile_id = self.profile_id_map.get(key)
-                if pg_profile_id is None:
-                    continue
+            logger.info("\n" + "█" * 60)
+            logger.info("CARGA ARCHIVOS → ALMA_BE_V2".center(60))
+            logger.info("█" * 60)
+            logger.info(
+                f"  Extracción: {directory} (origen {manifest['source']},"
+                f" {manifest['created_at']}, delta={manifest['delta']})"
+            )
+            if not self.resume:
+                self.checkpoint.reset(keep=(DEFERRED_DDL_KEY,))
 
-                occupation = (
-                    self.t_ocupacion_map.get(u["ocupacion"])
-                    if u["ocupacion"] else None
+            datasets = {
+                name: ds for name, ds in manifest["datasets"].items() if ds["table"]
+            }
+            steps = [
+                Step(
+                    name,
+                    partial(self.load_dataset, directory, name, ds),
+                    deps=tuple(
+                        other for other, ref in datasets.items()
+                        if other != name and ref["table"] in ds["refs"].values()
+                    ),
                 )
-                to_insert.append((
-                    det_uuid("employment", f"{u['id']}_{u['dni']}"),
-                    pg_profile_id,
-                    occupation,
-                    u.get("empresa"),
-                    u.get("telefono_empresa"),
-                    u.get("fecha_ingreso_empresa"),
-                    None,   # end_date: no disponible en ERP
-                    u["created_at"] or NOW,
-                    u["updated_at"] or NOW,
+                for name, ds in datasets.items()
+            ]
+            if self.id_store is not None:
+                steps.append(Step(
+                    "id_maps",
+                    partial(self.load_id_maps, directory, manifest["datasets"][ID_MAPS_DATASET]),
+                    deps=tuple(datasets),
                 ))
+            for step in steps:
+                step.func = self._with_checkpoint(step.name, step.func)
+            steps = self._with_profiling(self._with_deferred_ddl(steps))
+            results = run_dag(steps, max_workers=self.workers)
+            ok = all(r.ok for r in results.values())
+            path, path_seconds = critical_path(steps, results)
 
-            if to_insert:
-                execute_values(
-                    pg_cur,
-                    """
-                    INSERT INTO profile_employment
-                        (uuid, profile_id, occupation, company_name, company_phone,
-                         start_date, end_date, created_at, updated_at)
-                    VALUES %s
-                    ON CONFLICT (uuid) DO NOTHING
-                    """,
-                    to_insert,
-                )
-
-            self.postgres_conn.commit()
-            pg_cur.close()
+            elapsed = (datetime.now() - self.stats["start_time"]).total_seconds()
+            self.report_file = report_path(self.stats["start_time"])
+            write_report(
+                self.report_file,
+                self._build_report(steps, results, path, path_seconds, elapsed),
+            )
 
-            self.stats["migrated_tables"] += 1
-            self.stats["migrated_records"] += len(to_insert)
-            self.stats["total_records"] += len(rows)
-            logger.info(f"✓ {len(to_insert)}/{len(rows)} profile_employment")
-            return True
+            logger.info("\n" + "█" * 60)
+            logger.info(("CARGA COMPLETADA" if ok else "CARGA INCOMPLETA").center(60))
+            logger.info("█" * 60)
+            logger.info(f"  Duración   : {elapsed:.1f}s")
+            logger.info(
+                f"  Registros  : {self.stats['migrated_records']}"
+                f" / {self.stats['total_records']}"
+            )
+            logger.info(f"  Errores    : {len(self.stats['errors'])}")
+            for e in self.stats["errors"][:10]:
+                logger.warning(f"  - {e}")
+            logger.info("  Pasos      :")
+            for step in steps:
+                logger.info(f"    {self._step_line(step.name, results[step.name])}")
+            if self.profiler is not None:
+                self.profiler.log_summary(MIGRATION_SETTINGS["profile_top"])
+            logger.info(f"  Reporte    : {self.report_file}")
+            logger.info("█" * 60 + "\n")
+            return ok
 
         except Exception as err:
-            self.postgres_conn.rollback()
-            logger.error(f"✗ profile_employment: {err}")
-            self.stats["errors"].append(f"profile_employment: {err}")
+            logger.error(f"Error fatal: {err}")
+            traceback.print_exc()
             return False
+        finally:
+            self.disconnect()
 
     # ──────────────────────────────────────────────────────────────────────────
-    # migrate_profile_family
+    # Verificación por sumas de verificación (--verify)
     # ──────────────────────────────────────────────────────────────────────────
 
-    def migrate_profile_family(self) -> bool:
+    def _verify_hashers(self) -> Dict[str, RowHasher]:
+        """Un RowHasher por tabla verificada, sin las columnas VOLATILE_COLUMNS."""
+        pg_cur = self.postgres_conn.cursor()
+        hashers = {}
+        for name, meta in self._offline_datasets().items():
+            if name not in VERIFY_DATASETS:
+                continue
+            columns = [c for c in meta["columns"] if c not in VOLATILE_COLUMNS]
+            hashers[name] = RowHasher(
+                meta["table"], columns, column_types(pg_cur, meta["table"]), meta["refs"],
+            )
+        self.postgres_conn.commit()
+        pg_cur.close()
+        return hashers
+
+    def _verify_positions(self, name: str) -> List[int]:
+        """Posiciones de las columnas verificadas dentro de las tuplas del paso."""
+        columns = self._offline_datasets()[name]["columns"]
+        return [i for i, c in enumerate(columns) if c not in VOLATILE_COLUMNS]
+
+    def _verify_source_ranges(
+        self, hashers: Dict[str, RowHasher]
+    ) -> Iterator[Tuple[str, Dict[str, Dict[str, str]]]]:
         """
-        ERP usuario → ALMA profile_family
-
-        Columnas ERP → ALMA:
-          t_est_civil.tipo  → marital_status  (join con t_est_civil)
-          usuario.cant_hijos → children_count
+        Rangos del ERP: (etiqueta, {tabla → {uuid → md5}}). roles es un
+        rango; `usuario` se corta en rangos de ~verify_range_rows personas
+        consecutivas por (id, dni) y cada rango trae las filas esperadas de
+        users, profiles y profile_*, armadas con los transformadores de la
+        carga (FK como uuid).
         """
-        logger.info("\n" + "=" * 60)
-        logger.info("MIGRANDO: profile_family")
+        positions = {name: self._verify_positions(name) for name in VERIFY_DATASETS}
+
+        def hashes(name: str, rows: List[tuple]) -> Dict[str, str]:
+            hasher, cols = hashers[name], positions[name]
+            return {row[0]: hasher.row_hash([row[i] for i in cols]) for row in rows}
+
+        yield "roles", {"roles": hashes("roles", self._transform_roles(self._read_roles()))}
+
+        specs = self._usuario_specs()
+        columns: List[str] = []
+        for step in USUARIO_FANOUT_STEPS:
+            columns += [c for c in specs[step]["columns"] if c not in columns]
+
+        expected: Dict[str, Dict[str, str]] = {step: {} for step in USUARIO_FANOUT_STEPS}
+        first_key = last_key = None
+        rows_in_range = 0
+        for rows in self._stream_usuario(", ".join(columns), "verify"):
+            if first_key is None:
+                first_key = (rows[0]["id"], rows[0]["dni"])
+            for step in USUARIO_FANOUT_STEPS:
+                spec = specs[step]
+                accepted = [u for u in rows if spec["accept"](u)] if spec["accept"] else rows
+                if accepted:
+                    payload = spec["transform"](accepted)
+                    out = payload[0] if isinstance(payload, tuple) else payload
+                    expected[step].update(hashes(step, out))
+            rows_in_range += len(rows)
+            last_key = (rows[-1]["id"], rows[-1]["dni"])
+            if rows_in_range >= MIGRATION_SETTINGS["verify_range_rows"]:
+                yield f"usuario {first_key}..{last_key}", expected
+                expected = {step: {} for step in USUARIO_FANOUT_STEPS}
+                first_key, rows_in_range = None, 0
+        if rows_in_range:
+            yield f"usuario {first_key}..{last_key}", expected
+
+    def _verify_range(
+        self, hasher: RowHasher, name: str, label: str, expected: Dict[str, str]
+    ) -> Dict:
+        """
+        Compara un rango de `name` (hilo del pool, conexión propia): primero
+        el resumen calculado en PostgreSQL y, solo si difiere, fila a fila.
+        """
+        if self.postgres_conn is None:
+            self.postgres_conn = self._open_postgres()
+        pg_cur = self.postgres_conn.cursor()
         try:
-            cur = self.mariadb_conn.cursor(dictionary=True)
-            cur.execute(
-                """
-                SELECT id, dni, est_civil, cant_hijos, created_at, updated_at
-                FROM usuario
-                WHERE est_civil IS NOT NULL OR cant_hijos IS NOT NULL
-                """
+            uuids = list(expected)
+            result = {"table": name, "range": label, "rows": len(uuids), "ok": True}
+            if hasher.target_summary(pg_cur, uuids) == RowHasher.summarize(expected):
+                return result
+            found = hasher.target_hashes(pg_cur, uuids)
+            result.update(
+                ok=False,
+                missing=[u for u in uuids if u not in found],
+                different=[u for u in uuids if u in found and found[u] != expected[u]],
             )
-            rows = cur.fetchall()
-            cur.close()
-
-            pg_cur = self.postgres_conn.cursor()
-            to_insert = []
-
-            for u in rows:
-                key = (u["id"], u["dni"])
-                pg_profile_id = self.profile_id_map.get(key)
-                if pg_profile_id is None:
-                    continue
-
-                marital_status = (
-                    self.t_est_civil_map.get(u["est_civil"])
-                    if u["est_civil"] else None
-                )
-                to_insert.append((
-                    det_uuid("family", f"{u['id']}_{u['dni']}"),
-                    pg_profile_id,
-                    marital_status,
-                    u.get("cant_hijos"),
-                    u["created_at"] or NOW,
-                    u["updated_at"] or NOW,
-                ))
-
-            if to_insert:
-                execute_values(
-                    pg_cur,
-                    """
-                    INSERT INTO profile_family
-                        (uuid, profile_id, marital_status, children_count,
-                         created_at, updated_at)
-                    VALUES %s
-                    ON CONFLICT (profile_id) DO NOTHING
-                    """,
-                    to_insert,
-                )
-
+            return result
+        finally:
             self.postgres_conn.commit()
             pg_cur.close()
 
-            self.stats["migrated_tables"] += 1
-            self.stats["migrated_records"] += len(to_insert)
-            self.stats["total_records"] += len(rows)
-            logger.info(f"✓ {len(to_insert)}/{len(rows)} profile_family")
-            return True
+    def execute_verify(self) -> bool:
+        """
+        Modo --verify: recorre el ERP por rangos, arma las filas esperadas
+        con los mismos transformadores de la migración y compara sumas de
+        verificación independientes del orden contra PostgreSQL (ver
+        checksum.py). Los rangos se comparan en paralelo
+        (MIGRATION_SETTINGS['verify_workers'] conexiones) mientras sigue la
+        lectura; solo los que no coinciden se revisan fila a fila.
+        """
+        started = datetime.now()
+        results: List[Dict] = []
+        try:
+            if not self.connect():
+                return False
+            logger.info("\n" + "█" * 60)
+            logger.info("VERIFICACIÓN ERP ↔ PostgreSQL".center(60))
+            logger.info("█" * 60)
+            self._load_lookup_tables()
+            self._start_sync()
+            self._use_uuid_maps()
+            hashers = self._verify_hashers()
+
+            workers = max(1, MIGRATION_SETTINGS["verify_workers"])
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="verify") as pool:
+                pending = []
+                for label, expected in self._verify_source_ranges(hashers):
+                    for name, hashes in expected.items():
+                        if hashes:
+                            pending.append(pool.submit(
+                                self._verify_range, hashers[name], name, label, hashes,
+                            ))
+                    # Memoria acotada: no más de dos rangos por hilo esperando
+                    while len(pending) > workers * 2 * len(VERIFY_DATASETS):
+                        results.append(pending.pop(0).result())
+                results += [f.result() for f in pending]
 
         except Exception as err:
-            self.postgres_conn.rollback()
-            logger.error(f"✗ profile_family: {err}")
-            self.stats["errors"].append(f"profile_family: {err}")
-            return False
+            logger.error(f"Error fatal: {err}")
+            traceback.print_exc()
+            self.stats["errors"].append(str(err))
+        finally:
+            self.disconnect()
+
+        tables: Dict[str, Dict] = {}
+        for r in results:
+            t = tables.setdefault(r["table"], {
+                "rows": 0, "ranges": 0, "mismatched_ranges": 0,
+                "missing_rows": 0, "different_rows": 0, "missing": [], "different": [],
+            })
+            t["rows"] += r["rows"]
+            t["ranges"] += 1
+            if not r["ok"]:
+                t["mismatched_ranges"] += 1
+                for kind in ("missing", "different"):
+                    t[f"{kind}_rows"] += len(r[kind])
+                    # Muestra de uuids para revisar; el total queda en *_rows
+                    t[kind] += r[kind][:VERIFY_SAMPLE - len(t[kind])]
+
+        ok = not self.stats["errors"] and all(not t["mismatched_ranges"] for t in tables.values())
+        elapsed = (datetime.now() - started).total_seconds()
+        self.report_file = f"verify_report_{started:%Y%m%d_%H%M%S}.json"
+        write_report(self.report_file, {
+            "ok": ok,
+            "seconds": round(elapsed, 3),
+            "sync_started_at": self.sync_started_at,
+            "tables": tables,
+            "errors": self.stats["errors"],
+        })
+
+        logger.info("\n" + "█" * 60)
+        logger.info(("VERIFICACIÓN OK" if ok else "VERIFICACIÓN CON DIFERENCIAS").center(60))
+        logger.info("█" * 60)
+        logger.info(f"  Duración   : {elapsed:.1f}s")
+        for name, t in tables.items():
+            mark = "✓" if not t["mismatched_ranges"] else "✗"
+            logger.info(
+                f"  {mark} {name:<20} {t['rows']:>10} filas | rangos {t['ranges']}"
+                f" (distintos {t['mismatched_ranges']}) | faltan {t['missing_rows']}"
+                f" | distintas {t['different_rows']}"
+            )
+            for u in (t["missing"] + t["different"])[:5]:
+                logger.warning(f"      {u}")
+        for e in self.stats["errors"][:10]:
+            logger.warning(f"  - {e}")
+        logger.info(f"  Reporte    : {self.report_file}")
+        logger.info("█" * 60 + "\n")
+        return ok
 
     # ──────────────────────────────────────────────────────────────────────────
-    # migrate_profile_dni
+    # Orquestación
     # ──────────────────────────────────────────────────────────────────────────
 
-    def migrate_profile_dni(self) -> bool:
+    def _with_checkpoint(self, name: str, func: Callable[[], bool]) -> Callable[[], bool]:
+        """Salta el paso si ya terminó en una ejecución previa; si no, lo marca al terminar."""
+        def run() -> bool:
+            if self.resume and self.checkpoint.is_done(name):
+                logger.info(f"  ↷ {name}: completado en una ejecución anterior")
+                return True
+            ok = func()
+            if ok:
+                self.checkpoint.mark_done(name)
+            return ok
+        return run
+
+    def _restore_id_maps(self):
         """
-        ERP usuario → ALMA profile_dni
+        Reconstruye los mapas ERP → PostgreSQL desde lo ya migrado, para que
+        los pasos retomados (o posteriores a uno saltado) encuentren sus FK.
+        """
+        logger.info("  Reconstruyendo mapas de IDs desde PostgreSQL...")
+        cur = self.mariadb_conn.cursor()
+        cur.execute("SELECT id FROM roles")
+        role_uuids = {det_uuid("role", str(row[0])): row[0] for row in cur.fetchall()}
+        cur.close()
 
-        Columnas ERP → ALMA:
-          usuario.id            → (el número de documento está en usuario.id)
-          t_dni.abreviacion     → "dniType"  (CC, CE, PP, …)
-          usuario.fecha_nacimiento → birthdate
-          expedition_date → NULL (no disponible en ERP)
-          is_current → True
+        pg_cur = self.postgres_conn.cursor()
+        pg_cur.execute(
+            "SELECT id, uuid FROM roles WHERE uuid = ANY(%s)", (list(role_uuids),)
+        )
+        self.role_id_map.put_many(
+            (role_uuids[role_uuid], pg_id) for pg_id, role_uuid in pg_cur.fetchall()
+        )
+
+        # provider_auth_id codifica la clave ERP: erp_usuario_<id>_<dni> / erp_auth_<id>.
+        # Cursores de servidor: users y profiles llegan por bloques, no enteros
+        users_cur = self.postgres_conn.cursor(name="restore_users")
+        users_cur.execute(
+            "SELECT id, provider_auth_id FROM users"
+            " WHERE provider_auth_id LIKE 'erp\\_%'"
+        )
+        while True:
+            rows = users_cur.fetchmany(self.batch_size)
+            if not rows:
+                break
+            personas, auth = [], []
+            for pg_id, provider_id in rows:
+                parts = provider_id.split("_")
+                if parts[1] == "usuario":
+                    personas.append(((int(parts[2]), int(parts[3])), pg_id))
+                elif parts[1] == "auth":
+                    auth.append((int(parts[2]), pg_id))
+            self.usuario_id_map.put_many(personas)
+            self.erp_auth_user_map.put_many(auth)
+        users_cur.close()
+
+        profiles_cur = self.postgres_conn.cursor(name="restore_profiles")
+        profiles_cur.execute(
+            "SELECT p.id, u.provider_auth_id FROM profiles p"
+            " JOIN users u ON u.id = p.user_id"
+            " WHERE u.provider_auth_id LIKE 'erp\\_usuario\\_%'"
+        )
+        while True:
+            rows = profiles_cur.fetchmany(self.batch_size)
+            if not rows:
+                break
+            profiles = []
+            for pg_id, provider_id in rows:
+                parts = provider_id.split("_")
+                profiles.append(((int(parts[2]), int(parts[3])), pg_id))
+            self.profile_id_map.put_many(profiles)
+        profiles_cur.close()
+        self.postgres_conn.commit()
+        pg_cur.close()
+
+        logger.info(
+            f"  roles: {len(self.role_id_map)} | personas: {len(self.usuario_id_map)}"
+            f" | auth: {len(self.erp_auth_user_map)} | profiles: {len(self.profile_id_map)}"
+        )
+
+    def _with_thread_connections(self, func: Callable[[], bool]) -> Callable[[], bool]:
+        """Envuelve un paso para que use las conexiones del hilo que lo ejecuta."""
+        def run() -> bool:
+            self._ensure_thread_connections()
+            return func()
+        return run
+
+    def _usuario_chain(self) -> List[Step]:
+        """Pasos alimentados por `usuario` (lectura única o uno por tabla)."""
+        if self.fanout:
+            return [Step("usuario_fanout", self.migrate_usuario_fanout)]
+        return [
+            Step("users", self.migrate_users),
+            Step("profiles", self.migrate_profiles, deps=("users",)),
+            Step("profile_addresses", self.migrate_profile_addresses, deps=("profiles",)),
+            Step("profile_employment", self.migrate_profile_employment,
+                 deps=("profiles",)),
+            Step("profile_family", self.migrate_profile_family, deps=("profiles",)),
+            Step("profile_dni", self.migrate_profile_dni, deps=("profiles",)),
+        ]
+
+    def _build_steps(self) -> List[Step]:
+        """
+        Dependencias FK explícitas: los pasos sin relación entre sí (p. ej.
+        roles y users, o los cuatro profile_*) se solapan cuando workers > 1.
+        En modo particionado la cadena de `usuario` corre en procesos aparte
+        y el proceso principal solo migra roles, users (auth) y user_roles.
+        Con --academic siguen los pasos del esquema DB_ALMA_V2 y al final
+        van los mapeos declarativos de CUSTOM_MAPPINGS.
+        """
+        if self.partitions > 1:
+            steps = [
+                Step("roles", self.migrate_roles),
+                Step("users_auth", self.migrate_auth_users),
+                Step("usuario_partitions", self.migrate_usuario_partitions),
+                Step("user_roles", self.migrate_user_roles, deps=("roles", "users_auth")),
+            ]
+        else:
+            first, *rest = self._usuario_chain()
+            steps = [
+                Step("roles", self.migrate_roles),
+                first,
+                Step("user_roles", self.migrate_user_roles, deps=("roles", first.name)),
+                *rest,
+            ]
+        if self.academic:
+            steps += self._academic_steps()
+        return steps + self._mapping_steps([s.name for s in steps] + list(self.mappings))
+
+    def _academic_steps(self) -> List[Step]:
+        """
+        Esquema DB_ALMA_V2: personas y catálogos, y después grupo → clase →
+        matricula_materia / asistencia_clase. No dependen de la cadena de
+        ALMA_BE_V2: las FK a personas son el uuid de alma.users.
+        """
+        deps = {
+            "subjects": ("academic_programs",),
+            "academic_groups": ("alma_users", "branches", "subjects"),
+            "classes": ("academic_groups",),
+            "enrollments": ("academic_groups", "alma_users"),
+            "attendance_records": ("classes", "alma_users"),
+        }
+        return [
+            Step("alma_users", self.migrate_alma_users),
+            *[
+                Step(step, partial(self.migrate_academic_catalog, step), deps=deps.get(step, ()))
+                for step in ACADEMIC_CATALOG_STEPS[1:]
+            ],
+            *[
+                Step(step, partial(self.migrate_academic, step), deps=deps[step])
+                for step in ACADEMIC_STEPS
+            ],
+        ]
+
+    def _prepare_run(self, steps: List[Step]):
+        """Reanudación o arranque desde cero, y envoltorios de checkpoint/hilos."""
+        if self.resume:
+            pending = [s.name for s in steps if not self.checkpoint.is_done(s.name)]
+            logger.info(f"  Reanudando: pendientes {pending or 'ninguno'}")
+            if self.id_store is not None and len(self.usuario_id_map):
+                logger.info(f"  Mapas de IDs persistidos en {self.id_store.path}")
+            else:
+                self._restore_id_maps()
+        else:
+            self.checkpoint.reset(keep=(DEFERRED_DDL_KEY,))
+            if not self.delta:
+                # Ejecución completa: los mapas se reconstruyen desde cero
+                for id_map in self._id_maps().values():
+                    id_map.clear_all()
+
+        for step in steps:
+            step.func = self._with_checkpoint(step.name, step.func)
+        if self.workers > 1:
+            logger.info(f"  Hilos: {self.workers} (conexiones propias por hilo)")
+            for step in steps:
+                step.func = self._with_thread_connections(step.func)
+
+    def _with_profiling(self, steps: List[Step]) -> List[Step]:
+        """Con --profile envuelve cada paso en StepProfiler (profiling.py)."""
+        if not self.profile:
+            return steps
+        directory = self.profile_dir or f"profile_{self.stats['start_time']:%Y%m%d_%H%M%S}"
+        self.profiler = StepProfiler(
+            directory, stacks=self.profile_stacks,
+            interval=MIGRATION_SETTINGS["profile_interval"],
+        )
+        logger.info(f"  Perfilando pasos en {directory}")
+        for step in steps:
+            step.func = self.profiler.wrap(step.name, step.func)
+        return steps
+
+    def _with_deferred_ddl(self, steps: List[Step]) -> List[Step]:
+        """
+        Con --defer-indexes agrega defer_ddl antes de todos los pasos y
+        restore_ddl después. No pasan por el checkpoint: ambos son
+        idempotentes y las definiciones pendientes viven en él.
+        """
+        if not self.defer_indexes:
+            return steps
+        names = tuple(s.name for s in steps)
+        for step in steps:
+            step.deps = step.deps + ("defer_ddl",)
+        return [
+            Step("defer_ddl", self.defer_ddl),
+            *steps,
+            Step("restore_ddl", self.restore_ddl, deps=names, always=True),
+        ]
+
+    def defer_ddl(self) -> bool:
+        """
+        Guarda en el checkpoint las definiciones de índices secundarios y FK
+        de las tablas destino y los elimina. Lo pendiente de una ejecución
+        cortada se conserva (ya no existe en el catálogo).
         """
         logger.info("\n" + "=" * 60)
-        logger.info("MIGRANDO: profile_dni")
+        logger.info("DIFIRIENDO: índices secundarios y FK")
+        conn = self._open_postgres()
         try:
-            cur = self.mariadb_conn.cursor(dictionary=True)
-            cur.execute(
-                "SELECT id, dni, fecha_nacimiento, created_at, updated_at FROM usuario"
+            pg_cur = conn.cursor()
+            ddl = deferred_ddl.merge(
+                self.checkpoint.value(DEFERRED_DDL_KEY) or {},
+                deferred_ddl.capture(pg_cur, DEFERRED_DDL_TABLES),
             )
-            rows = cur.fetchall()
-            cur.close()
-
-            pg_cur = self.postgres_conn.cursor()
-            to_insert = []
-
-            for u in rows:
-                key = (u["id"], u["dni"])
-                pg_profile_id = self.profile_id_map.get(key)
-                if pg_profile_id is None:
-                    continue
-
-                # Tipo de documento: usar abreviacion si existe, si no el ID como string
-                dni_type = self.t_dni_map.get(u["dni"], str(u["dni"]))
-
-                to_insert.append((
-                    det_uuid("profile_dni", f"{u['id']}_{u['dni']}"),
-                    pg_profile_id,
-                    dni_type,
-                    None,                       # expedition_date: no disponible
-                    u.get("fecha_nacimiento"),  # birthdate
-                    True,                       # is_current
-                    u["created_at"] or NOW,
-                    u["updated_at"] or NOW,
-                ))
-
-            if to_insert:
-                execute_values(
-                    pg_cur,
-                    """
-                    INSERT INTO profile_dni
-                        (uuid, profile_id, "dniType", expedition_date,
-                         birthdate, is_current, created_at, updated_at)
-                    VALUES %s
-                    ON CONFLICT (uuid) DO NOTHING
-                    """,
-                    to_insert,
-                )
-
-            self.postgres_conn.commit()
+            # Primero al checkpoint: un corte después del DROP no las pierde
+            self.checkpoint.set_value(DEFERRED_DDL_KEY, ddl)
+            deferred_ddl.drop(pg_cur, ddl)
+            conn.commit()
             pg_cur.close()
-
-            self.stats["migrated_tables"] += 1
-            self.stats["migrated_records"] += len(to_insert)
-            self.stats["total_records"] += len(rows)
-            logger.info(f"✓ {len(to_insert)}/{len(rows)} profile_dni")
+            logger.info(
+                f"✓ {len(ddl['indexes'])} índices y {len(ddl['foreign_keys'])} FK"
+                " diferidos hasta el final de la carga"
+            )
             return True
 
         except Exception as err:
-            self.postgres_conn.rollback()
-            logger.error(f"✗ profile_dni: {err}")
-            self.stats["errors"].append(f"profile_dni: {err}")
+            conn.rollback()
+            logger.error(f"✗ defer_ddl: {err}")
+            traceback.print_exc()
+            self.stats["errors"].append(f"defer_ddl: {err}")
+            return False
+        finally:
+            self._close_conn(conn)
+
+    def restore_ddl(self) -> bool:
+        """
+        Recrea los índices (CREATE INDEX en paralelo), agrega las FK como
+        NOT VALID y las valida en paralelo. Corre aunque algún paso de carga
+        haya fallado: la base no debe quedar sin índices.
+        """
+        logger.info("\n" + "=" * 60)
+        logger.info("RECONSTRUYENDO: índices secundarios y FK")
+        ddl = self.checkpoint.value(DEFERRED_DDL_KEY)
+        if not ddl:
+            logger.info("✓ nada pendiente")
+            return True
+        try:
+            errors = deferred_ddl.rebuild(
+                self._open_postgres, self._close_conn, ddl, MIGRATION_SETTINGS["ddl_workers"],
+            )
+        except Exception as err:
+            errors = [str(err)]
+        if errors:
+            # Las definiciones quedan en el checkpoint para reintentar
+            for e in errors:
+                logger.error(f"✗ restore_ddl: {e}")
+            self.stats["errors"] += [f"restore_ddl: {e}" for e in errors]
             return False
+        self.checkpoint.set_value(DEFERRED_DDL_KEY, None)
+        logger.info(
+            f"✓ {len(ddl['indexes'])} índices recreados"
+            f" | {len(ddl['foreign_keys'])} FK validadas"
+        )
+        return True
 
-    # ──────────────────────────────────────────────────────────────────────────
-    # Orquestación
-    # ──────────────────────────────────────────────────────────────────────────
+    def _start_sync(self):
+        """Inicio de la ejecución según el reloj de MariaDB y, en modo delta, desde cuándo leer."""
+        cur = self.mariadb_conn.cursor()
+        cur.execute("SELECT NOW()")
+        self.sync_started_at = cur.fetchone()[0]
+        cur.close()
+        if self.delta:
+            self.delta_since = self.checkpoint.last_sync()
+            if self.delta_since is None:
+                logger.warning("  Delta: sin sincronización previa, se migra todo")
+            else:
+                logger.info(f"  Delta: cambios posteriores a {self.delta_since}")
+
+    def _build_report(
+        self,
+        steps: List[Step],
+        results: Dict,
+        path: List[str],
+        path_seconds: float,
+        elapsed: float,
+    ) -> Dict:
+        """
+        Reporte JSON de la ejecución: opciones, totales, memoria pico, ruta
+        crítica y, por paso, duración, filas/s, fases y esperas del pipeline.
+        Los destinos de la lectura única aparecen con sus fases pero sin
+        duración propia (la tiene usuario_fanout).
+        """
+        phases = self.metrics.as_dict()
+        names = [s.name for s in steps]
+        names += [n for n in phases if n not in names]
+        report_steps = {}
+        for name in names:
+            step_phases = phases.get(name, {})
+            entry: Dict = {
+                "rows": max((p["rows"] for p in step_phases.values()), default=0),
+                "phases": step_phases,
+            }
+            if name in results:
+                seconds = results[name].duration
+                entry["ok"] = results[name].ok
+                if results[name].skipped:
+                    entry["skipped"] = True
+                entry["seconds"] = round(seconds, 3)
+                entry["rows_per_second"] = (
+                    round(entry["rows"] / seconds, 1) if seconds > 0 else None
+                )
+            if name in self.stats["pipeline"]:
+                entry["pipeline"] = self.stats["pipeline"][name]
+            if name in self._sizers:
+                entry["batch_size"] = self._sizers[name].as_dict()
+            report_steps[name] = entry
+
+        return {
+            "started_at": self.stats["start_time"].isoformat(timespec="seconds"),
+            "seconds": round(elapsed, 3),
+            "options": {
+                "limit": self.limit,
+                "batch_size": self.batch_size,
+                "queue_size": self.queue_size,
+                "load_engine": self.load_engine,
+                "fanout": self.fanout,
+                "workers": self.workers,
+                "partitions": self.partitions,
+                "resume": self.resume,
+                "delta": self.delta,
+                "id_maps": self.id_map_path,
+                "defer_indexes": self.defer_indexes,
+                "skip_unchanged": self.skip_unchanged,
+                "adaptive_batch": self.adaptive_batch,
+                "profile": self.profile,
+                "memory_budget_mb": self.memory_budget_mb,
+                "academic": self.academic,
+                "offline": self.offline,
+                "offline_dir": self.offline_dir,
+            },
+            "totals": {
+                "tables": self.stats["migrated_tables"],
+                "records_read": self.stats["total_records"],
+                "records_migrated": self.stats["migrated_records"],
+                "errors": len(self.stats["errors"]),
+                "quarantined": len(self.stats["quarantined"]),
+                "skipped": self.stats["skipped"],
+                "unchanged": self.stats["unchanged"],
+                "reconnects": self.stats["reconnects"],
+            },
+            "connections": {name: pool.as_dict() for name, pool in self._pools.items()},
+            "peak_memory_mb": peak_memory_mb(),
+            "memory": self._memory_report(),
+            "peak_memory_children_mb": (
+                peak_memory_mb(children=True) if self.partitions > 1 else None
+            ),
+            "critical_path": {"steps": path, "seconds": round(path_seconds, 3)},
+            "steps": report_steps,
+            "profile": (
+                self.profiler.as_dict(MIGRATION_SETTINGS["profile_top"])
+                if self.profiler is not None else None
+            ),
+            "partitions": self.stats.get("partitions", {}),
+        }
 
     def execute_migration(self) -> bool:
         try:
@@ -899,29 +4221,36 @@ class MariaDBMigrator:
             logger.info(f"  Modo: {modo}")
             logger.info("\nCargando tablas de referencia...")
             self._load_lookup_tables()
-
-            # Orden estricto: respetar dependencias FK
-            steps = [
-                self.migrate_roles,
-                self.migrate_users,
-                self.migrate_user_roles,
-                self.migrate_profiles,
-                self.migrate_profile_addresses,
-                self.migrate_profile_employment,
-                self.migrate_profile_family,
-                self.migrate_profile_dni,
-            ]
-
-            for step in steps:
-                step()
+            if self.skip_unchanged:
+                self._ensure_row_hashes_table()
+
+            steps = self._build_steps()
+            self._start_sync()
+            self._prepare_run(steps)
+            steps = self._with_profiling(self._with_deferred_ddl(steps))
+            results = run_dag(steps, max_workers=self.workers)
+            ok = all(r.ok for r in results.values())
+            path, path_seconds = critical_path(steps, results)
+            if ok and not self.stats["errors"]:
+                # La próxima ejecución delta parte del inicio de esta
+                self.checkpoint.set_last_sync(self.sync_started_at)
 
             elapsed = (datetime.now() - self.stats["start_time"]).total_seconds()
+            self.report_file = report_path(self.stats["start_time"])
+            write_report(
+                self.report_file,
+                self._build_report(steps, results, path, path_seconds, elapsed),
+            )
 
             logger.info("\n" + "█" * 60)
-            logger.info("MIGRACIÓN COMPLETADA".center(60))
+            logger.info(("MIGRACIÓN COMPLETADA" if ok else "MIGRACIÓN INCOMPLETA").center(60))
             logger.info("█" * 60)
             logger.info(f"  Duración   : {elapsed:.1f}s")
-            logger.info(f"  Tablas     : {self.stats['migrated_tables']}/8")
+            academic = len(ACADEMIC_CATALOG_STEPS) + len(ACADEMIC_STEPS) if self.academic else 0
+            logger.info(
+                f"  Tablas     : {self.stats['migrated_tables']}"
+                f"/{8 + academic + len(self.mappings)}"
+            )
             logger.info(
                 f"  Registros  : {self.stats['migrated_records']}"
                 f" / {self.stats['total_records']}"
@@ -930,8 +4259,26 @@ class MariaDBMigrator:
             if self.stats["errors"]:
                 for e in self.stats["errors"][:10]:
                     logger.warning(f"  - {e}")
+            logger.info("  Pasos      :")
+            for step in steps:
+                logger.info(f"    {self._step_line(step.name, results[step.name])}")
+            logger.info(
+                f"  Ruta crítica: {' → '.join(path)} ({path_seconds:.1f}s)"
+            )
+            if self.stats["quarantined"]:
+                logger.warning(f"  Cuarentena : {len(self.stats['quarantined'])} filas")
+                for table, row_uuid, error in self.stats["quarantined"][:10]:
+                    logger.warning(f"  - {table} {row_uuid}: {error}")
+            if self.stats["reconnects"]:
+                logger.warning(
+                    f"  Reintentos : {sum(self.stats['reconnects'].values())} lotes"
+                    f" repetidos tras reconectar ({self.stats['reconnects']})"
+                )
+            if self.profiler is not None:
+                self.profiler.log_summary(MIGRATION_SETTINGS["profile_top"])
+            logger.info(f"  Reporte    : {self.report_file}")
             logger.info("█" * 60 + "\n")
-            return True
+            return ok
 
         except Exception as err:
             logger.error(f"Error fatal: {err}")
@@ -940,29 +4287,166 @@ class MariaDBMigrator:
         finally:
             self.disconnect()
 
+    @staticmethod
+    def _step_line(name: str, result) -> str:
+        """Línea del resumen por paso: ✓ terminado, ✗ fallido, ⚠ omitido por una dependencia."""
+        if result.skipped:
+            return f"⚠ {name:<20} omitido"
+        return f"{'✓' if result.ok else '✗'} {name:<20} {result.duration:8.1f}s"
+
+
+def _partition_file(path: str, index: int) -> str:
+    """migration_checkpoint.json → migration_checkpoint.p0.json"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.p{index}{ext}"
+
+
+def _run_partition(job: Dict) -> Dict:
+    """Punto de entrada de cada proceso del modo particionado."""
+    for handler in logging.getLogger().handlers:
+        handler.setFormatter(logging.Formatter(
+            f"%(asctime)s [%(levelname)-8s] [{job['label']}] %(message)s"
+        ))
+    migrator = MariaDBMigrator(**job["migrator"])
+    migrator.partition = job["bounds"]
+    migrator.delta_since = job["delta_since"]
+    return migrator.execute_partition()
+
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Entrada
 # ──────────────────────────────────────────────────────────────────────────────
 
 def main():
+    parser = argparse.ArgumentParser(
+        description="Migración ERP (MariaDB) → ALMA_BE_V2 (PostgreSQL)"
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="retomar la última ejecución desde " + DEFAULT_CHECKPOINT_FILE,
+    )
+    parser.add_argument(
+        "--delta", action="store_true",
+        help="migrar solo lo creado/modificado en el ERP desde la última sincronización",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=MIGRATION_SETTINGS["batch_size"], metavar="N",
+        help="filas por lote keyset y por transacción",
+    )
+    parser.add_argument(
+        "--queue-size", type=int, default=MIGRATION_SETTINGS["queue_size"], metavar="N",
+        help="lotes en vuelo entre lectura, transformación y carga (0 = secuencial)",
+    )
+    parser.add_argument(
+        "--id-maps", nargs="?", const=DEFAULT_ID_MAP_FILE, default=None, metavar="ARCHIVO",
+        help="guardar los mapas ERP → PostgreSQL en SQLite (por defecto "
+             + DEFAULT_ID_MAP_FILE + ") en lugar de en memoria",
+    )
+    parser.add_argument(
+        "--defer-indexes", action="store_true",
+        help="eliminar índices secundarios y FK destino durante la carga y recrearlos al final",
+    )
+    parser.add_argument(
+        "--skip-unchanged", action="store_true",
+        help="guardar una huella por fila en el destino y reenviar solo filas nuevas o cambiadas",
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="perfilar cada paso con cProfile (.pstats por paso) y mostrar sus funciones más costosas",
+    )
+    parser.add_argument(
+        "--profile-dir", metavar="DIR",
+        help="directorio de los perfiles (por defecto profile_<fecha>)",
+    )
+    parser.add_argument(
+        "--profile-stacks", action="store_true",
+        help="con --profile, muestrear además las pilas (<paso>.folded para flamegraph)",
+    )
+    parser.add_argument(
+        "--adaptive-batch", action="store_true",
+        help="ajustar el tamaño de lote por paso hacia la latencia de carga objetivo"
+             " (--batch-size es el inicial)",
+    )
+    parser.add_argument(
+        "--memory-budget", type=int, metavar="MB",
+        default=MIGRATION_SETTINGS["memory_budget_mb"],
+        help="memoria residente máxima por proceso: al superarla los mapas de IDs"
+             " pasan a disco y luego se reduce el lote",
+    )
+    parser.add_argument(
+        "--academic", action="store_true",
+        help="migrar también grupos, clases, matrículas y asistencias al esquema de"
+             f" DB_ALMA_V2 ('{MIGRATION_SETTINGS['academic_schema']}' en el mismo destino)",
+    )
+    offline = parser.add_mutually_exclusive_group()
+    offline.add_argument(
+        "--extract", metavar="DIR",
+        help="solo leer el ERP: dejar las filas transformadas en DIR (sin PostgreSQL)",
+    )
+    offline.add_argument(
+        "--load", metavar="DIR",
+        help="solo cargar en PostgreSQL una extracción previa de --extract (sin MariaDB)",
+    )
+    offline.add_argument(
+        "--verify", action="store_true",
+        help="comparar ERP y PostgreSQL por rangos con sumas de verificación (sin migrar)",
+    )
+    args = parser.parse_args()
+    if args.extract and args.resume:
+        parser.error("--resume no aplica a --extract")
+    if args.academic and (args.extract or args.load or args.verify):
+        parser.error("--academic solo aplica a la migración directa")
+
     print("\n" + "=" * 70)
     print("MIGRACIÓN ERP (MariaDB) → ALMA_BE_V2 (PostgreSQL)".center(70))
     print("=" * 70)
 
-    print("\nMariaDB (ERP):")
-    mariadb_host = input("  Host     [localhost]: ").strip() or "localhost"
-    mariadb_port = int(input("  Puerto   [3306]:      ").strip() or "3306")
-    mariadb_user = input("  Usuario  [app]:       ").strip() or "app"
-    mariadb_pass = input("  Password [apppass]:   ").strip() or "apppass"
-    mariadb_db   = input("  Base     [erp]:       ").strip() or "erp"
+    mariadb_config: Dict = {}
+    if not args.load:
+        print("\nMariaDB (ERP):")
+        mariadb_config = {
+            "host": input("  Host     [localhost]: ").strip() or "localhost",
+            "port": int(input("  Puerto   [3306]:      ").strip() or "3306"),
+            "user": input("  Usuario  [app]:       ").strip() or "app",
+            "password": input("  Password [apppass]:   ").strip() or "apppass",
+            "database": input("  Base     [erp]:       ").strip() or "erp",
+        }
+
+    postgres_config: Dict = {}
+    if not args.extract:
+        print("\nPostgreSQL (almadb):")
+        postgres_config = {
+            "host": input("  Host     [localhost]: ").strip() or "localhost",
+            "port": int(input("  Puerto   [5432]:      ").strip() or "5432"),
+            "user": input("  Usuario  [postgres]:  ").strip() or "postgres",
+            "password": input("  Password [admin]:     ").strip() or "admin",
+            "database": input("  Base     [almadb]:").strip() or "almadb",
+        }
 
-    print("\nPostgreSQL (almadb):")
-    pg_host = input("  Host     [localhost]: ").strip() or "localhost"
-    pg_port = int(input("  Puerto   [5432]:      ").strip() or "5432")
-    pg_user = input("  Usuario  [postgres]:  ").strip() or "postgres"
-    pg_pass = input("  Password [admin]:     ").strip() or "admin"
-    pg_db   = input("  Base     [almadb]:").strip() or "almadb"
+    run_options = {
+        "profile": args.profile,
+        "profile_dir": args.profile_dir,
+        "profile_stacks": args.profile_stacks,
+        "memory_budget_mb": args.memory_budget,
+    }
+
+    if args.verify:
+        migrator = MariaDBMigrator(
+            mariadb_config, postgres_config, batch_size=args.batch_size,
+        )
+        sys.exit(0 if migrator.execute_verify() else 1)
+
+    if args.load:
+        # La carga de archivos siempre es COPY y ya trae aplicados límite y delta
+        print("\nPartes en paralelo (una conexión por hilo):")
+        raw_workers = input("  Hilos    [1]:         ").strip()
+        workers = int(raw_workers) if raw_workers.isdigit() and int(raw_workers) > 0 else 1
+        migrator = MariaDBMigrator(
+            mariadb_config, postgres_config,
+            workers=workers, resume=args.resume, id_map_path=args.id_maps,
+            defer_indexes=args.defer_indexes, **run_options,
+        )
+        sys.exit(0 if migrator.execute_load(args.load) else 1)
 
     print("\nCantidad de registros a migrar:")
     print("  (Se aplica sobre la tabla principal 'usuario'.")
@@ -980,22 +4464,57 @@ def main():
         except ValueError:
             print("  Valor invalido, se migraran todos los registros.")
 
+    if args.extract:
+        print("\nRecorridos del ERP en paralelo (roles, usuario, users, model_has_roles):")
+        raw_workers = input("  Hilos    [1]:         ").strip()
+        workers = int(raw_workers) if raw_workers.isdigit() and int(raw_workers) > 0 else 1
+        migrator = MariaDBMigrator(
+            mariadb_config, postgres_config,
+            limit=limit, batch_size=args.batch_size, queue_size=args.queue_size,
+            workers=workers, delta=args.delta, **run_options,
+        )
+        sys.exit(0 if migrator.execute_extract(args.extract) else 1)
+
+    print("\nMotor de carga en PostgreSQL:")
+    print("  values = INSERT con execute_values | copy = COPY FROM STDIN + merge")
+    print("  staging = copy, y las FK de profiles/profile_* se resuelven con JOIN en PostgreSQL")
+    load_engine = input("  Motor    [values]:    ").strip().lower() or "values"
+    if load_engine not in LOAD_ENGINES:
+        print("  Valor invalido, se usara 'values'.")
+        load_engine = "values"
+
+    print("\nLectura de 'usuario':")
+    print("  s = una sola lectura repartida a todas las tablas | n = una lectura por tabla")
+    fanout = input("  Lectura única [s/N]:  ").strip().lower() == "s"
+
+    print("\nPasos en paralelo (roles/users, y las tablas profile_* entre sí):")
+    raw_workers = input("  Hilos    [1]:         ").strip()
+    workers = int(raw_workers) if raw_workers.isdigit() and int(raw_workers) > 0 else 1
+
+    print("\nProcesos para 'usuario' (rangos de id repartidos entre núcleos):")
+    raw_partitions = input("  Procesos [1]:         ").strip()
+    partitions = (
+        int(raw_partitions) if raw_partitions.isdigit() and int(raw_partitions) > 0 else 1
+    )
+
     migrator = MariaDBMigrator(
-        mariadb_config={
-            "host": mariadb_host,
-            "port": mariadb_port,
-            "user": mariadb_user,
-            "password": mariadb_pass,
-            "database": mariadb_db,
-        },
-        postgres_config={
-            "host": pg_host,
-            "port": pg_port,
-            "user": pg_user,
-            "password": pg_pass,
-            "database": pg_db,
-        },
+        mariadb_config=mariadb_config,
+        postgres_config=postgres_config,
         limit=limit,
+        batch_size=args.batch_size,
+        queue_size=args.queue_size,
+        load_engine=load_engine,
+        fanout=fanout,
+        workers=workers,
+        resume=args.resume,
+        delta=args.delta,
+        id_map_path=args.id_maps,
+        partitions=partitions,
+        defer_indexes=args.defer_indexes,
+        skip_unchanged=args.skip_unchanged,
+        adaptive_batch=args.adaptive_batch,
+        academic=args.academic,
+        **run_options,
     )
 
     sys.exit(0 if migrator.execute_migration() else 1)
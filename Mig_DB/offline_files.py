@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Archivos de intercambio del modo desconectado (--extract / --load).
+
+La extracción escribe, por cada conjunto de filas transformadas (roles,
+users, profiles, ...), partes gzip en el formato texto de COPY más un
+manifest.json con la tabla destino, las columnas, la cláusula ON CONFLICT
+y las columnas FK. Las FK no llevan IDs de PostgreSQL (no hay conexión
+al destino) sino el uuid determinista de la fila referenciada; la carga
+los resuelve con un JOIN contra la tabla ya cargada.
+
+  <dir>/manifest.json
+  <dir>/users.0000.tsv.gz
+  <dir>/profiles.0000.tsv.gz
+  <dir>/id_maps.0000.tsv.gz     clave ERP → uuid (mapa, k1, k2, uuid)
+  ...
+
+Cada parte se escribe con nombre temporal y se renombra al cerrarla: una
+parte listada en el manifiesto siempre está completa.
+"""
+
+import os
+import gzip
+import json
+import threading
+from datetime import datetime
+from typing import Dict, IO, Iterable, List, Optional, Sequence
+
+from copy_loader import copy_text_value
+
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+
+# Conjunto con el mapa clave ERP → uuid (no se carga en una tabla destino)
+ID_MAPS_DATASET = "id_maps"
+ID_MAPS_COLUMNS = ("map", "k1", "k2", "uuid")
+
+_COMPRESS_LEVEL = 3  # gzip rápido: la extracción no debe quedar limitada por CPU
+
+
+class _Dataset:
+    """Partes de un conjunto de filas; se rota de archivo cada part_rows filas."""
+
+    def __init__(self, directory: str, name: str, meta: Dict, part_rows: int):
+        self.directory = directory
+        self.name = name
+        self.meta = meta
+        self.part_rows = part_rows
+        self.parts: List[Dict] = []
+        self.rows = 0
+        self._lock = threading.Lock()
+        self._fh: Optional[IO[str]] = None
+        self._tmp_path = ""
+        self._part_name = ""
+        self._part_count = 0
+
+    def write(self, rows: Sequence[tuple]):
+        with self._lock:
+            for row in rows:
+                if self._fh is None:
+                    self._open_part()
+                self._fh.write("\t".join(copy_text_value(v) for v in row))
+                self._fh.write("\n")
+                self._part_count += 1
+                self.rows += 1
+                if self._part_count >= self.part_rows:
+                    self._close_part()
+
+    def close(self):
+        with self._lock:
+            if self._fh is not None:
+                self._close_part()
+
+    def _open_part(self):
+        self._part_name = f"{self.name}.{len(self.parts):04d}.tsv.gz"
+        self._tmp_path = os.path.join(self.directory, self._part_name + ".tmp")
+        self._fh = gzip.open(
+            self._tmp_path, "wt", encoding="utf-8", compresslevel=_COMPRESS_LEVEL
+        )
+        self._part_count = 0
+
+    def _close_part(self):
+        self._fh.close()
+        self._fh = None
+        os.replace(self._tmp_path, os.path.join(self.directory, self._part_name))
+        self.parts.append({"file": self._part_name, "rows": self._part_count})
+
+
+class ExtractWriter:
+    """
+    Escritor de una extracción completa. Los conjuntos se declaran con
+    dataset() y reciben lotes con write(); close() cierra las partes
+    abiertas y escribe el manifiesto. Seguro entre hilos (un lock por conjunto).
+    """
+
+    def __init__(self, directory: str, part_rows: int):
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+            raise FileExistsError(
+                f"{directory} ya contiene una extracción ({MANIFEST_FILE})"
+            )
+        self.directory = directory
+        self.part_rows = part_rows
+        self._datasets: Dict[str, _Dataset] = {}
+
+    def dataset(
+        self,
+        name: str,
+        table: Optional[str],
+        columns: Sequence[str],
+        conflict: str = "",
+        refs: Optional[Dict[str, str]] = None,
+    ):
+        """
+        Declara un conjunto. `refs` = {columna FK → tabla referenciada}: la
+        columna trae el uuid de la fila de esa tabla en lugar de su id.
+        """
+        self._datasets[name] = _Dataset(self.directory, name, {
+            "table": table,
+            "columns": list(columns),
+            "conflict": conflict,
+            "refs": refs or {},
+        }, self.part_rows)
+
+    def write(self, name: str, rows: Iterable[tuple]):
+        rows = list(rows)
+        if rows:
+            self._datasets[name].write(rows)
+
+    def rows(self, name: str) -> int:
+        return self._datasets[name].rows
+
+    def abort(self):
+        """Cierra las partes sin escribir el manifiesto: --load rechazará el directorio."""
+        for ds in self._datasets.values():
+            ds.close()
+
+    def close(self, info: Dict):
+        """Cierra las partes y escribe el manifiesto con `info` (origen, fecha, modo)."""
+        for ds in self._datasets.values():
+            ds.close()
+        manifest = {
+            "version": FORMAT_VERSION,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            **info,
+            "datasets": {
+                name: dict(ds.meta, rows=ds.rows, parts=ds.parts)
+                for name, ds in self._datasets.items()
+            },
+        }
+        tmp = os.path.join(self.directory, MANIFEST_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, indent=2, ensure_ascii=False, default=str)
+        os.replace(tmp, os.path.join(self.directory, MANIFEST_FILE))
+
+
+def read_manifest(directory: str) -> Dict:
+    with open(os.path.join(directory, MANIFEST_FILE), encoding="utf-8") as fh:
+        manifest = json.load(fh)
+    if manifest.get("version") != FORMAT_VERSION:
+        raise ValueError(
+            f"Versión de extracción no soportada: {manifest.get('version')!r}"
+        )
+    return manifest
+
+
+def open_part(directory: str, part: Dict) -> IO[str]:
+    """Abre una parte para copy_expert (texto descomprimido al vuelo)."""
+    return gzip.open(os.path.join(directory, part["file"]), "rt", encoding="utf-8")
+
+
+def read_rows(directory: str, part: Dict) -> Iterable[List[str]]:
+    """Filas de una parte como listas de texto (\\N = NULL), para el mapa de IDs."""
+    with open_part(directory, part) as fh:
+        for line in fh:
+            yield [None if v == "\\N" else v for v in line.rstrip("\n").split("\t")]
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pipeline extracción → transformación → carga con colas acotadas.
+
+La lectura de MariaDB corre en un hilo, la transformación en otro y la
+carga en el hilo que llama (el dueño de la conexión y la transacción de
+PostgreSQL). Mientras PostgreSQL escribe el lote N, MariaDB ya entrega
+el N+1 y Python arma el N+2. Las colas acotadas dan contrapresión: si la
+carga es el cuello de botella, la lectura se detiene en vez de acumular
+lotes en memoria.
+
+Cada etapa mide cuánto estuvo bloqueada esperando a la siguiente (cola
+llena) o a la anterior (cola vacía); eso indica qué lado limita.
+"""
+
+import time
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+_END = object()
+_POLL_SECONDS = 0.1
+
+
+class _Failure:
+    """Excepción de una etapa, reenviada por la cola hasta el hilo de carga."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class PipelineStats:
+    """
+    Segundos de espera por etapa:
+      extract_blocked    lectura esperando lugar en la cola (transformación lenta)
+      transform_waiting  transformación esperando lotes (lectura lenta)
+      transform_blocked  transformación esperando lugar (carga lenta)
+      load_waiting       carga esperando lotes (lectura/transformación lentas)
+    """
+
+    FIELDS = ("extract_blocked", "transform_waiting", "transform_blocked", "load_waiting")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.seconds: Dict[str, float] = dict.fromkeys(self.FIELDS, 0.0)
+
+    def add(self, field: str, seconds: float):
+        with self._lock:
+            self.seconds[field] += seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"batches": self.batches, **{k: round(v, 3) for k, v in self.seconds.items()}}
+
+    def summary(self) -> str:
+        return f"{self.batches} lotes | espera " + " | ".join(
+            f"{k} {v:.1f}s" for k, v in self.seconds.items()
+        )
+
+
+def run_pipeline(
+    extract: Callable[[], Iterable],
+    load: Callable[[Any, Any], None],
+    transform: Optional[Callable[[Any], Any]] = None,
+    queue_size: int = 2,
+    thread_wrapper: Optional[Callable[[Callable], Callable]] = None,
+) -> PipelineStats:
+    """
+    Ejecuta load(lote, transform(lote)) por cada lote de extract().
+
+    `extract` se invoca dentro del hilo lector (allí debe abrir su propia
+    conexión si la necesita). Sin `transform`, load recibe None como carga
+    y la transformación queda a cargo del propio load. Con queue_size <= 0
+    todo corre secuencialmente en el hilo actual. `thread_wrapper`, si se
+    da, envuelve el cuerpo de cada hilo que se lanza (p. ej. para perfilarlo
+    dentro del paso que llama).
+
+    Un error en cualquier etapa detiene las demás y se relanza aquí.
+    """
+    stats = PipelineStats()
+
+    if queue_size <= 0:
+        for batch in extract():
+            load(batch, transform(batch) if transform else None)
+            stats.batches += 1
+        return stats
+
+    stop = threading.Event()
+    raw_q: queue.Queue = queue.Queue(maxsize=queue_size)
+    out_q: queue.Queue = queue.Queue(maxsize=queue_size) if transform else raw_q
+
+    def put(q: queue.Queue, item, field: Optional[str] = None) -> bool:
+        start = time.perf_counter()
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_SECONDS)
+                break
+            except queue.Full:
+                continue
+        if field:
+            stats.add(field, time.perf_counter() - start)
+        return not stop.is_set()
+
+    def get(q: queue.Queue, field: str):
+        start = time.perf_counter()
+        item = _END
+        while not stop.is_set():
+            try:
+                item = q.get(timeout=_POLL_SECONDS)
+                break
+            except queue.Empty:
+                continue
+        stats.add(field, time.perf_counter() - start)
+        return item
+
+    def extractor():
+        batches = iter(extract())
+        try:
+            for batch in batches:
+                if not put(raw_q, batch, "extract_blocked"):
+                    return
+        except Exception as err:
+            put(raw_q, _Failure(err))
+            return
+        finally:
+            close = getattr(batches, "close", None)
+            if close:
+                close()
+        put(raw_q, _END)
+
+    def transformer():
+        while True:
+            batch = get(raw_q, "transform_waiting")
+            if batch is _END or isinstance(batch, _Failure):
+                put(out_q, batch)
+                return
+            try:
+                payload = transform(batch)
+            except Exception as err:
+                put(out_q, _Failure(err))
+                return
+            if not put(out_q, (batch, payload), "transform_blocked"):
+                return
+
+    wrap = thread_wrapper or (lambda target: target)
+    threads = [threading.Thread(target=wrap(extractor), name="pipe-extract", daemon=True)]
+    if transform:
+        threads.append(
+            threading.Thread(target=wrap(transformer), name="pipe-transform", daemon=True)
+        )
+    for t in threads:
+        t.start()
+
+    try:
+        while True:
+            item = get(out_q, "load_waiting")
+            if item is _END:
+                break
+            if isinstance(item, _Failure):
+                raise item.error
+            batch, payload = item if transform else (item, None)
+            load(batch, payload)
+            stats.batches += 1
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+
+    return stats
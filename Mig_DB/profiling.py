@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Perfilado por paso de la migración (--profile).
+
+Cada paso del DAG corre bajo cProfile y deja <paso>.pstats en el
+directorio de la ejecución (se abre con `python -m pstats` o snakeviz).
+Con --profile-stacks además se muestrea la pila de los hilos del paso
+cada `interval` segundos y se escribe <paso>.folded en el formato de
+pilas colapsadas ("a;b;c N") que aceptan flamegraph.pl y speedscope.
+
+Los hilos que lanza un paso (lector y transformador del pipeline, rangos
+de grupo) se envuelven con StepProfiler.attach: cada uno corre con su
+propio cProfile y sus estadísticas se suman al .pstats del paso; el
+muestreo recorre todos los hilos registrados del paso, con el nombre del
+hilo como raíz de cada pila.
+
+En Python 3.12+ dos perfiles deterministas no pueden estar activos a la
+vez; con varios hilos el que no lo consigue queda solo con muestreo.
+"""
+
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _StackSampler(threading.Thread):
+    """Cuenta las pilas de los hilos de `threads()` cada `interval` segundos."""
+
+    def __init__(self, threads: Callable[[], Dict[int, str]], interval: float):
+        super().__init__(daemon=True)
+        self.threads = threads
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id, thread_name in self.threads().items():
+                frame = frames.get(thread_id)
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                if names:
+                    names.append(thread_name)
+                    self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class StepProfiler:
+    def __init__(self, directory: str, stacks: bool = False, interval: float = 0.005):
+        self.directory = directory
+        self.stacks = stacks
+        self.interval = interval
+        self.files: Dict[str, Dict[str, str]] = {}  # paso → {"pstats": ruta, "folded": ruta}
+        self._lock = threading.Lock()
+        self._local = threading.local()  # paso al que pertenece el hilo actual
+        self._threads: Dict[str, Dict[int, str]] = {}  # paso → {id de hilo: nombre}
+        self._profiles: Dict[str, List[cProfile.Profile]] = {}  # paso → perfiles de sus hilos
+        os.makedirs(directory, exist_ok=True)
+
+    def wrap(self, name: str, func: Callable[[], bool]) -> Callable[[], bool]:
+        """Envuelve el paso `name` para perfilarlo mientras corre."""
+        def run() -> bool:
+            with self._lock:
+                self._threads[name] = {}
+                self._profiles[name] = []
+            sampler = None
+            if self.stacks:
+                sampler = _StackSampler(lambda: self._step_threads(name), self.interval)
+                sampler.start()
+            try:
+                return self._run_in_step(name, func)
+            finally:
+                if sampler is not None:
+                    sampler.stop()
+                self._save(name, sampler)
+        return run
+
+    def attach(self, func: Callable) -> Callable:
+        """
+        Envuelve `func`, que correrá en otro hilo, para perfilarlo dentro
+        del paso que está ejecutando el hilo actual. Fuera de un paso
+        perfilado devuelve `func` sin cambios.
+        """
+        name = getattr(self._local, "step", None)
+        if name is None:
+            return func
+
+        def run(*args, **kwargs):
+            return self._run_in_step(name, func, *args, **kwargs)
+        return run
+
+    def _run_in_step(self, name: str, func: Callable, *args, **kwargs):
+        """Corre `func` en el hilo actual con su propio cProfile, registrado en el paso."""
+        thread = threading.current_thread()
+        self._local.step = name
+        profile: Optional[cProfile.Profile] = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            logger.warning(
+                f"  {name}: otro hilo ocupa cProfile; {thread.name} solo con muestreo de pilas"
+            )
+            profile = None
+        with self._lock:
+            self._threads[name][thread.ident] = thread.name
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.disable()
+            with self._lock:
+                self._threads[name].pop(thread.ident, None)
+                if profile is not None:
+                    self._profiles[name].append(profile)
+            self._local.step = None
+
+    def _step_threads(self, name: str) -> Dict[int, str]:
+        with self._lock:
+            return dict(self._threads.get(name, {}))
+
+    def _save(self, name: str, sampler):
+        files: Dict[str, str] = {}
+        with self._lock:
+            profiles = self._profiles.pop(name, [])
+            self._threads.pop(name, None)
+        if profiles:
+            files["pstats"] = os.path.join(self.directory, f"{name}.pstats")
+            merged = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                merged.add(profile)
+            merged.dump_stats(files["pstats"])
+        if sampler is not None and sampler.stacks:
+            files["folded"] = os.path.join(self.directory, f"{name}.folded")
+            with open(files["folded"], "w", encoding="utf-8") as fh:
+                for stack, count in sampler.stacks.most_common():
+                    fh.write(f"{stack} {count}\n")
+        with self._lock:
+            self.files[name] = files
+
+    def top(self, name: str, count: int) -> List[Dict]:
+        """Las `count` funciones con más tiempo propio del paso `name`."""
+        path = self.files.get(name, {}).get("pstats")
+        if not path:
+            return []
+        stats = pstats.Stats(path).stats
+        hot = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:count]
+        return [
+            {
+                "function": f"{os.path.basename(filename)}:{line}({func})",
+                "calls": calls,
+                "self_seconds": round(self_time, 4),
+                "cumulative_seconds": round(cumulative, 4),
+            }
+            for (filename, line, func), (_, calls, self_time, cumulative, _) in hot
+        ]
+
+    def as_dict(self, count: int) -> Dict:
+        return {
+            "directory": self.directory,
+            "steps": {
+                name: {**files, "top": self.top(name, count)}
+                for name, files in sorted(self.files.items())
+            },
+        }
+
+    def log_summary(self, count: int):
+        logger.info(f"  Perfiles   : {self.directory}")
+        for name in sorted(self.files):
+            hot = self.top(name, count)
+            if not hot:
+                continue
+            logger.info(f"    {name} — {len(hot)} funciones con más tiempo propio:")
+            for entry in hot:
+                logger.info(
+                    f"      {entry['self_seconds']:9.3f}s {entry['cumulative_seconds']:9.3f}s"
+                    f" {entry['calls']:>9}  {entry['function']}"
+                )
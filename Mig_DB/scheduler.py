@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Planificador DAG para los pasos de la migración.
+
+Cada paso declara de qué pasos depende; los que no dependen entre sí se
+ejecutan en paralelo sobre un pool de hilos. Al terminar se informa la
+ruta crítica (la cadena de dependencias más lenta), que es el límite
+inferior del tiempo total por mucho que se aumenten los hilos.
+"""
+
+import time
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Step:
+    """
+    Paso del DAG: nombre, función sin argumentos que devuelve bool,
+    dependencias. Con `always` corre aunque alguna dependencia haya fallado
+    (p. ej. restaurar índices al final de la carga).
+    """
+
+    def __init__(
+        self, name: str, func: Callable[[], bool], deps: Sequence[str] = (),
+        always: bool = False,
+    ):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.always = always
+
+
+class StepResult:
+    def __init__(self, name: str, ok: bool, start: float, end: float, skipped: bool = False):
+        self.name = name
+        self.ok = ok
+        self.start = start
+        self.end = end
+        self.skipped = skipped  # no corrió porque falló una dependencia
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+def _validate(steps: Sequence[Step]):
+    names = {s.name for s in steps}
+    for s in steps:
+        missing = [d for d in s.deps if d not in names]
+        if missing:
+            raise ValueError(f"Paso {s.name}: dependencias desconocidas {missing}")
+    # Detección de ciclos (Kahn)
+    pending = {s.name: set(s.deps) for s in steps}
+    while pending:
+        ready = [n for n, deps in pending.items() if not deps]
+        if not ready:
+            raise ValueError(f"Ciclo de dependencias entre: {sorted(pending)}")
+        for n in ready:
+            del pending[n]
+        for deps in pending.values():
+            deps.difference_update(ready)
+
+
+def _blocked_by(step: Step, results: Dict[str, StepResult]) -> List[str]:
+    """Dependencias fallidas (u omitidas) que impiden correr `step`."""
+    if step.always:
+        return []
+    return [d for d in step.deps if not results[d].ok]
+
+
+def _skip(step: Step, failed: List[str]) -> StepResult:
+    logger.warning(f"⚠ {step.name}: omitido, falló {', '.join(failed)}")
+    now = time.perf_counter()
+    return StepResult(step.name, False, now, now, skipped=True)
+
+
+def _run_one(step: Step) -> StepResult:
+    start = time.perf_counter()
+    try:
+        ok = bool(step.func())
+    except Exception as err:  # el paso ya registra sus propios errores
+        logger.error(f"✗ {step.name}: {err}")
+        ok = False
+    return StepResult(step.name, ok, start, time.perf_counter())
+
+
+def run_dag(steps: Sequence[Step], max_workers: int = 1) -> Dict[str, StepResult]:
+    """
+    Ejecuta los pasos respetando dependencias. Si un paso falla, sus
+    dependientes (directos o no) se omiten y quedan con ok=False y
+    skipped=True, salvo los marcados `always`; los pasos independientes
+    siguen corriendo.
+
+    Con max_workers=1 todo corre en el hilo actual, en el orden declarado.
+    """
+    _validate(steps)
+    results: Dict[str, StepResult] = {}
+
+    if max_workers <= 1:
+        done: set = set()
+        while len(done) < len(steps):
+            for s in steps:
+                if s.name not in done and all(d in done for d in s.deps):
+                    failed = _blocked_by(s, results)
+                    results[s.name] = _skip(s, failed) if failed else _run_one(s)
+                    done.add(s.name)
+        return results
+
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mig")
+    try:
+        running = {}
+        submitted: set = set()
+        while len(results) < len(steps):
+            progress = True
+            while progress:  # un paso omitido puede destrabar (y omitir) a otros
+                progress = False
+                for s in steps:
+                    if s.name in submitted or not all(d in results for d in s.deps):
+                        continue
+                    submitted.add(s.name)
+                    failed = _blocked_by(s, results)
+                    if failed:
+                        results[s.name] = _skip(s, failed)
+                        progress = True
+                    else:
+                        running[pool.submit(_run_one, s)] = s.name
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name = running.pop(fut)
+                results[name] = fut.result()
+    finally:
+        pool.shutdown(wait=True)
+
+    return results
+
+
+def critical_path(
+    steps: Sequence[Step], results: Dict[str, StepResult]
+) -> Tuple[List[str], float]:
+    """
+    Cadena de dependencias de mayor duración acumulada.
+    Devuelve (nombres en orden de ejecución, segundos).
+    """
+    best: Dict[str, Tuple[float, List[str]]] = {}
+    remaining = list(steps)
+    while remaining:
+        for s in list(remaining):
+            if all(d in best for d in s.deps):
+                prev = max((best[d] for d in s.deps), default=(0.0, []), key=lambda x: x[0])
+                best[s.name] = (prev[0] + results[s.name].duration, prev[1] + [s.name])
+                remaining.remove(s)
+    seconds, path = max(best.values(), key=lambda x: x[0])
+    return path, seconds
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Datos sintéticos del ERP para medir la migración sin datos de producción.
+
+Genera las tablas que lee MariaDBMigrator (pais, provincia, t_dni,
+t_est_civil, t_ocupacion, roles, users, model_has_roles y usuario) con
+una distribución parecida a la real:
+
+  - tipos de documento sesgados (CC ≫ TI > CE > PP) y ~1% de números de
+    documento repetidos con otro tipo (misma persona, PK (id, dni) distinta)
+  - Colombia como país dominante y provincias con reparto tipo Zipf
+  - nulos frecuentes en nombre2, email, dirección, empresa, ocupación...
+  - altas concentradas en los últimos años y ~30% de filas sin updated_at
+  - pocos usuarios auth (users) con un rol mayoritario en model_has_roles
+
+Todo es determinista para una misma semilla: dos ejecuciones del
+benchmark con la misma escala comparan exactamente los mismos datos.
+"""
+
+import random
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+# DDL reducido: solo las columnas que lee la migración, con los tipos y la
+# PK del ERP real (Referencias_SQL/ERP_DB_TABLES.sql), sin FKs a tablas que
+# el benchmark no genera (sede, t_perfil, ...)
+DDL = [
+    """
+    CREATE TABLE pais (
+        id     MEDIUMINT UNSIGNED NOT NULL PRIMARY KEY,
+        nombre VARCHAR(60)        NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE provincia (
+        id     SMALLINT UNSIGNED  NOT NULL PRIMARY KEY,
+        nombre VARCHAR(60)        NOT NULL,
+        pais   MEDIUMINT UNSIGNED NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE t_dni (
+        id          TINYINT UNSIGNED NOT NULL PRIMARY KEY,
+        tipo        VARCHAR(40)      NOT NULL,
+        abreviacion VARCHAR(10)      NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE t_est_civil (
+        id   TINYINT UNSIGNED NOT NULL PRIMARY KEY,
+        tipo VARCHAR(40)      NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE t_ocupacion (
+        id   TINYINT UNSIGNED NOT NULL PRIMARY KEY,
+        tipo VARCHAR(40)      NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE roles (
+        id         BIGINT UNSIGNED NOT NULL PRIMARY KEY,
+        team_id    BIGINT UNSIGNED NULL,
+        name       VARCHAR(255)    NOT NULL,
+        guard_name VARCHAR(255)    NOT NULL,
+        created_at TIMESTAMP       NULL,
+        updated_at TIMESTAMP       NULL
+    )
+    """,
+    """
+    CREATE TABLE users (
+        id                BIGINT UNSIGNED NOT NULL PRIMARY KEY,
+        name              VARCHAR(255)    NOT NULL,
+        email             VARCHAR(255)    NOT NULL UNIQUE,
+        email_verified_at TIMESTAMP       NULL,
+        password          VARCHAR(255)    NOT NULL,
+        created_at        TIMESTAMP       NULL,
+        updated_at        TIMESTAMP       NULL
+    )
+    """,
+    """
+    CREATE TABLE model_has_roles (
+        role_id    BIGINT UNSIGNED NOT NULL,
+        model_type VARCHAR(255)    NOT NULL,
+        model_id   BIGINT UNSIGNED NOT NULL,
+        team_id    BIGINT UNSIGNED NOT NULL,
+        PRIMARY KEY (team_id, role_id, model_id, model_type)
+    )
+    """,
+    """
+    CREATE TABLE usuario (
+        id                    BIGINT UNSIGNED   NOT NULL,
+        dni                   TINYINT UNSIGNED  NOT NULL,
+        email_verified_at     VARCHAR(255)      NULL,
+        created_at            TIMESTAMP         NULL,
+        updated_at            TIMESTAMP         NULL,
+        nombre1               VARCHAR(30)       NOT NULL,
+        nombre2               VARCHAR(30)       NULL,
+        apellido1             VARCHAR(30)       NOT NULL,
+        apellido2             VARCHAR(30)       NULL,
+        fecha_nacimiento      DATE              NULL,
+        genero                CHAR              NOT NULL,
+        est_civil             TINYINT UNSIGNED  NULL,
+        cant_hijos            TINYINT UNSIGNED  NULL,
+        pais                  MEDIUMINT UNSIGNED NULL,
+        provincia             SMALLINT UNSIGNED NULL,
+        ciudad                VARCHAR(50)       NULL,
+        direccion             VARCHAR(80)       NULL,
+        barrio                VARCHAR(40)       NULL,
+        telefono              VARCHAR(40)       NULL,
+        celular               VARCHAR(10)       NULL,
+        email                 VARCHAR(80)       NULL,
+        vigente               TINYINT UNSIGNED  NOT NULL DEFAULT '0',
+        ocupacion             TINYINT UNSIGNED  NULL,
+        empresa               VARCHAR(40)       NULL,
+        telefono_empresa      VARCHAR(40)       NULL,
+        fecha_ingreso_empresa DATE              NULL,
+        imagen                VARCHAR(120)      NULL,
+        PRIMARY KEY (id, dni)
+    )
+    """,
+]
+
+TABLES = ("usuario", "model_has_roles", "users", "roles", "t_ocupacion",
+          "t_est_civil", "t_dni", "provincia", "pais")
+
+PAISES = [(57, "Colombia"), (58, "Venezuela"), (593, "Ecuador"), (51, "Perú"),
+          (1, "Estados Unidos"), (34, "España"), (52, "México")]
+PAIS_WEIGHTS = [90, 4, 2, 1, 1, 1, 1]
+
+T_DNI = [(1, "Cédula de ciudadanía", "CC"), (2, "Tarjeta de identidad", "TI"),
+         (3, "Cédula de extranjería", "CE"), (4, "Pasaporte", "PP"),
+         (5, "Registro civil", "RC"), (6, "Permiso por protección temporal", "PPT")]
+DNI_WEIGHTS = [80, 12, 4, 2, 1, 1]
+
+T_EST_CIVIL = [(1, "Soltero(a)"), (2, "Casado(a)"), (3, "Unión libre"),
+               (4, "Separado(a)"), (5, "Viudo(a)")]
+T_OCUPACION = [(i, t) for i, t in enumerate(
+    ["Estudiante", "Empleado", "Independiente", "Docente", "Hogar",
+     "Pensionado", "Desempleado", "Religioso(a)"], start=1)]
+
+ROLES = ["estudiante", "docente", "coordinador", "secretaria",
+         "admin", "tesoreria", "biblioteca", "superadmin"]
+ROLE_WEIGHTS = [85, 8, 2, 2, 1, 1, 0.5, 0.5]
+
+NOMBRES = ["María", "José", "Luis", "Ana", "Carlos", "Juan", "Laura", "Andrés",
+           "Diana", "Jorge", "Paula", "Camilo", "Sofía", "Daniel", "Valentina",
+           "Santiago", "Natalia", "Felipe", "Carolina", "Alejandro"]
+APELLIDOS = ["Rodríguez", "Gómez", "González", "Martínez", "García", "López",
+             "Hernández", "Sánchez", "Ramírez", "Pérez", "Díaz", "Muñoz",
+             "Rojas", "Moreno", "Jiménez", "Vargas", "Castro", "Ortiz"]
+CIUDADES = ["Bogotá", "Medellín", "Cali", "Barranquilla", "Cartagena",
+            "Bucaramanga", "Pereira", "Manizales", "Cúcuta", "Ibagué"]
+EMPRESAS = ["Ecopetrol", "Bancolombia", "Grupo Éxito", "Avianca", "Alpina",
+            "Claro", "Postobón", "Colsubsidio", "Alcaldía", "Independiente"]
+
+PROVINCIAS = 33
+EPOCH = datetime(2012, 1, 1)
+
+
+def resolve_scale(scale: str) -> int:
+    """'10k' / '100k' / '1m' o un entero."""
+    return SCALES.get(scale.lower()) or int(scale)
+
+
+def _zipf_weights(n: int, s: float = 1.1) -> List[float]:
+    return [1 / (k ** s) for k in range(1, n + 1)]
+
+
+def _created_at(rng: random.Random) -> datetime:
+    # Crecimiento: más altas en los últimos años (raíz del uniforme)
+    span = (datetime(2026, 1, 1) - EPOCH).total_seconds()
+    return EPOCH + timedelta(seconds=int(span * rng.random() ** 0.5))
+
+
+def _maybe(rng: random.Random, null_rate: float, value):
+    return None if rng.random() < null_rate else value
+
+
+def lookup_rows() -> Dict[str, Tuple[str, List[tuple]]]:
+    """{tabla → (INSERT, filas)} de las tablas de referencia."""
+    provincias = [(i, f"Provincia {i}", 57) for i in range(1, PROVINCIAS + 1)]
+    return {
+        "pais": ("INSERT INTO pais (id, nombre) VALUES (%s, %s)", PAISES),
+        "provincia": ("INSERT INTO provincia (id, nombre, pais) VALUES (%s, %s, %s)",
+                      provincias),
+        "t_dni": ("INSERT INTO t_dni (id, tipo, abreviacion) VALUES (%s, %s, %s)", T_DNI),
+        "t_est_civil": ("INSERT INTO t_est_civil (id, tipo) VALUES (%s, %s)", T_EST_CIVIL),
+        "t_ocupacion": ("INSERT INTO t_ocupacion (id, tipo) VALUES (%s, %s)", T_OCUPACION),
+        "roles": (
+            "INSERT INTO roles (id, name, guard_name, created_at, updated_at)"
+            " VALUES (%s, %s, %s, %s, %s)",
+            [(i, name, "web", EPOCH, EPOCH) for i, name in enumerate(ROLES, start=1)],
+        ),
+    }
+
+
+USUARIO_INSERT = (
+    "INSERT INTO usuario (id, dni, email_verified_at, created_at, updated_at,"
+    " nombre1, nombre2, apellido1, apellido2, fecha_nacimiento, genero,"
+    " est_civil, cant_hijos, pais, provincia, ciudad, direccion, barrio,"
+    " telefono, celular, email, vigente, ocupacion, empresa, telefono_empresa,"
+    " fecha_ingreso_empresa, imagen)"
+    " VALUES (" + ", ".join(["%s"] * 27) + ")"
+)
+USERS_INSERT = (
+    "INSERT INTO users (id, name, email, email_verified_at, password,"
+    " created_at, updated_at) VALUES (%s, %s, %s, %s, %s, %s, %s)"
+)
+MODEL_HAS_ROLES_INSERT = (
+    "INSERT INTO model_has_roles (role_id, model_type, model_id, team_id)"
+    " VALUES (%s, %s, %s, %s)"
+)
+
+
+def iter_usuario(count: int, seed: int = 42, batch: int = 5000) -> Iterator[List[tuple]]:
+    """Lotes de filas de `usuario`, con PK (id, dni) única y orden aleatorio."""
+    rng = random.Random(seed)
+    dni_ids = [d[0] for d in T_DNI]
+    pais_ids = [p[0] for p in PAISES]
+    prov_weights = _zipf_weights(PROVINCIAS)
+    seen = set()
+    out: List[tuple] = []
+    produced = 0
+    last_id = None
+
+    while produced < count:
+        # ~1% repite el número de documento con otro tipo
+        if last_id is not None and rng.random() < 0.01:
+            erp_id = last_id
+        else:
+            erp_id = rng.randint(1_000_000, 1_300_000_000)
+        dni = rng.choices(dni_ids, DNI_WEIGHTS)[0]
+        packed = erp_id * 256 + dni
+        if packed in seen:
+            continue
+        seen.add(packed)
+        last_id = erp_id
+
+        created = _created_at(rng)
+        updated = _maybe(rng, 0.3, created + timedelta(days=rng.randint(0, 900)))
+        nombre1 = rng.choice(NOMBRES)
+        apellido1 = rng.choice(APELLIDOS)
+        pais = rng.choices(pais_ids, PAIS_WEIGHTS)[0]
+        has_address = rng.random() > 0.2
+        has_job = rng.random() > 0.55
+        email = _maybe(
+            rng, 0.15,
+            f"{nombre1.lower()}.{apellido1.lower()}{erp_id % 100000}@correo.test",
+        )
+        out.append((
+            erp_id,
+            dni,
+            _maybe(rng, 0.6, created.isoformat(sep=" ")),
+            created,
+            updated,
+            nombre1,
+            _maybe(rng, 0.4, rng.choice(NOMBRES)),
+            apellido1,
+            _maybe(rng, 0.1, rng.choice(APELLIDOS)),
+            _maybe(rng, 0.05, date(1950, 1, 1) + timedelta(days=rng.randint(0, 20000))),
+            rng.choice("MF"),
+            _maybe(rng, 0.3, rng.randint(1, len(T_EST_CIVIL))),
+            _maybe(rng, 0.5, min(int(rng.expovariate(0.8)), 12)),
+            pais if has_address else None,
+            rng.choices(range(1, PROVINCIAS + 1), prov_weights)[0] if has_address else None,
+            rng.choice(CIUDADES) if has_address else None,
+            f"Calle {rng.randint(1, 200)} # {rng.randint(1, 99)}-{rng.randint(1, 99)}"
+            if has_address else None,
+            _maybe(rng, 0.5, f"Barrio {rng.randint(1, 400)}"),
+            _maybe(rng, 0.3, f"60{rng.randint(10000000, 99999999)}"),
+            _maybe(rng, 0.1, f"3{rng.randint(100000000, 999999999)}"),
+            email,
+            1 if rng.random() < 0.7 else 0,
+            rng.randint(1, len(T_OCUPACION)) if has_job and rng.random() < 0.9 else None,
+            rng.choice(EMPRESAS) if has_job else None,
+            _maybe(rng, 0.7, f"60{rng.randint(10000000, 99999999)}") if has_job else None,
+            _maybe(rng, 0.4, created.date() - timedelta(days=rng.randint(0, 3650)))
+            if has_job else None,
+            _maybe(rng, 0.8, f"avatars/{erp_id}_{dni}.jpg"),
+        ))
+        produced += 1
+        if len(out) >= batch:
+            yield out
+            out = []
+    if out:
+        yield out
+
+
+def auth_rows(count: int, seed: int = 42) -> Tuple[List[tuple], List[tuple]]:
+    """Filas de users (~5% de las personas) y su rol en model_has_roles."""
+    rng = random.Random(seed + 1)
+    n_auth = max(1, count // 20)
+    users, roles = [], []
+    for user_id in range(1, n_auth + 1):
+        created = _created_at(rng)
+        users.append((
+            user_id,
+            f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}",
+            f"user{user_id}@auth.test",
+            _maybe(rng, 0.3, created),
+            "$2y$10$benchmark",
+            created,
+            _maybe(rng, 0.5, created + timedelta(days=rng.randint(0, 500))),
+        ))
+        role_id = rng.choices(range(1, len(ROLES) + 1), ROLE_WEIGHTS)[0]
+        roles.append((role_id, "App\\Models\\User", user_id, 0))
+    return users, roles
+
+
+def populate(conn, count: int, seed: int = 42, batch: int = 5000):
+    """Recrea las tablas del benchmark en la base de `conn` y las llena."""
+    cur = conn.cursor()
+    for table in TABLES:
+        cur.execute(f"DROP TABLE IF EXISTS {table}")
+    for ddl in DDL:
+        cur.execute(ddl)
+
+    for table, (sql, rows) in lookup_rows().items():
+        cur.executemany(sql, rows)
+    users, model_roles = auth_rows(count, seed)
+    for i in range(0, len(users), batch):
+        cur.executemany(USERS_INSERT, users[i:i + batch])
+        cur.executemany(MODEL_HAS_ROLES_INSERT, model_roles[i:i + batch])
+    conn.commit()
+    logger.info(f"  users: {len(users)} | model_has_roles: {len(model_roles)}")
+
+    loaded = 0
+    for rows in iter_usuario(count, seed, batch):
+        cur.executemany(USUARIO_INSERT, rows)
+        conn.commit()
+        loaded += len(rows)
+        if loaded % (batch * 20) == 0:
+            logger.info(f"  usuario: {loaded}/{count}")
+    cur.close()
+    logger.info(f"✓ usuario: {loaded} filas")
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""Los módulos del migrador son scripts planos de Mig_DB: se importan por nombre."""
+
+import importlib
+import logging
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def migration():
+    """
+    El módulo migration_mariadb (se omite sin mysql-connector / psycopg2).
+    Al importarse reemplaza sys.stdout y configura el log en archivo; aquí
+    se evita lo segundo y se deshace lo primero para no romper la captura
+    de pytest.
+    """
+    pytest.importorskip("psycopg2")
+    pytest.importorskip("mysql.connector")
+    root = logging.getLogger()
+    guard = logging.NullHandler()
+    root.addHandler(guard)  # basicConfig no hace nada si ya hay handlers
+    stdout = sys.stdout
+    try:
+        module = importlib.import_module("migration_mariadb")
+    finally:
+        root.removeHandler(guard)
+        if sys.stdout is not stdout:
+            sys.stdout.detach()
+            sys.stdout = stdout
+    return module
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Tamaño de lote adaptativo: convergencia, límites y recortes."""
+
+import pytest
+
+from batch_sizer import BatchSizer
+
+
+def _run(sizer, rows_per_second, batches):
+    """Simula `batches` lotes cargados a `rows_per_second`; devuelve los tamaños."""
+    sizes = []
+    for _ in range(batches):
+        size = sizer.size
+        sizer.observe(size, size / rows_per_second)
+        sizes.append(sizer.size)
+    return sizes
+
+
+@pytest.mark.parametrize("initial", [100, 1000, 50000])
+def test_converges_to_target_latency(initial):
+    sizer = BatchSizer(initial, minimum=10, maximum=100000, target_seconds=2.0)
+    sizes = _run(sizer, rows_per_second=5000, batches=20)
+    assert sizes[-1] == pytest.approx(10000, rel=0.01)
+    previous = initial
+    for size in sizes:  # a lo sumo duplica o reduce a la mitad por lote
+        assert previous / 2 - 1 <= size <= previous * 2
+        previous = size
+
+
+def test_follows_a_slower_table():
+    sizer = BatchSizer(1000, minimum=10, maximum=100000, target_seconds=1.0)
+    _run(sizer, rows_per_second=20000, batches=15)
+    assert sizer.size == pytest.approx(20000, rel=0.01)
+    _run(sizer, rows_per_second=2000, batches=25)
+    assert sizer.size == pytest.approx(2000, rel=0.05)
+
+
+def test_stays_within_bounds():
+    fast = BatchSizer(1000, minimum=500, maximum=4000, target_seconds=1.0)
+    _run(fast, rows_per_second=10 ** 6, batches=10)
+    assert fast.size == 4000 and fast.largest == 4000
+
+    slow = BatchSizer(1000, minimum=500, maximum=4000, target_seconds=1.0)
+    _run(slow, rows_per_second=10, batches=10)
+    assert slow.size == 500 and slow.smallest == 500
+
+    assert BatchSizer(10 ** 6, minimum=1, maximum=100, target_seconds=1).size == 100
+
+
+def test_isolated_slow_batch_does_not_collapse_size():
+    sizer = BatchSizer(5000, minimum=10, maximum=100000, target_seconds=1.0)
+    _run(sizer, rows_per_second=5000, batches=10)
+    sizer.observe(sizer.size, 60.0)  # checkpoint o autovacuum
+    assert sizer.size >= 2500
+    _run(sizer, rows_per_second=5000, batches=15)
+    assert sizer.size == pytest.approx(5000, rel=0.05)
+
+
+def test_cap_lowers_maximum_but_not_below_minimum():
+    sizer = BatchSizer(8000, minimum=100, maximum=10000, target_seconds=1.0)
+    sizer.cap(2000)
+    assert sizer.size == 2000 and sizer.maximum == 2000
+    _run(sizer, rows_per_second=10 ** 6, batches=5)
+    assert sizer.size == 2000
+    sizer.cap(10)
+    assert sizer.size == 100 and sizer.maximum == 100
+
+
+def test_empty_or_instant_batches_are_ignored():
+    sizer = BatchSizer(1000, minimum=10, maximum=100000, target_seconds=1.0)
+    sizer.observe(0, 1.0)
+    sizer.observe(500, 0.0)
+    assert sizer.size == 1000 and sizer.batches == 0
+    assert sizer.as_dict()["mean_rows"] is None
+
+
+def test_report():
+    sizer = BatchSizer(1000, minimum=10, maximum=100000, target_seconds=0.5)
+    sizer.observe(1000, 0.25)
+    sizer.observe(2000, 0.5)
+    report = sizer.as_dict()
+    assert report["batches"] == 2
+    assert report["mean_rows"] == 1500
+    assert report["mean_seconds"] == pytest.approx(0.375)
+    assert report["initial"] == 1000 and report["final"] == sizer.size
+    assert "lote 1000 →" in sizer.summary()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""Sumas de verificación de --verify y huellas de --skip-unchanged."""
+
+import hashlib
+from datetime import date, datetime
+
+from checksum import HASH_HEX_DIGITS, RowHasher, content_hash
+
+_TYPES = {
+    "uuid": "uuid", "profile_id": "bigint", "is_current": "boolean",
+    "birthdate": "date", "created_at": "timestamp without time zone", "notes": "text",
+}
+_COLUMNS = ("uuid", "profile_id", "is_current", "birthdate", "created_at", "notes")
+
+
+def _md5(text):
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+def test_row_hash_normalizes_by_target_type():
+    hasher = RowHasher("profile_dni", _COLUMNS, _TYPES)
+    values = (
+        "u-1", 42, 1, datetime(1990, 3, 4, 10, 30), date(2020, 1, 2), None,
+    )
+    assert hasher.row_hash(values) == _md5(
+        "u-1|42|t|1990-03-04|2020-01-02 00:00:00|\\N"
+    )
+    # Mismo valor con otra representación Python → mismo hash
+    same = ("u-1", "42", True, date(1990, 3, 4), datetime(2020, 1, 2), None)
+    assert hasher.row_hash(same) == hasher.row_hash(values)
+
+
+def test_sql_mirrors_python_normalization():
+    hasher = RowHasher(
+        "profile_dni", _COLUMNS, _TYPES, refs={"profile_id": "profiles"},
+    )
+    sql = hasher._hash_sql
+    assert sql.startswith("md5(concat_ws('|', ")
+    assert "COALESCE(r1.uuid::text, '\\N')" in sql
+    assert "CASE WHEN t.is_current THEN 't' WHEN NOT t.is_current THEN 'f' END" in sql
+    assert "to_char(t.birthdate, 'YYYY-MM-DD')" in sql
+    assert "to_char(t.created_at, 'YYYY-MM-DD HH24:MI:SS')" in sql
+    assert "LEFT JOIN profiles r1 ON r1.id = t.profile_id" in hasher._from_sql
+    assert hasher._from_sql.endswith("WHERE t.uuid = ANY(%s)")
+
+
+def test_quoted_columns_use_unquoted_type():
+    hasher = RowHasher("profile_dni", ('"dniType"', "is_current"),
+                       {"dniType": "text", "is_current": "boolean"})
+    assert "t.\"dniType\"::text" in hasher._hash_sql
+    assert hasher.row_hash(("CC", 0)) == _md5("CC|f")
+
+
+def test_summary_ignores_order():
+    hashes = {f"u-{i}": _md5(str(i)) for i in range(50)}
+    reversed_hashes = dict(reversed(list(hashes.items())))
+    count, total = RowHasher.summarize(hashes)
+    assert (count, total) == RowHasher.summarize(reversed_hashes)
+    assert count == 50
+    assert total == sum(int(h[:HASH_HEX_DIGITS], 16) for h in hashes.values())
+    assert RowHasher.summarize({}) == (0, 0)
+
+
+def test_content_hash_uses_copy_text():
+    row = ("u-1", None, True, "a\tb", datetime(2020, 1, 2, 3, 4, 5))
+    assert content_hash(row) == _md5("u-1\t\\N\tt\ta\\tb\t2020-01-02T03:04:05")
+    assert content_hash(row) != content_hash(row[:-1] + (datetime(2020, 1, 2, 3, 4, 6),))
+    # Un tab dentro de un valor no se confunde con el separador de columnas
+    assert content_hash(("a\tb", "c")) != content_hash(("a", "b\tc"))
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""Clasificación de errores transitorios, pool de conexiones y ReconnectingCursor."""
+
+import pytest
+
+psycopg2 = pytest.importorskip("psycopg2")
+mysql_connector = pytest.importorskip("mysql.connector")
+
+import connections  # noqa: E402
+from connections import (  # noqa: E402
+    ConnectionPool, ReconnectingCursor, backoff_delay, is_transient, needs_reconnect,
+)
+
+
+def _pg_error(cls, pgcode):
+    """Instancia de `cls` con el SQLSTATE `pgcode` (en psycopg2 es de solo lectura)."""
+    return type(cls.__name__, (cls,), {"pgcode": pgcode})()
+
+
+def _mysql_error(errno):
+    return mysql_connector.Error(errno=errno)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# is_transient / needs_reconnect
+# ──────────────────────────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("err", [
+    _mysql_error(2006),
+    _mysql_error(2013),
+    _mysql_error(2055),
+    _pg_error(psycopg2.OperationalError, "08006"),
+    _pg_error(psycopg2.OperationalError, "08003"),
+    _pg_error(psycopg2.OperationalError, "57P01"),
+    _pg_error(psycopg2.OperationalError, "57P03"),
+    _pg_error(psycopg2.OperationalError, None),  # socket cerrado sin respuesta
+    _pg_error(psycopg2.InterfaceError, None),
+], ids=repr)
+def test_connection_loss_reconnects(err):
+    assert needs_reconnect(err)
+    assert is_transient(err)
+
+
+@pytest.mark.parametrize("err", [
+    _mysql_error(1205),
+    _mysql_error(1213),
+    _pg_error(psycopg2.OperationalError, "40001"),
+    _pg_error(psycopg2.OperationalError, "40P01"),
+    _pg_error(psycopg2.DatabaseError, "40P01"),
+], ids=repr)
+def test_conflicts_retry_on_same_connection(err):
+    assert not needs_reconnect(err)
+    assert is_transient(err)
+
+
+@pytest.mark.parametrize("err", [
+    _mysql_error(1062),  # clave duplicada
+    _mysql_error(1064),  # SQL mal formado
+    _mysql_error(None),
+    _pg_error(psycopg2.OperationalError, "57014"),  # statement_timeout
+    _pg_error(psycopg2.IntegrityError, "23505"),
+    _pg_error(psycopg2.DatabaseError, "22P02"),
+    _pg_error(psycopg2.DatabaseError, None),
+    ValueError("dato inválido"),
+    KeyError("id"),
+], ids=repr)
+def test_other_errors_fail_immediately(err):
+    assert not needs_reconnect(err)
+    assert not is_transient(err)
+
+
+def test_backoff_doubles_up_to_maximum():
+    assert [backoff_delay(a, 2.0) for a in range(4)] == [2.0, 4.0, 8.0, 16.0]
+    assert backoff_delay(10, 2.0) == 60.0
+    assert backoff_delay(3, 1.0, maximum=5.0) == 5.0
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# ConnectionPool
+# ──────────────────────────────────────────────────────────────────────────────
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+        self.alive = True
+        self.pings = 0
+        self.resets = 0
+        self.cursors = []
+
+    def ping(self):
+        self.pings += 1
+        if not self.alive:
+            raise OSError("conexión perdida")
+
+    def reset(self):
+        self.resets += 1
+        if not self.alive:
+            raise OSError("conexión perdida")
+
+    def cursor(self):
+        cur = FakeCursor(self)
+        self.cursors.append(cur)
+        return cur
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.connection = conn
+        self.closed = False
+        self.executed = []
+
+    def execute(self, sql):
+        self.executed.append(sql)
+
+    def close(self):
+        self.closed = True
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(connections.time, "monotonic", clock)
+    return clock
+
+
+def _pool(size=2, health_check_seconds=30.0, reset=True):
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection(len(opened) + 1))
+        return opened[-1]
+
+    pool = ConnectionPool(
+        "fake", connect, lambda conn: conn.ping(), size, health_check_seconds,
+        reset=(lambda conn: conn.reset()) if reset else None,
+    )
+    return pool, opened
+
+
+def test_pool_reuses_released_connection(clock):
+    pool, opened = _pool()
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert len(opened) == 1
+    assert conn.resets == 1
+    assert conn.pings == 0  # devuelta hace menos de health_check_seconds
+    assert pool.as_dict() == {"opened": 1, "reused": 1, "discarded": 0}
+
+
+def test_pool_opens_one_per_concurrent_holder(clock):
+    pool, opened = _pool(size=1)
+    first, second = pool.acquire(), pool.acquire()
+    assert first is not second
+    pool.release(first)
+    pool.release(second)  # sobra: solo se conserva `size` ociosa
+    assert second.closed and not first.closed
+    assert pool.as_dict() == {"opened": 2, "reused": 0, "discarded": 1}
+
+
+def test_pool_pings_idle_connection_before_reuse(clock):
+    pool, _ = _pool(health_check_seconds=30.0)
+    conn = pool.acquire()
+    pool.release(conn)
+    clock.now += 31
+    assert pool.acquire() is conn
+    assert conn.pings == 1
+
+
+def test_pool_discards_dead_idle_connection(clock):
+    pool, opened = _pool(health_check_seconds=30.0)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.alive = False
+    clock.now += 31
+    fresh = pool.acquire()
+    assert fresh is not conn and fresh is opened[-1]
+    assert conn.closed
+    assert pool.as_dict() == {"opened": 2, "reused": 0, "discarded": 1}
+
+
+def test_pool_discards_connection_that_fails_reset(clock):
+    pool, opened = _pool()
+    conn = pool.acquire()
+    conn.alive = False
+    pool.release(conn)
+    assert conn.closed
+    assert pool.acquire() is not conn
+    assert pool.discarded == 1 and len(opened) == 2
+
+
+def test_pool_closes_unknown_and_discarded_connections(clock):
+    pool, _ = _pool()
+    stranger = FakeConnection(99)
+    pool.release(stranger)  # no la abrió el pool: no se guarda
+    assert stranger.closed and pool.discarded == 0
+
+    conn = pool.acquire()
+    pool.discard(conn)
+    pool.release(conn)  # devolverla después de descartarla no la resucita
+    assert conn.closed
+    assert pool.acquire() is not conn
+
+
+def test_pool_close_all(clock):
+    pool, opened = _pool()
+    held, idle = pool.acquire(), pool.acquire()
+    pool.release(idle)
+    pool.close_all()
+    assert held.closed and idle.closed
+    assert pool.acquire() is opened[-1] and len(opened) == 3
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# ReconnectingCursor
+# ──────────────────────────────────────────────────────────────────────────────
+
+def test_cursor_follows_current_connection():
+    current = [FakeConnection(1)]
+    cur = ReconnectingCursor(lambda: current[0])
+    cur.execute("SELECT 1")
+    cur.execute("SELECT 2")
+    first = current[0]
+    assert len(first.cursors) == 1
+    assert first.cursors[0].executed == ["SELECT 1", "SELECT 2"]
+
+    current[0] = FakeConnection(2)  # reconexión del hilo
+    cur.execute("SELECT 3")
+    assert current[0].cursors[0].executed == ["SELECT 3"]
+    assert first.cursors[0].executed == ["SELECT 1", "SELECT 2"]
+
+
+def test_cursor_reopens_after_close():
+    conn = FakeConnection(1)
+    cur = ReconnectingCursor(lambda: conn)
+    cur.execute("SELECT 1")
+    cur.close()
+    assert conn.cursors[0].closed
+    cur.execute("SELECT 2")
+    assert len(conn.cursors) == 2 and conn.cursors[1].executed == ["SELECT 2"]
+
+
+def test_cursor_close_skips_closed_connection():
+    conn = FakeConnection(1)
+    cur = ReconnectingCursor(lambda: conn)
+    cur.close()  # nunca se usó
+    cur.execute("SELECT 1")
+    conn.closed = True
+    cur.close()
+    assert not conn.cursors[0].closed
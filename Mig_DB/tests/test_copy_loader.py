@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Formato texto de COPY: escapes, NULL y armado del buffer."""
+
+import re
+from datetime import date, datetime
+
+import pytest
+
+from copy_loader import CopyLoader, copy_text_value, rows_to_copy_buffer
+
+_ESCAPES = {"\\": "\\", "t": "\t", "n": "\n", "r": "\r"}
+
+
+def _parse_copy_text(text):
+    """Lector mínimo del formato texto de COPY (lo que hace PostgreSQL al recibirlo)."""
+    rows = []
+    for line in text.split("\n")[:-1]:
+        fields = []
+        for raw in line.split("\t"):
+            if raw == "\\N":
+                fields.append(None)
+            else:
+                fields.append(re.sub(r"\\(.)", lambda m: _ESCAPES[m.group(1)], raw))
+        rows.append(tuple(fields))
+    return rows
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, "\\N"),
+    (True, "t"),
+    (False, "f"),
+    (0, "0"),
+    ("", ""),
+    ("a\tb", "a\\tb"),
+    ("línea 1\nlínea 2", "línea 1\\nlínea 2"),
+    ("fin\r\n", "fin\\r\\n"),
+    ("C:\\ruta\\nueva", "C:\\\\ruta\\\\nueva"),
+    ("\\N", "\\\\N"),           # el texto "\N" no es NULL
+    ("\\t", "\\\\t"),
+    (datetime(2024, 2, 3, 4, 5, 6), "2024-02-03T04:05:06"),
+    (date(2024, 2, 3), "2024-02-03"),
+])
+def test_copy_text_value(value, expected):
+    assert copy_text_value(value) == expected
+
+
+def test_buffer_round_trips_awkward_values():
+    rows = [
+        ("u-1", None, "tab\there", "multi\nline\r\n", "back\\slash", "\\N", ""),
+        ("u-2", 5, "\\\t\\n", None, "ñandú", "'comillas\"", "x"),
+    ]
+    text = rows_to_copy_buffer(rows).getvalue()
+    assert text.count("\n") == len(rows)  # un salto de línea real por fila
+    assert all(line.count("\t") == 6 for line in text.split("\n")[:-1])
+    expected = [tuple(None if v is None else str(v) for v in row) for row in rows]
+    assert _parse_copy_text(text) == expected
+
+
+def test_buffer_is_rewound_and_empty_for_no_rows():
+    buf = rows_to_copy_buffer([(1, "a")])
+    assert buf.read() == "1\ta\n"
+    assert rows_to_copy_buffer([]).getvalue() == ""
+
+
+class FakeCursor:
+    def __init__(self):
+        self.statements = []
+        self.copied = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(" ".join(sql.split()))
+
+    def copy_expert(self, sql, buf):
+        self.copied.append((sql, buf.read()))
+
+    def fetchall(self):
+        return [(1, "u-1")]
+
+
+def test_merge_copies_to_staging_and_inserts():
+    cur = FakeCursor()
+    loader = CopyLoader(cur)
+    returned = loader.merge(
+        "alma.classes", ("uuid", "name"), [("u-1", "a\tb")],
+        "ON CONFLICT (uuid) DO NOTHING", returning="id, uuid",
+    )
+    assert returned == [(1, "u-1")]
+    assert cur.statements[0] == (
+        "CREATE TEMP TABLE IF NOT EXISTS stg_alma_classes AS"
+        " SELECT uuid, name FROM alma.classes WITH NO DATA; TRUNCATE stg_alma_classes"
+    )
+    assert cur.copied == [(
+        "COPY stg_alma_classes (uuid, name) FROM STDIN WITH (FORMAT text)", "u-1\ta\\tb\n",
+    )]
+    assert cur.statements[1] == (
+        "INSERT INTO alma.classes (uuid, name) SELECT uuid, name FROM stg_alma_classes"
+        " ON CONFLICT (uuid) DO NOTHING RETURNING id, uuid"
+    )
+    assert loader.bytes_sent == len("u-1\ta\\tb\n")
+    assert loader.merge("alma.classes", ("uuid",), [], "") == []
+    assert len(cur.statements) == 2
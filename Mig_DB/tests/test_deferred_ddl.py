@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Índices y FK diferidos: merge con lo guardado, DROP y reconstrucción."""
+
+import threading
+
+import deferred_ddl
+
+_DDL = {
+    "indexes": [
+        {"table": "profiles", "name": "idx_profiles_user",
+         "definition": "CREATE INDEX idx_profiles_user ON public.profiles USING btree (user_id)"},
+        {"table": "users", "name": "idx_users_email",
+         "definition": "CREATE INDEX idx_users_email ON public.users USING btree (email)"},
+    ],
+    "foreign_keys": [
+        {"table": "profiles", "name": "fk_profiles_user",
+         "definition": "FOREIGN KEY (user_id) REFERENCES users(id)"},
+        {"table": "profile_dni", "name": "fk_dni_profile",
+         "definition": "FOREIGN KEY (profile_id) REFERENCES profiles(id)"},
+    ],
+}
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, sql, params=None):
+        with self.db.lock:
+            self.db.statements.append(sql)
+        if sql in self.db.failing:
+            raise RuntimeError(f"falló: {sql}\ndetalle")
+
+    def fetchall(self):
+        return list(self.db.existing_fks)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConn:
+    def __init__(self, db):
+        self.db = db
+        self.committed = False
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+
+class FakeDb:
+    def __init__(self, failing=(), existing_fks=()):
+        self.lock = threading.Lock()
+        self.statements = []
+        self.failing = set(failing)
+        self.existing_fks = existing_fks
+        self.opened = 0
+        self.closed = 0
+
+    def open(self):
+        self.opened += 1
+        return FakeConn(self)
+
+    def close(self, conn):
+        self.closed += 1
+
+
+def test_merge_keeps_saved_and_adds_new_live_entries():
+    saved = {"indexes": [_DDL["indexes"][0]], "foreign_keys": []}
+    live = {
+        "indexes": [dict(_DDL["indexes"][0], definition="otra"), _DDL["indexes"][1]],
+        "foreign_keys": _DDL["foreign_keys"],
+    }
+    merged = deferred_ddl.merge(saved, live)
+    assert merged["indexes"] == _DDL["indexes"]  # gana la definición guardada
+    assert merged["foreign_keys"] == _DDL["foreign_keys"]
+    assert deferred_ddl.merge({}, live) == live
+
+
+def test_drop_removes_foreign_keys_before_indexes():
+    db = FakeDb()
+    deferred_ddl.drop(FakeCursor(db), _DDL)
+    assert db.statements == [
+        "ALTER TABLE profiles DROP CONSTRAINT IF EXISTS fk_profiles_user",
+        "ALTER TABLE profile_dni DROP CONSTRAINT IF EXISTS fk_dni_profile",
+        "DROP INDEX IF EXISTS idx_profiles_user",
+        "DROP INDEX IF EXISTS idx_users_email",
+    ]
+
+
+def test_rebuild_creates_indexes_then_adds_and_validates_fks():
+    db = FakeDb(existing_fks=[("profiles", "fk_profiles_user")])
+    errors = deferred_ddl.rebuild(db.open, db.close, _DDL, workers=2)
+    assert errors == []
+    statements = db.statements
+    creates = [s for s in statements if s.startswith("CREATE")]
+    assert sorted(creates) == [
+        "CREATE INDEX IF NOT EXISTS idx_profiles_user ON public.profiles USING btree (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_users_email ON public.users USING btree (email)",
+    ]
+    adds = [s for s in statements if "ADD CONSTRAINT" in s]
+    # La FK que sigue existiendo no se recrea, solo se valida
+    assert adds == [
+        "ALTER TABLE profile_dni ADD CONSTRAINT fk_dni_profile"
+        " FOREIGN KEY (profile_id) REFERENCES profiles(id) NOT VALID"
+    ]
+    validates = [s for s in statements if "VALIDATE" in s]
+    assert len(validates) == 2
+    last_create = max(statements.index(s) for s in creates)
+    assert last_create < statements.index(adds[0]) < min(statements.index(s) for s in validates)
+    assert db.opened == db.closed
+
+
+def test_rebuild_reports_failed_jobs_and_continues():
+    failing = "ALTER TABLE profiles VALIDATE CONSTRAINT fk_profiles_user"
+    db = FakeDb(failing=[failing])
+    errors = deferred_ddl.rebuild(db.open, db.close, _DDL, workers=1)
+    assert errors == [f"fk_profiles_user: falló: {failing}"]
+    assert "ALTER TABLE profile_dni VALIDATE CONSTRAINT fk_dni_profile" in db.statements
+    assert db.opened == db.closed
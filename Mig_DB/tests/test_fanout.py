@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Lectura única de `usuario` (fan-out): el filtro Python `accept` de cada
+paso tiene que elegir las mismas filas que su `where` SQL.
+"""
+
+import itertools
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def specs(migration):
+    migrator = migration.MariaDBMigrator.__new__(migration.MariaDBMigrator)
+    migrator.load_engine = "execute_values"
+    migrator.offline = None
+    return migrator._usuario_specs()
+
+
+def _rows(columns):
+    """Todas las combinaciones NULL / no NULL de `columns`."""
+    for i, values in enumerate(itertools.product((None, 1), repeat=len(columns))):
+        yield {"id": i, **dict(zip(columns, values))}
+
+
+def test_specs_follow_fk_order(specs):
+    assert list(specs) == [
+        "users", "profiles", "profile_addresses",
+        "profile_employment", "profile_family", "profile_dni",
+    ]
+
+
+@pytest.mark.parametrize("step", [
+    "profile_addresses", "profile_employment", "profile_family",
+])
+def test_accept_matches_sql_filter(specs, step):
+    spec = specs[step]
+    columns = [c for c in spec["columns"] if c not in ("id", "dni")]
+    conn = sqlite3.connect(":memory:")
+    conn.execute(f"CREATE TABLE usuario (id INTEGER, {', '.join(columns)})")
+    rows = list(_rows(columns))
+    conn.executemany(
+        f"INSERT INTO usuario VALUES (:id, {', '.join(':' + c for c in columns)})", rows,
+    )
+    selected = {r[0] for r in conn.execute(f"SELECT id FROM usuario WHERE {spec['where']}")}
+    accepted = {r["id"] for r in rows if spec["accept"](r)}
+    assert accepted == selected
+    assert 0 < len(selected) < len(rows)
+
+
+@pytest.mark.parametrize("step", ["users", "profiles", "profile_dni"])
+def test_unfiltered_steps_have_no_predicate(specs, step):
+    assert specs[step]["where"] == ""
+    assert specs[step]["accept"] is None
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Mapas de IDs: CompactIdMap (con y sin NumPy), PersistentIdMap y SpillableIdMap."""
+
+import pytest
+
+import id_map_store
+from id_map_store import CompactIdMap, IdMapStore, SpillableIdMap
+
+_BACKENDS = ["python"] + (["numpy"] if id_map_store.np is not None else [])
+
+
+@pytest.fixture(params=_BACKENDS)
+def backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(id_map_store, "np", None)
+    return request.param
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = IdMapStore(str(tmp_path / "id_maps.sqlite"))
+    yield store
+    store.close()
+
+
+def _fill(id_map, count, offset=0):
+    id_map.put_many(((i, i % 3), i + offset) for i in range(count))
+
+
+def test_get_many_sees_pending_and_merged_entries(backend):
+    id_map = CompactIdMap(arity=2)
+    merged = id_map_store._MIN_PENDING
+    _fill(id_map, merged)              # alcanza el mínimo: queda en los arrays
+    assert not id_map._pending and len(id_map._keys) == merged
+    id_map.put_many([((merged + 5, 1), 7)])  # queda pendiente
+    assert id_map._pending
+
+    found = id_map.get_many([(0, 0), (merged + 5, 1), (merged - 1, (merged - 1) % 3), (9, 9)])
+    assert found == {
+        (0, 0): 0, (merged + 5, 1): 7, (merged - 1, (merged - 1) % 3): merged - 1,
+    }
+
+
+def test_pending_value_overrides_merged_one(backend):
+    id_map = CompactIdMap()
+    id_map.put_many((i, i) for i in range(id_map_store._MIN_PENDING))
+    id_map[10] = 999                    # pendiente, misma clave que una fusionada
+    assert id_map.get_many([10]) == {10: 999}
+    assert len(id_map) == id_map_store._MIN_PENDING  # fusiona sin duplicar la clave
+    assert id_map[10] == 999
+
+
+def test_get_many_with_duplicate_keys(backend):
+    id_map = CompactIdMap(arity=2)
+    id_map.put_many([((1, 1), 10), ((2, 1), 20)])
+    keys = iter([(1, 1), (2, 1), (1, 1), (3, 1), (2, 1)])  # también acepta generadores
+    assert id_map.get_many(keys) == {(1, 1): 10, (2, 1): 20}
+
+
+def test_merges_keep_keys_sorted(backend):
+    id_map = CompactIdMap()
+    # Altas desordenadas en varias fusiones, con reemplazos
+    for start in (3, 0, 2, 1):
+        id_map.put_many((k, k * 10 + start) for k in range(start, 40000, 4))
+    id_map.put_many((k, -k) for k in range(0, 40000, 1000))
+    assert len(id_map) == 40000
+    assert list(id_map._keys) == sorted(id_map._keys)
+    found = id_map.get_many(range(40000))
+    assert found[1000] == -1000 and found[1001] == 10011 and found[39999] == 399993
+
+
+def test_items_round_trip_composite_keys(backend):
+    id_map = CompactIdMap(arity=2)
+    entries = {(123456789012, 255): 1, (0, 0): 2, (7, 3): 3}
+    id_map.put_many(entries.items())
+    assert dict(id_map.items()) == entries
+
+
+@pytest.mark.parametrize("key", [(-1, 0), (1, 256), (1 << 56, 0)])
+def test_out_of_range_composite_key(key):
+    with pytest.raises(ValueError):
+        CompactIdMap(arity=2).put_many([(key, 1)])
+
+
+def test_persistent_map_batches_and_duplicates(store):
+    id_map = store.map("usuario", arity=2)
+    count = id_map_store._SQLITE_CHUNK * 2 + 7  # varios bloques de consulta
+    _fill(id_map, count)
+    keys = [(i, i % 3) for i in range(count)] * 2 + [(count, 0)]
+    found = id_map.get_many(keys)
+    assert len(found) == count
+    assert found[(count - 1, (count - 1) % 3)] == count - 1
+    assert store.map("otro", arity=2).get_many(keys) == {}
+
+
+def test_spill_keeps_entries_and_later_writes(backend, store):
+    id_map = SpillableIdMap(arity=2)
+    _fill(id_map, id_map_store._MIN_PENDING + 10)   # arrays + pendientes
+    before = id_map.get_many((i, i % 3) for i in range(id_map_store._MIN_PENDING + 10))
+
+    copied = id_map.spill(store.map("usuario", arity=2), page_size=1000)
+    assert copied == len(before)
+    assert id_map.spilled
+    assert id_map.spill(store.map("usuario", arity=2)) == 0
+
+    keys = list(before) + list(before)[:5] + [(10 ** 6, 0)]
+    assert id_map.get_many(keys) == before
+    id_map.put_many([((10 ** 6, 0), 42)])
+    assert id_map[(10 ** 6, 0)] == 42
+    assert len(id_map) == len(before) + 1
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Motor de mapeos declarativos: validación, expresiones y equivalencia con
+los transformadores escritos a mano del migrador.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from id_map_store import CompactIdMap
+from mapping_engine import compile_mapping
+
+NOW = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def fake_uuid(namespace, key):
+    return f"{namespace}:{key}"
+
+
+def _compile(columns, **spec):
+    spec = {"source": "origen", "target": "destino", "columns": columns, **spec}
+    return compile_mapping("prueba", spec, fake_uuid)
+
+
+# ── Validación ──────────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("spec, message", [
+    ({"target": "t", "columns": {"a": "b"}}, "falta 'source'"),
+    ({"source": "s", "target": "t", "columns": {"a": ("sumar", "b")}}, "expresión desconocida"),
+    ({"source": "s", "target": "t", "columns": {"a": ("fk", "m")}}, "espera 2 argumentos"),
+    ({"source": "s", "target": "t", "columns": {"a": "b"}, "map": "m"}, "requiere 'uuid'"),
+    ({"source": "s", "target": "t", "columns": {"a": ""}}, "columna origen inválida"),
+])
+def test_invalid_specs(spec, message):
+    with pytest.raises(ValueError, match=message):
+        compile_mapping("prueba", spec, fake_uuid)
+
+
+# ── Expresiones ─────────────────────────────────────────────────────────────
+
+def test_expressions_and_selected_columns():
+    mapping = _compile(
+        {
+            "name": "nombre",
+            "status": ("const", "ACTIVE"),
+            "country": ("lookup", "pais_map", "pais"),
+            "code": ("str", "codigo"),
+            "active": ("bool", "vigente"),
+            "notes": ("default", "obs", ""),
+            "created_at": ("or_now", "created_at"),
+            "initials": lambda r: r["nombre"][:1],
+        },
+        keys=("id", "dni"), uuid=("persona", ("id", "dni")),
+    )
+    assert mapping.columns == (
+        "uuid", "name", "status", "country", "code", "active", "notes", "created_at",
+        "initials",
+    )
+    assert mapping.select[:2] == ("id", "dni")
+    assert set(mapping.select) == {
+        "id", "dni", "nombre", "pais", "codigo", "vigente", "obs", "created_at",
+    }
+    rows = [
+        {"id": 7, "dni": 1, "nombre": "Ana", "pais": 57, "codigo": 12, "vigente": 1,
+         "obs": None, "created_at": None},
+        {"id": 8, "dni": 2, "nombre": "Luis", "pais": 99, "codigo": None, "vigente": 0,
+         "obs": "x", "created_at": datetime(2020, 5, 1)},
+    ]
+    out, missing, keys = mapping.build(rows, [], [{57: "Colombia"}], NOW)
+    assert out == [
+        ("persona:7_1", "Ana", "ACTIVE", "Colombia", "12", True, "", NOW, "A"),
+        ("persona:8_2", "Luis", "ACTIVE", None, None, False, "x", datetime(2020, 5, 1), "L"),
+    ]
+    assert missing == [] and keys == []
+
+
+def test_required_and_nullable_foreign_keys():
+    mapping = _compile({
+        "user_id": ("fk", "usuario", ("id_usuario", "dni_usuario")),
+        "parent_id": ("fk_nullable", "grupo", ("padre",)),
+    })
+    assert mapping.fks == [
+        ("usuario", ("id_usuario", "dni_usuario"), True),
+        ("grupo", ("padre",), False),
+    ]
+    rows = [
+        {"id": 1, "id_usuario": 10, "dni_usuario": 1, "padre": None},  # NULL de origen
+        {"id": 2, "id_usuario": 10, "dni_usuario": 1, "padre": 5},     # resuelta
+        {"id": 3, "id_usuario": 11, "dni_usuario": 1, "padre": 5},     # sin usuario
+        {"id": 4, "id_usuario": 10, "dni_usuario": 1, "padre": 6},     # padre sin resolver
+        {"id": 5, "id_usuario": None, "dni_usuario": 1, "padre": None},
+    ]
+    assert mapping.fk_keys(0, rows) == {(10, 1), (11, 1)}
+    assert mapping.fk_keys(1, rows) == {5, 6}
+    out, missing, _ = mapping.build(rows, [{(10, 1): 100}, {5: 50}], [], NOW)
+    assert out == [(100, None), (100, 50)]
+    assert [r["id"] for r in missing] == [3, 4, 5]
+
+
+def test_published_keys_align_with_rows():
+    mapping = _compile(
+        {"user_id": ("fk", "usuario", ("id_usuario",))},
+        uuid=("nota", ("id",)), map="nota",
+    )
+    rows = [{"id": i, "id_usuario": i % 2} for i in range(4)]
+    out, missing, keys = mapping.build(rows, [{0: 100}], [], NOW)
+    assert [row[0] for row in out] == ["nota:0", "nota:2"]
+    assert keys == [0, 2]
+    assert [r["id"] for r in missing] == [1, 3]
+
+
+# ── Equivalencia con los transformadores escritos a mano ────────────────────
+
+_USUARIO_ROWS = [
+    {"id": 1001, "dni": 1, "ocupacion": 3, "empresa": "ACME", "telefono_empresa": "555",
+     "fecha_ingreso_empresa": datetime(2019, 2, 1), "est_civil": 2, "cant_hijos": 1,
+     "fecha_nacimiento": datetime(1990, 1, 1), "created_at": datetime(2020, 1, 1),
+     "updated_at": None},
+    {"id": 1002, "dni": 2, "ocupacion": None, "empresa": None, "telefono_empresa": None,
+     "fecha_ingreso_empresa": None, "est_civil": None, "cant_hijos": None,
+     "fecha_nacimiento": None, "created_at": None, "updated_at": datetime(2021, 1, 1)},
+    {"id": 1003, "dni": 9, "ocupacion": 4, "empresa": "Beta", "telefono_empresa": None,
+     "fecha_ingreso_empresa": None, "est_civil": 1, "cant_hijos": 0,
+     "fecha_nacimiento": None, "created_at": None, "updated_at": None},
+    {"id": 1004, "dni": 1, "ocupacion": 3, "empresa": "Sin perfil", "telefono_empresa": None,
+     "fecha_ingreso_empresa": None, "est_civil": 1, "cant_hijos": 3,
+     "fecha_nacimiento": None, "created_at": None, "updated_at": None},
+]
+
+_PROFILE = ("fk", "profile", ("id", "dni"))
+_SPECS = {
+    "profile_employment": {
+        "uuid": ("employment", ("id", "dni")),
+        "columns": {
+            "profile_id": _PROFILE,
+            "occupation": ("lookup", "t_ocupacion_map", "ocupacion"),
+            "company_name": "empresa",
+            "company_phone": "telefono_empresa",
+            "start_date": "fecha_ingreso_empresa",
+            "end_date": ("const", None),
+            "created_at": ("or_now", "created_at"),
+            "updated_at": ("or_now", "updated_at"),
+        },
+    },
+    "profile_family": {
+        "uuid": ("family", ("id", "dni")),
+        "columns": {
+            "profile_id": _PROFILE,
+            "marital_status": ("lookup", "t_est_civil_map", "est_civil"),
+            "children_count": "cant_hijos",
+            "created_at": ("or_now", "created_at"),
+            "updated_at": ("or_now", "updated_at"),
+        },
+    },
+    "profile_dni": {
+        "uuid": ("profile_dni", ("id", "dni")),
+        "columns": {
+            "profile_id": _PROFILE,
+            '"dniType"': lambda r: {1: "CC", 2: "TI"}.get(r["dni"], str(r["dni"])),
+            "expedition_date": ("const", None),
+            "birthdate": "fecha_nacimiento",
+            "is_current": ("const", True),
+            "created_at": ("or_now", "created_at"),
+            "updated_at": ("or_now", "updated_at"),
+        },
+    },
+}
+
+
+@pytest.fixture
+def migrator(migration):
+    migrator = migration.MariaDBMigrator.__new__(migration.MariaDBMigrator)
+    migrator.t_ocupacion_map = {3: "Ingeniero", 4: "Docente"}
+    migrator.t_est_civil_map = {1: "Soltero", 2: "Casado"}
+    migrator.t_dni_map = {1: "CC", 2: "TI"}
+    return migrator
+
+
+@pytest.mark.parametrize("step", sorted(_SPECS))
+def test_mapping_matches_hand_written_transform(migration, migrator, step):
+    spec = {"source": "usuario", "keys": ("id", "dni"), "target": step, **_SPECS[step]}
+    mapping = compile_mapping(step, spec, migration.det_uuid)
+    assert mapping.columns == getattr(migration, f"{step.upper()}_COLUMNS")
+
+    profiles = CompactIdMap(arity=2)
+    profiles.put_many([((1001, 1), 11), ((1002, 2), 12), ((1003, 9), 13)])
+    expected = getattr(migrator, f"_transform_{step}")(_USUARIO_ROWS, profile_map=profiles)
+
+    fks = [profiles.get_many(mapping.fk_keys(0, _USUARIO_ROWS))]
+    lookups = [getattr(migrator, name) for name in mapping.lookups]
+    out, missing, _ = mapping.build(_USUARIO_ROWS, fks, lookups, migration.NOW)
+    assert out == expected
+    assert [(r["id"], r["dni"]) for r in missing] == [(1004, 1)]
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Reintento de lotes: _with_retry repite solo errores transitorios y un lote
+repetido tras un COMMIT fallido se cuenta (y se confirma) una sola vez.
+"""
+
+import threading
+
+import pytest
+
+
+def _pg_error(psycopg2, cls_name, pgcode):
+    cls = getattr(psycopg2, cls_name)
+    return type(cls_name, (cls,), {"pgcode": pgcode})()
+
+
+@pytest.fixture
+def psycopg2(migration):
+    return migration.psycopg2
+
+
+@pytest.fixture
+def migrator(migration, monkeypatch):
+    monkeypatch.setitem(migration.MIGRATION_SETTINGS, "retry_attempts", 3)
+    monkeypatch.setitem(migration.MIGRATION_SETTINGS, "retry_backoff_seconds", 1.0)
+    sleeps = []
+    monkeypatch.setattr(migration.time, "sleep", sleeps.append)
+
+    migrator = migration.MariaDBMigrator.__new__(migration.MariaDBMigrator)
+    migrator._stats_lock = threading.Lock()
+    migrator._batch_local = threading.local()
+    migrator.stats = {
+        "quarantined": [], "skipped": {}, "unchanged": {}, "pipeline": {}, "reconnects": {},
+    }
+    migrator.sleeps = sleeps
+    migrator.recovery = []
+    migrator._reconnect = lambda database: migrator.recovery.append(("reconnect", database))
+    migrator._reset_transaction = lambda database: migrator.recovery.append(("reset", database))
+    return migrator
+
+
+class Flaky:
+    """Acción que falla con `errors` (en orden) y después devuelve `result`."""
+
+    def __init__(self, errors, result="ok"):
+        self.errors = list(errors)
+        self.result = result
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.result
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# _with_retry
+# ──────────────────────────────────────────────────────────────────────────────
+
+def test_success_runs_once(migrator):
+    action = Flaky([])
+    assert migrator._with_retry("users", "postgres", action) == "ok"
+    assert action.calls == 1
+    assert migrator.recovery == [] and migrator.sleeps == []
+
+
+def test_connection_loss_reconnects_and_repeats(migrator, psycopg2):
+    action = Flaky([
+        _pg_error(psycopg2, "OperationalError", "57P01"),
+        _pg_error(psycopg2, "InterfaceError", None),
+    ])
+    assert migrator._with_retry("users", "postgres", action) == "ok"
+    assert action.calls == 3
+    assert migrator.recovery == [("reconnect", "postgres")] * 2
+    assert migrator.sleeps == [1.0, 2.0]
+    assert migrator.stats["reconnects"] == {"users": 2}
+
+
+def test_conflict_rolls_back_without_reconnecting(migrator, psycopg2):
+    action = Flaky([_pg_error(psycopg2, "OperationalError", "40P01")])
+    assert migrator._with_retry("profiles", "postgres", action) == "ok"
+    assert migrator.recovery == [("reset", "postgres")]
+    assert migrator.stats["reconnects"] == {}
+
+
+def test_recovery_follows_the_latest_error(migrator, psycopg2):
+    action = Flaky([
+        _pg_error(psycopg2, "OperationalError", "08006"),
+        _pg_error(psycopg2, "OperationalError", "40001"),
+    ])
+    migrator._with_retry("users", "postgres", action)
+    assert migrator.recovery == [("reconnect", "postgres"), ("reset", "postgres")]
+    assert migrator.stats["reconnects"] == {"users": 1}
+
+
+def test_permanent_error_is_not_repeated(migrator, psycopg2):
+    err = _pg_error(psycopg2, "OperationalError", "57014")  # statement_timeout
+    action = Flaky([err])
+    with pytest.raises(psycopg2.OperationalError) as raised:
+        migrator._with_retry("users", "postgres", action)
+    assert raised.value is err
+    assert action.calls == 1 and migrator.sleeps == []
+
+
+def test_gives_up_after_retry_attempts(migrator, psycopg2):
+    action = Flaky([_pg_error(psycopg2, "OperationalError", None) for _ in range(5)])
+    with pytest.raises(psycopg2.OperationalError):
+        migrator._with_retry("users", "postgres", action)
+    assert action.calls == 4  # el intento original más retry_attempts
+    assert migrator.sleeps == [1.0, 2.0, 4.0]
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Lote repetido dentro de _pipeline_batches
+# ──────────────────────────────────────────────────────────────────────────────
+
+class FlakyConnection:
+    """Conexión de PostgreSQL cuyo COMMIT falla con `errors` (en orden)."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.commits = 0
+
+    def commit(self):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.commits += 1
+
+
+class Checkpoint:
+    def __init__(self):
+        self.advanced = []
+
+    def advance(self, step, last_key, rows):
+        self.advanced.append((step, last_key, rows))
+
+
+@pytest.fixture
+def pipeline_migrator(migration, migrator):
+    migrator._local = threading.local()  # conexiones del hilo
+    migrator.metrics = migration.RunMetrics()
+    migrator.checkpoint = Checkpoint()
+    migrator.adaptive_batch = False
+    migrator.memory_budget_mb = None
+    migrator.queue_size = 0
+    migrator.profiler = None
+    return migrator
+
+
+def test_retried_batch_commits_and_counts_once(pipeline_migrator, psycopg2):
+    migrator = pipeline_migrator
+    migrator.postgres_conn = FlakyConnection([_pg_error(psycopg2, "OperationalError", None)])
+    batches = [[{"id": 1, "dni": "a"}, {"id": 2, "dni": "b"}], [{"id": 3, "dni": "c"}]]
+    loads = []
+
+    def load(rows, _payload):
+        loads.append([r["id"] for r in rows])
+        # Lo que se anota durante la carga también tiene que contarse una vez
+        migrator._quarantine("users", rows[0]["id"], ValueError("fila rechazada\ndetalle"))
+        migrator._count_stat("skipped", "users", 1)
+        return {"migrated": len(rows) - 1, "total": len(rows)}
+
+    counts = migrator._pipeline_batches("users", lambda: iter(batches), load)
+
+    assert loads == [[1, 2], [1, 2], [3]]  # el primer lote se repitió entero
+    assert migrator.postgres_conn.commits == 2
+    assert migrator.checkpoint.advanced == [("users", (2, "b"), 2), ("users", (3, "c"), 1)]
+    assert counts == {"migrated": 1, "total": 3}
+    assert migrator.stats["quarantined"] == [
+        ("users", 1, "fila rechazada"), ("users", 3, "fila rechazada"),
+    ]
+    assert migrator.stats["skipped"] == {"users": 2}
+    assert migrator.stats["reconnects"] == {"users": 1}
+
+
+def test_failed_batch_leaves_no_counts(pipeline_migrator, psycopg2):
+    migrator = pipeline_migrator
+    err = _pg_error(psycopg2, "IntegrityError", "23505")
+    migrator.postgres_conn = FlakyConnection([err])
+
+    def load(rows, _payload):
+        migrator._quarantine("users", rows[0]["id"], ValueError("fila rechazada"))
+        return {"migrated": len(rows), "total": len(rows)}
+
+    with pytest.raises(psycopg2.IntegrityError):
+        migrator._pipeline_batches("users", lambda: iter([[{"id": 1, "dni": "a"}]]), load)
+    assert migrator.stats["quarantined"] == []
+    assert migrator.checkpoint.advanced == []
+
+    # Fuera de un lote, los stats se anotan directamente
+    migrator._count_stat("unchanged", "users", 4)
+    assert migrator.stats["unchanged"] == {"users": 4}
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Planificador DAG: orden por dependencias, fallos y ruta crítica."""
+
+import threading
+import time
+
+import pytest
+
+from scheduler import Step, StepResult, critical_path, run_dag
+
+
+def _recorder():
+    order = []
+    lock = threading.Lock()
+
+    def step(name, ok=True, seconds=0.0):
+        def run():
+            if seconds:
+                time.sleep(seconds)
+            with lock:
+                order.append(name)
+            return ok
+        return run
+
+    return order, step
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_dependencies_run_first(workers):
+    order, step = _recorder()
+    steps = [
+        Step("profiles", step("profiles"), deps=("users",)),
+        Step("users", step("users", seconds=0.02)),
+        Step("roles", step("roles")),
+        Step("user_roles", step("user_roles"), deps=("roles", "users")),
+        Step("profile_dni", step("profile_dni"), deps=("profiles",)),
+    ]
+    results = run_dag(steps, max_workers=workers)
+    assert sorted(order) == sorted(s.name for s in steps)
+    for s in steps:
+        for dep in s.deps:
+            assert order.index(dep) < order.index(s.name)
+    assert all(r.ok and not r.skipped for r in results.values())
+
+
+def test_single_worker_keeps_declared_order():
+    order, step = _recorder()
+    steps = [Step("b", step("b")), Step("a", step("a")), Step("c", step("c"), deps=("a",))]
+    run_dag(steps, max_workers=1)
+    assert order == ["b", "a", "c"]
+
+
+def test_independent_steps_overlap():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def meet():
+        barrier.wait()  # se traba si los pasos corren en serie
+        return True
+
+    results = run_dag([Step("x", meet), Step("y", meet)], max_workers=2)
+    assert results["x"].ok and results["y"].ok
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_failure_skips_dependents_only(workers):
+    order, step = _recorder()
+    steps = [
+        Step("users", step("users", ok=False)),
+        Step("profiles", step("profiles"), deps=("users",)),
+        Step("profile_dni", step("profile_dni"), deps=("profiles",)),
+        Step("roles", step("roles")),
+        Step("restore_ddl", step("restore_ddl"), deps=("profile_dni", "roles"), always=True),
+    ]
+    results = run_dag(steps, max_workers=workers)
+    assert sorted(order) == ["restore_ddl", "roles", "users"]
+    assert not results["users"].ok and not results["users"].skipped
+    for name in ("profiles", "profile_dni"):
+        assert not results[name].ok and results[name].skipped
+    assert results["roles"].ok
+    assert results["restore_ddl"].ok
+
+
+def test_exception_counts_as_failure():
+    def boom():
+        raise RuntimeError("sin conexión")
+
+    results = run_dag([Step("a", boom), Step("b", lambda: True, deps=("a",))])
+    assert not results["a"].ok
+    assert results["b"].skipped
+
+
+@pytest.mark.parametrize("steps, message", [
+    ([Step("a", bool, deps=("zzz",))], "desconocidas"),
+    ([Step("a", bool, deps=("b",)), Step("b", bool, deps=("a",))], "Ciclo"),
+])
+def test_invalid_graphs_are_rejected(steps, message):
+    with pytest.raises(ValueError, match=message):
+        run_dag(steps)
+
+
+def test_critical_path_is_slowest_chain():
+    steps = [
+        Step("roles", bool),
+        Step("users", bool),
+        Step("profiles", bool, deps=("users",)),
+        Step("user_roles", bool, deps=("roles", "users")),
+        Step("profile_dni", bool, deps=("profiles",)),
+    ]
+    durations = {"roles": 5.0, "users": 2.0, "profiles": 3.0, "user_roles": 1.0,
+                 "profile_dni": 0.5}
+    results = {name: StepResult(name, True, 0.0, d) for name, d in durations.items()}
+    path, seconds = critical_path(steps, results)
+    assert path == ["roles", "user_roles"]
+    assert seconds == pytest.approx(6.0)
+
+    results["profile_dni"] = StepResult("profile_dni", True, 0.0, 2.0)
+    path, seconds = critical_path(steps, results)
+    assert path == ["users", "profiles", "profile_dni"]
+    assert seconds == pytest.approx(7.0)